@@ -2,15 +2,20 @@ from __future__ import annotations
 
 """CLI entrypoint for Klara AI tutoring flow."""
 
-from dataclasses import dataclass, field
+import os
+import time
+import uuid
+import weakref
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 
 from app.core.evaluator import evaluate_answer
-from app.core.llm_question_engine import generate_llm_question
+from app.core.llm_question_engine import DEFAULT_MAX_IN_FLIGHT, generate_llm_question, generate_llm_questions
 from app.core.levels import normalize_level
 from app.core.local_sources import SourceChunk, ingest_file
 from app.core.mock_llm import reply
-from app.core.question_engine import Question, generate_question
+from app.core.prefetch import PrefetchKey, QuestionPrefetcher
+from app.core.question_engine import Question, generate_question, generate_questions
 from app.core.subjects import normalize_subject, sanitize_subject_name
 from app.core.session import LessonSession
 from app.core.state_machine import TeacherEngine
@@ -20,21 +25,39 @@ from app.core.voice import (
     tts_dependency_message,
     voice_dependency_message,
 )
-from app.llm.ollama_client import DEFAULT_MODEL
+from app.llm.ollama_client import DEFAULT_MODEL, GenerationResult, default_client, warm_up
+from app.llm.router import DEFAULT_LATENCY_BUDGET_S, default_router
+from app.llm.scheduler import PRIORITY_INTERACTIVE, PRIORITY_PREFETCH, default_scheduler
 from app.storage.memory import (
     StudentMemory,
-    add_lesson_record,
     get_topic_stats,
+    get_weakest_overall,
     get_weakest_topics,
-    load_memory,
-    save_memory,
-    update_weakness_stats,
 )
+from app.storage.memory_store import MemoryStore, close_all_stores, open_store
+from app.storage.retention import daily_summary
+from app.storage.shards import student_memory_path
 
 
 APP_DIR = Path(__file__).resolve().parent
 PROMPT_PATH = APP_DIR / "prompts" / "klara.txt"
-MEMORY_PATH = APP_DIR / "storage" / "student_memory.json"
+STUDENTS_DIR = APP_DIR / "storage" / "students"
+
+
+def memory_path_for(student_id: str | None) -> Path:
+    """KLARA_MEMORY_PATH if set, else the student's own shard, else the shared default file.
+
+    A .db/.sqlite KLARA_MEMORY_PATH selects the SQLite backend.
+    """
+    explicit = os.environ.get("KLARA_MEMORY_PATH")
+    if explicit:
+        return Path(explicit)
+    if student_id:
+        return student_memory_path(STUDENTS_DIR, student_id)
+    return APP_DIR / "storage" / "student_memory.json"
+
+
+MEMORY_PATH = memory_path_for(os.environ.get("KLARA_STUDENT_ID"))
 
 
 @dataclass
@@ -48,11 +71,20 @@ class CliContext:
     level: str | None = None
     llm_enabled: bool = False
     llm_model: str = DEFAULT_MODEL
+    llm_cache: bool = True
+    llm_max_in_flight: int = DEFAULT_MAX_IN_FLIGHT
+    llm_fast_model: str | None = None
+    llm_budget_s: float | None = DEFAULT_LATENCY_BUDGET_S
     voice_enabled: bool = False
     sources: list[SourceChunk] = field(default_factory=list)
     custom_subjects: set[str] = field(default_factory=set)
     custom_subject_aliases: dict[str, str] = field(default_factory=dict)
     mode: str = "teacher"
+    prefetcher: QuestionPrefetcher | None = None
+    session_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    memory_store: MemoryStore | None = None
+    # Timings of this session's latest Ollama request, shown by /status.
+    llm_last_result: GenerationResult | None = None
 
 
 def handle_command(context: CliContext, command: str) -> str:
@@ -63,7 +95,7 @@ def handle_command(context: CliContext, command: str) -> str:
         return _respond(context, context.session.current_section, "")
 
     if cmd == "/status":
-        memory = load_memory(context.memory_path)
+        memory = _memory(context)
         top_weakness = _format_top_weakness(memory)
         llm_state = "on" if context.llm_enabled else "off"
         voice_state = "on" if context.voice_enabled else "off"
@@ -79,6 +111,7 @@ def handle_command(context: CliContext, command: str) -> str:
             f"voice={voice_state} "
             f"sources={len(context.sources)} "
             f"weakness={top_weakness}"
+            f"{_format_llm_latency(context)}"
         )
 
     if cmd == "/help":
@@ -99,8 +132,12 @@ def handle_command(context: CliContext, command: str) -> str:
                 "/next",
                 "/quiz <n>",
                 "/weak",
+                "/progress <dny>",
                 "/llm on|off",
+                "/llmcache on|off",
                 "/model <name>",
+                "/fastmodel <name>|off",
+                "/budget <seconds>|off",
                 "/voice on|off",
                 "/ptt",
                 "/status",
@@ -116,10 +153,11 @@ def handle_command(context: CliContext, command: str) -> str:
     if cmd.startswith("/topic "):
         context.topic = cmd.replace("/topic ", "", 1).strip() or None
 
-        memory = load_memory(context.memory_path)
+        memory = _memory(context)
         memory.preferences["topic"] = context.topic
-        save_memory(context.memory_path, memory)
+        _memory_changed(context)
 
+        _invalidate_prefetch(context)
         return f"Tema nastavene: {context.topic or 'unset'}"
 
     if cmd == "/mode":
@@ -130,9 +168,9 @@ def handle_command(context: CliContext, command: str) -> str:
         if mode_arg not in {"teacher", "assistant"}:
             return "Pouzij: /mode teacher|assistant"
         context.mode = mode_arg
-        memory = load_memory(context.memory_path)
+        memory = _memory(context)
         memory.preferences["mode"] = mode_arg
-        save_memory(context.memory_path, memory)
+        _memory_changed(context)
         return f"Mode nastaven: {mode_arg}"
 
     if cmd == "/todo":
@@ -144,15 +182,15 @@ def handle_command(context: CliContext, command: str) -> str:
         todo_text = cmd.replace("/todo add ", "", 1).strip()
         if not todo_text:
             return "Pouzij: /todo add <text>"
-        memory = load_memory(context.memory_path)
+        memory = _memory(context)
         memory.todos.append(todo_text)
-        save_memory(context.memory_path, memory)
+        _memory_changed(context)
         return f"Todo pridan: {todo_text}"
 
     if cmd == "/todo list":
         if context.mode != "assistant":
             return "Todo je dostupne pouze v assistant mode (/mode assistant)"
-        memory = load_memory(context.memory_path)
+        memory = _memory(context)
         if not memory.todos:
             return "Zadne todos"
         lines = [f"{index + 1}. {todo}" for index, todo in enumerate(memory.todos)]
@@ -165,11 +203,11 @@ def handle_command(context: CliContext, command: str) -> str:
             index = int(cmd.replace("/todo done ", "", 1).strip()) - 1
         except ValueError:
             return "Pouzij: /todo done <index>"
-        memory = load_memory(context.memory_path)
+        memory = _memory(context)
         if index < 0 or index >= len(memory.todos):
             return "Spatny index"
         removed = memory.todos.pop(index)
-        save_memory(context.memory_path, memory)
+        _memory_changed(context)
         return f"Todo hotove: {removed}"
 
     if cmd == "/subject add":
@@ -192,9 +230,10 @@ def handle_command(context: CliContext, command: str) -> str:
         if not subject:
             return "Neznamy predmet."
         context.subject = subject
-        memory = load_memory(context.memory_path)
+        memory = _memory(context)
         memory.preferences["subject"] = subject
-        save_memory(context.memory_path, memory)
+        _memory_changed(context)
+        _invalidate_prefetch(context)
         return f"Predmet nastaven: {subject}"
 
     if cmd == "/level":
@@ -206,9 +245,10 @@ def handle_command(context: CliContext, command: str) -> str:
         if not level:
             return "Neznama uroven."
         context.level = level
-        memory = load_memory(context.memory_path)
+        memory = _memory(context)
         memory.preferences["level"] = level
-        save_memory(context.memory_path, memory)
+        _memory_changed(context)
+        _invalidate_prefetch(context)
         return f"Uroven nastavena: {level}"
 
     if cmd == "/llm":
@@ -220,11 +260,27 @@ def handle_command(context: CliContext, command: str) -> str:
             return "Pouzij: /llm on|off"
         enabled = value == "on"
         context.llm_enabled = enabled
-        memory = load_memory(context.memory_path)
+        memory = _memory(context)
         memory.preferences["llm_enabled"] = enabled
-        save_memory(context.memory_path, memory)
+        _memory_changed(context)
+        _invalidate_prefetch(context)
+        warm_up_llm(context)
         return f"LLM mode: {'on' if enabled else 'off'}"
 
+    if cmd == "/llmcache":
+        return "Pouzij: /llmcache on|off"
+
+    if cmd.startswith("/llmcache "):
+        value = cmd.replace("/llmcache ", "", 1).strip().lower()
+        if value not in {"on", "off"}:
+            return "Pouzij: /llmcache on|off"
+        context.llm_cache = value == "on"
+        memory = _memory(context)
+        memory.preferences["llm_cache"] = context.llm_cache
+        _memory_changed(context)
+        _invalidate_prefetch(context)
+        return f"LLM cache: {value}"
+
     if cmd == "/model":
         return "Pouzij: /model <name>"
 
@@ -233,11 +289,49 @@ def handle_command(context: CliContext, command: str) -> str:
         if not model:
             return "Pouzij: /model <name>"
         context.llm_model = model
-        memory = load_memory(context.memory_path)
+        memory = _memory(context)
         memory.preferences["llm_model"] = model
-        save_memory(context.memory_path, memory)
+        _memory_changed(context)
+        _invalidate_prefetch(context)
+        warm_up_llm(context)
         return f"Model nastaven: {model}"
 
+    if cmd == "/fastmodel":
+        return "Pouzij: /fastmodel <name>|off"
+
+    if cmd.startswith("/fastmodel "):
+        model = cmd.replace("/fastmodel ", "", 1).strip()
+        if not model:
+            return "Pouzij: /fastmodel <name>|off"
+        context.llm_fast_model = None if model.lower() == "off" else model
+        memory = _memory(context)
+        memory.preferences["llm_fast_model"] = context.llm_fast_model
+        _memory_changed(context)
+        _invalidate_prefetch(context)
+        warm_up_llm(context)
+        return f"Rychly model: {context.llm_fast_model or 'off'}"
+
+    if cmd == "/budget":
+        return "Pouzij: /budget <seconds>|off"
+
+    if cmd.startswith("/budget "):
+        value = cmd.replace("/budget ", "", 1).strip().lower()
+        if value == "off":
+            budget_s = None
+        else:
+            try:
+                budget_s = float(value)
+            except ValueError:
+                return "Pouzij: /budget <seconds>|off"
+            if budget_s <= 0:
+                return "Pouzij: /budget <seconds>|off"
+        context.llm_budget_s = budget_s
+        memory = _memory(context)
+        memory.preferences["llm_budget_s"] = budget_s if budget_s is not None else "off"
+        _memory_changed(context)
+        _invalidate_prefetch(context)
+        return f"Casovy limit LLM: {f'{budget_s:g} s' if budget_s is not None else 'off'}"
+
     if cmd == "/voice":
         return "Pouzij: /voice on|off"
 
@@ -247,9 +341,9 @@ def handle_command(context: CliContext, command: str) -> str:
             return "Pouzij: /voice on|off"
         if value == "off":
             context.voice_enabled = False
-            memory = load_memory(context.memory_path)
+            memory = _memory(context)
             memory.preferences["voice_enabled"] = False
-            save_memory(context.memory_path, memory)
+            _memory_changed(context)
             return "Voice mode: off"
         missing_messages = []
         voice_message = voice_dependency_message()
@@ -261,9 +355,9 @@ def handle_command(context: CliContext, command: str) -> str:
         if missing_messages:
             return "\n".join(missing_messages)
         context.voice_enabled = True
-        memory = load_memory(context.memory_path)
+        memory = _memory(context)
         memory.preferences["voice_enabled"] = True
-        save_memory(context.memory_path, memory)
+        _memory_changed(context)
         return "Voice mode: on"
 
     if cmd == "/ptt":
@@ -285,11 +379,13 @@ def handle_command(context: CliContext, command: str) -> str:
 
     if cmd == "/ok":
         context.engine.evaluate(correct=True)
+        _prime_prefetch(context)
         section, _action = context.session.next_section()
         return _respond(context, section, "")
 
     if cmd == "/fail":
         context.engine.evaluate(correct=False)
+        _prime_prefetch(context)
         section = "STRICT_MODE" if context.engine.state == "STRICT_MODE" else context.session.current_section
         return _respond(context, section, "")
 
@@ -299,9 +395,7 @@ def handle_command(context: CliContext, command: str) -> str:
         section_reached = context.session.current_section
         message = context.engine.end_lesson()
 
-        memory = load_memory(context.memory_path)
-        add_lesson_record(
-            memory,
+        _memory_store(context).record_lesson(
             errors=errors,
             strictness_peak=strictness_peak,
             topic=context.topic,
@@ -310,8 +404,9 @@ def handle_command(context: CliContext, command: str) -> str:
             questions_asked_count=context.session.questions_asked_count,
             section_reached=section_reached,
         )
-        save_memory(context.memory_path, memory)
+        _memory_store(context).flush()
 
+        _invalidate_prefetch(context)
         context.session.reset()
         return message
 
@@ -344,6 +439,7 @@ def handle_command(context: CliContext, command: str) -> str:
         if not chunks:
             return "No text found in file."
         context.sources.extend(chunks)
+        _invalidate_prefetch(context)
         return f"Ingested {len(chunks)} chunks from {raw_path}"
 
     if cmd == "/sources":
@@ -354,7 +450,7 @@ def handle_command(context: CliContext, command: str) -> str:
     if cmd == "/weak":
         if not context.subject:
             return "Nejdrive nastav predmet pomoci /subject."
-        memory = load_memory(context.memory_path)
+        memory = _memory(context)
         weakest = get_weakest_topics(memory, subject=context.subject, limit=3)
         if not weakest:
             return "Zatim nemam data o slabinach."
@@ -364,6 +460,21 @@ def handle_command(context: CliContext, command: str) -> str:
         ]
         return "\n".join(lines)
 
+    if cmd == "/progress" or cmd.startswith("/progress "):
+        arg = cmd.replace("/progress", "", 1).strip()
+        try:
+            days = max(1, int(arg)) if arg else 7
+        except ValueError:
+            return "Pouzij: /progress <dny>"
+        summary = daily_summary(_memory(context), days=days)
+        if not summary:
+            return "Zatim zadne lekce."
+        return "\n".join(
+            f"{day}: lessons={rollup.lessons} errors={rollup.errors} "
+            f"peak={rollup.strictness_peak} questions={rollup.questions_asked}"
+            for day, rollup in summary
+        )
+
     if cmd.startswith("/quiz"):
         parts = cmd.split(maxsplit=1)
         count = 5
@@ -372,9 +483,7 @@ def handle_command(context: CliContext, command: str) -> str:
                 count = max(1, int(parts[1].strip()))
             except ValueError:
                 return "Pouzij: /quiz <n>"
-        questions: list[Question] = []
-        for _ in range(count):
-            questions.append(_generate_question(context))
+        questions = _generate_questions(context, count)
         if questions:
             last_question = questions[-1]
             context.session.last_question = last_question.text
@@ -392,15 +501,31 @@ def handle_command(context: CliContext, command: str) -> str:
         )
         if subject:
             context.subject = subject
-            memory = load_memory(context.memory_path)
+            memory = _memory(context)
             memory.preferences["subject"] = subject
-            save_memory(context.memory_path, memory)
+            _memory_changed(context)
+            _invalidate_prefetch(context)
             return f"Predmet nastaven: {subject}"
         return _respond(context, context.session.current_section, cmd)
 
     return "Neznamy prikaz. Pouzij /help."
 
 
+def _memory_store(context: CliContext) -> MemoryStore:
+    if context.memory_store is None:
+        context.memory_store = open_store(context.memory_path)
+    return context.memory_store
+
+
+def _memory(context: CliContext) -> StudentMemory:
+    """The session's live StudentMemory; call _memory_changed after mutating it."""
+    return _memory_store(context).memory
+
+
+def _memory_changed(context: CliContext) -> None:
+    _memory_store(context).mark_dirty()
+
+
 def _respond(context: CliContext, state: str, user_text: str) -> str:
     topic_hint = context.topic or user_text
     return reply(
@@ -414,35 +539,155 @@ def _respond(context: CliContext, state: str, user_text: str) -> str:
 
 
 def _ask_next_question(context: CliContext) -> str:
-    question = _generate_question(context)
+    key = _question_key(context)
+    # The latency budget covers waiting for an in-flight prefetch too.
+    budget_s = context.llm_budget_s if key.llm_enabled else None
+    deadline = None if budget_s is None else time.monotonic() + budget_s
+    question = context.prefetcher.take(key, wait_s=budget_s) if context.prefetcher else None
+    if question is None:
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            question = _generate_for_key(context, replace(key, llm_enabled=False))
+        else:
+            question = _generate_for_key(context, key, budget_s=remaining)
     context.session.last_question = question.text
     context.session.last_question_meta = question.meta
     context.session.questions_asked_count += 1
     return question.text
 
 
-def _generate_question(context: CliContext) -> Question:
-    memory = load_memory(context.memory_path)
+def _question_key(context: CliContext) -> PrefetchKey:
+    memory = _memory(context)
+    return PrefetchKey(
+        subject=context.subject,
+        level=context.level,
+        topic=context.topic,
+        strictness=context.engine.strictness,
+        prefer_easy=_should_prefer_easy(memory, context.subject, context.topic),
+        llm_enabled=context.llm_enabled,
+        llm_model=context.llm_model,
+        source_count=len(context.sources),
+        llm_fast_model=context.llm_fast_model,
+        llm_cache=context.llm_cache,
+        llm_budget_s=context.llm_budget_s,
+    )
+
+
+def _generate_for_key(
+    context: CliContext,
+    key: PrefetchKey,
+    *,
+    priority: int = PRIORITY_INTERACTIVE,
+    budget_s: float | None = None,
+) -> Question:
+    # Uses only the key snapshot (plus sources), so it is safe on the prefetch worker.
+    # Only a waiting student needs `budget_s`; background work may take its time.
+    if key.llm_enabled:
+        llm_question = generate_llm_question(
+            key.subject,
+            key.level,
+            key.topic,
+            key.strictness,
+            sources=context.sources,
+            model=key.llm_model,
+            use_cache=key.llm_cache,
+            priority=priority,
+            session=context.session_id,
+            fast_model=key.llm_fast_model,
+            budget_s=budget_s,
+            on_result=lambda result: _record_llm_result(context, result),
+        )
+        if llm_question:
+            return llm_question
+    return generate_question(
+        key.subject,
+        key.level,
+        key.topic,
+        key.strictness,
+        prefer_easy=key.prefer_easy,
+        sources=context.sources,
+    )
+
+
+def _record_llm_result(context: CliContext, result: GenerationResult) -> None:
+    context.llm_last_result = result
+
+
+def enable_prefetch(context: CliContext, *, depth: int = 2) -> None:
+    """Generate the next `depth` questions in the background while the student answers."""
+    if context.prefetcher is not None:
+        return
+    # The worker holds the context weakly, so a session that is dropped
+    # (Streamlit keeps no close hook) can be collected and its worker closed.
+    context_ref = weakref.ref(context)
+    session_id = context.session_id
+
+    def produce(key: PrefetchKey) -> Question:
+        live = context_ref()
+        if live is None:
+            raise RuntimeError("Session is gone")
+        return _generate_for_key(live, key, priority=PRIORITY_PREFETCH)
+
+    context.prefetcher = QuestionPrefetcher(
+        produce,
+        depth=depth,
+        # A student waiting in /ask must not queue behind background work.
+        on_wait=lambda waiting: default_scheduler().set_urgent(session_id, waiting),
+    )
+    weakref.finalize(context, context.prefetcher.close)
+
+
+def warm_up_llm(context: CliContext) -> None:
+    """Have Ollama load the model in the background so the first question skips the load time."""
+    if context.llm_enabled:
+        warm_up(context.llm_model)
+        if context.llm_fast_model:
+            warm_up(context.llm_fast_model)
+
+
+def _prime_prefetch(context: CliContext) -> None:
+    if context.prefetcher:
+        context.prefetcher.prime(_question_key(context))
+
+
+def _invalidate_prefetch(context: CliContext) -> None:
+    if context.prefetcher:
+        context.prefetcher.invalidate()
+        default_scheduler().cancel(context.session_id, priority=PRIORITY_PREFETCH)
+
+
+def _generate_questions(context: CliContext, count: int) -> list[Question]:
+    memory = _memory(context)
     prefer_easy = _should_prefer_easy(memory, context.subject, context.topic)
+    questions: list[Question | None] = [None] * count
     if context.llm_enabled:
-        llm_question = generate_llm_question(
+        questions = generate_llm_questions(
+            [context.topic] * count,
             context.subject,
             context.level,
-            context.topic,
             context.engine.strictness,
             sources=context.sources,
             model=context.llm_model,
+            use_cache=context.llm_cache,
+            max_in_flight=context.llm_max_in_flight,
+            session=context.session_id,
+            fast_model=context.llm_fast_model,
+            budget_s=context.llm_budget_s,
+            on_result=lambda result: _record_llm_result(context, result),
+        )
+    missing = sum(1 for question in questions if question is None)
+    fallback = iter(
+        generate_questions(
+            missing,
+            context.subject,
+            context.level,
+            context.topic,
+            context.engine.strictness,
+            prefer_easy=prefer_easy,
+            sources=context.sources,
         )
-        if llm_question:
-            return llm_question
-    return generate_question(
-        context.subject,
-        context.level,
-        context.topic,
-        context.engine.strictness,
-        prefer_easy=prefer_easy,
-        sources=context.sources,
     )
+    return [question if question is not None else next(fallback) for question in questions]
 
 
 def _handle_answer(context: CliContext, answer_text: str) -> str:
@@ -456,14 +701,12 @@ def _handle_answer(context: CliContext, answer_text: str) -> str:
     else:
         context.session.fail_count += 1
 
-    memory = load_memory(context.memory_path)
-    update_weakness_stats(
-        memory,
+    _memory_store(context).record_answer(
         subject=context.session.last_question_meta.subject,
         topic=context.session.last_question_meta.topic,
         ok=evaluation.ok,
     )
-    save_memory(context.memory_path, memory)
+    _prime_prefetch(context)
 
     return _format_feedback(context.engine.strictness, evaluation.ok, evaluation.score, evaluation.feedback_tags)
 
@@ -481,13 +724,15 @@ def _handle_subject_add(context: CliContext, raw: str) -> str:
     )
     if existing:
         context.subject = existing
+        _invalidate_prefetch(context)
         return f"Predmet uz existuje: {existing}"
     context.custom_subjects.add(sanitized)
     context.subject = sanitized
-    memory = load_memory(context.memory_path)
+    memory = _memory(context)
     memory.custom_subjects = sorted({*memory.custom_subjects, sanitized})
     memory.preferences["subject"] = sanitized
-    save_memory(context.memory_path, memory)
+    _memory_changed(context)
+    _invalidate_prefetch(context)
     return f"Predmet pridan: {sanitized}"
 
 
@@ -522,26 +767,38 @@ def _should_prefer_easy(memory: StudentMemory, subject: str | None, topic: str |
 
 
 def _format_top_weakness(memory: StudentMemory) -> str:
-    weakest_overall: tuple[str, str, float, int] | None = None
-    for subject, topics in memory.weakness_stats.items():
-        if not isinstance(topics, dict):
-            continue
-        for topic, stats in topics.items():
-            if not isinstance(stats, dict):
-                continue
-            total = stats.get("total", 0)
-            fail = stats.get("fail", 0)
-            if not isinstance(total, int) or total <= 0:
-                continue
-            fail_rate = fail / total
-            if not weakest_overall or fail_rate > weakest_overall[2]:
-                weakest_overall = (subject, topic, fail_rate, total)
+    weakest_overall = get_weakest_overall(memory)
     if not weakest_overall:
         return "none"
     subject, topic, fail_rate, total = weakest_overall
     return f"{subject}:{topic} ({fail_rate:.0%}, total={total})"
 
 
+def _format_llm_latency(context: CliContext) -> str:
+    if context.llm_enabled and not default_client().available():
+        return f" llm_circuit=open retry_in={default_client().breaker.retry_in():.0f}s"
+    result = context.llm_last_result if context.llm_enabled else None
+    if result is None or result.error:
+        return ""
+    flight = default_client().single_flight
+    first_token = f"{result.first_token_s * 1000:.0f}ms" if result.first_token_s is not None else "n/a"
+    ewma = ",".join(f"{model}:{seconds * 1000:.0f}ms" for model, seconds in default_router().estimates().items())
+    return (
+        f" llm_first_token={first_token} llm_total={result.total_s * 1000:.0f}ms"
+        f" llm_requests={flight.issued} llm_coalesced={flight.coalesced}"
+        f" llm_ewma={ewma or 'n/a'}"
+    )
+
+
+def restore_budget(value: object) -> float | None:
+    """Turn a saved `llm_budget_s` preference back into seconds; "off" means no budget."""
+    if value == "off":
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0:
+        return float(value)
+    return DEFAULT_LATENCY_BUDGET_S
+
+
 def _load_custom_subjects(memory: StudentMemory) -> set[str]:
     return {subject for subject in memory.custom_subjects if isinstance(subject, str) and subject}
 
@@ -558,13 +815,17 @@ def run_cli() -> None:
     persona_text = ""
     if PROMPT_PATH.exists():
         persona_text = PROMPT_PATH.read_text(encoding="utf-8").strip()
-    memory = load_memory(MEMORY_PATH)
+    store = open_store(MEMORY_PATH)
+    memory = store.memory
     prefs = memory.preferences if isinstance(memory.preferences, dict) else {}
     saved_topic = prefs.get("topic")
     saved_subject = prefs.get("subject")
     saved_level = prefs.get("level")
     saved_llm_enabled = prefs.get("llm_enabled")
     saved_llm_model = prefs.get("llm_model")
+    saved_llm_cache = prefs.get("llm_cache")
+    saved_llm_fast_model = prefs.get("llm_fast_model")
+    saved_llm_budget_s = prefs.get("llm_budget_s")
     saved_voice_enabled = prefs.get("voice_enabled")
     saved_mode = prefs.get("mode", "teacher")
     custom_subjects = _load_custom_subjects(memory)
@@ -573,17 +834,23 @@ def run_cli() -> None:
         engine=TeacherEngine(),
         session=LessonSession(),
         memory_path=MEMORY_PATH,
+        memory_store=store,
         persona_text=persona_text,
         topic=saved_topic if saved_topic else None,
         subject=saved_subject if saved_subject else None,
         level=saved_level if saved_level else None,
         llm_enabled=True if saved_llm_enabled is True else False,
         llm_model=saved_llm_model if isinstance(saved_llm_model, str) and saved_llm_model else DEFAULT_MODEL,
+        llm_cache=False if saved_llm_cache is False else True,
+        llm_fast_model=saved_llm_fast_model if isinstance(saved_llm_fast_model, str) and saved_llm_fast_model else None,
+        llm_budget_s=restore_budget(saved_llm_budget_s),
         voice_enabled=True if saved_voice_enabled is True else False,
         custom_subjects=custom_subjects,
         custom_subject_aliases=custom_subject_aliases,
         mode=saved_mode if saved_mode in {"teacher", "assistant"} else "teacher",
     )
+    enable_prefetch(context)
+    warm_up_llm(context)
 
     # nacti ulozeny topic z pameti (persistuje po restartu)
     print("Klara CLI. Zadej prikaz.")
@@ -604,3 +871,7 @@ def run_cli() -> None:
 
         if user_input == "/end":
             break
+
+    if context.prefetcher:
+        context.prefetcher.close()
+    close_all_stores()
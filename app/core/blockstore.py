@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+"""Block-compressed record files with random access by record index."""
+
+import importlib
+import importlib.util
+import json
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+
+MAGIC = b"KLB1"
+CODECS = ("none", "zlib", "zstd")
+DEFAULT_BLOCK_RECORDS = 64
+
+
+def resolve_codec(codec: str = "auto") -> str:
+    """Return a usable codec name; "auto" prefers zstd when installed."""
+    if codec == "auto":
+        return "zstd" if importlib.util.find_spec("zstandard") is not None else "zlib"
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec: {codec}. Use one of: auto, {', '.join(CODECS)}")
+    if codec == "zstd" and importlib.util.find_spec("zstandard") is None:
+        raise ValueError("Missing optional dependency. Install with: pip install zstandard")
+    return codec
+
+
+def write_records(
+    path: Path,
+    records: list[bytes],
+    *,
+    meta: dict[str, object] | None = None,
+    codec: str = "auto",
+    block_records: int = DEFAULT_BLOCK_RECORDS,
+) -> None:
+    """Write `records` grouped into independently compressed blocks.
+
+    Layout: magic, codec name, compressed JSON header (meta + block table),
+    then the compressed blocks. The file is written atomically.
+    """
+    codec = resolve_codec(codec)
+    block_records = max(1, block_records)
+    compress = _compressor(codec)
+    blocks: list[bytes] = []
+    for start in range(0, len(records), block_records):
+        group = records[start : start + block_records]
+        lengths = struct.pack(f"<{len(group)}I", *(len(item) for item in group))
+        blocks.append(compress(lengths + b"".join(group)))
+    table: list[list[int]] = []
+    offset = 0
+    for block in blocks:
+        table.append([offset, len(block)])
+        offset += len(block)
+    header = {
+        "count": len(records),
+        "block_records": block_records,
+        "blocks": table,
+        "meta": meta or {},
+    }
+    header_bytes = compress(json.dumps(header, separators=(",", ":")).encode("utf-8"))
+    codec_bytes = codec.encode("ascii")
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with tmp_path.open("wb") as fh:
+        fh.write(MAGIC)
+        fh.write(struct.pack("<B", len(codec_bytes)))
+        fh.write(codec_bytes)
+        fh.write(struct.pack("<I", len(header_bytes)))
+        fh.write(header_bytes)
+        for block in blocks:
+            fh.write(block)
+    os.replace(tmp_path, path)
+
+
+class BlockReader:
+    """Read individual records, decompressing only the blocks they live in.
+
+    Readers are shared between sessions, so the block cache is guarded by a lock.
+    """
+
+    def __init__(self, path: Path, *, cache_blocks: int = 8) -> None:
+        self.path = path
+        self._cache: OrderedDict[int, list[bytes]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_blocks = max(1, cache_blocks)
+        with path.open("rb") as fh:
+            if fh.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a block store: {path}")
+            (codec_len,) = struct.unpack("<B", fh.read(1))
+            self.codec = fh.read(codec_len).decode("ascii")
+            self._decompress = _decompressor(self.codec)
+            (header_len,) = struct.unpack("<I", fh.read(4))
+            header = json.loads(self._decompress(fh.read(header_len)).decode("utf-8"))
+            self._data_offset = fh.tell()
+        self.count = int(header["count"])
+        self.block_records = int(header["block_records"])
+        self._blocks = [(int(offset), int(length)) for offset, length in header["blocks"]]
+        meta = header.get("meta")
+        self.meta: dict[str, object] = meta if isinstance(meta, dict) else {}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def get(self, index: int) -> bytes:
+        if index < 0 or index >= self.count:
+            raise IndexError(index)
+        block_id, position = divmod(index, self.block_records)
+        return self._load_block(block_id)[position]
+
+    def get_many(self, indices: list[int]) -> list[bytes]:
+        return [self.get(index) for index in indices]
+
+    def iter_all(self) -> list[bytes]:
+        items: list[bytes] = []
+        for block_id in range(len(self._blocks)):
+            items.extend(self._load_block(block_id))
+        return items
+
+    def _load_block(self, block_id: int) -> list[bytes]:
+        with self._cache_lock:
+            cached = self._cache.get(block_id)
+            if cached is not None:
+                self._cache.move_to_end(block_id)
+                return cached
+        offset, length = self._blocks[block_id]
+        with self.path.open("rb") as fh:
+            fh.seek(self._data_offset + offset)
+            raw = self._decompress(fh.read(length))
+        size = min(self.block_records, self.count - block_id * self.block_records)
+        lengths = struct.unpack(f"<{size}I", raw[: 4 * size])
+        records: list[bytes] = []
+        cursor = 4 * size
+        for item_len in lengths:
+            records.append(raw[cursor : cursor + item_len])
+            cursor += item_len
+        with self._cache_lock:
+            self._cache[block_id] = records
+            self._cache.move_to_end(block_id)
+            while len(self._cache) > self._cache_blocks:
+                self._cache.popitem(last=False)
+        return records
+
+
+def _compressor(codec: str):
+    if codec == "zlib":
+        return lambda data: zlib.compress(data, 6)
+    if codec == "zstd":
+        zstd = importlib.import_module("zstandard")
+        return zstd.ZstdCompressor(level=6).compress
+    return lambda data: data
+
+
+def _decompressor(codec: str):
+    if codec == "zlib":
+        raw = zlib.decompress
+    elif codec == "zstd":
+        if importlib.util.find_spec("zstandard") is None:
+            raise ValueError("Missing optional dependency. Install with: pip install zstandard")
+        zstd = importlib.import_module("zstandard")
+        raw = zstd.ZstdDecompressor().decompress
+    elif codec == "none":
+        return lambda data: data
+    else:
+        raise ValueError(f"Unknown codec: {codec}")
+
+    def decompress(data: bytes) -> bytes:
+        try:
+            return raw(data)
+        except Exception as exc:
+            raise ValueError(f"Corrupt {codec} block: {exc}") from exc
+
+    return decompress
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+"""Pack the most relevant source sentences into a prompt token budget."""
+
+import math
+import re
+
+from app.core.local_sources import SourceChunk
+from app.core.retrieval import tokenize
+
+DEFAULT_CONTEXT_TOKENS = 120
+MAX_SENTENCE_CHARS = 300
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token), good enough for budgeting."""
+    return math.ceil(len(text) / 4)
+
+
+def split_sentences(text: str) -> list[str]:
+    sentences: list[str] = []
+    for piece in _SENTENCE_RE.split(text):
+        sentence = " ".join(piece.split())
+        if not sentence:
+            continue
+        if len(sentence) > MAX_SENTENCE_CHARS:
+            sentence = sentence[:MAX_SENTENCE_CHARS].rstrip() + "..."
+        sentences.append(sentence)
+    return sentences
+
+
+def pack_context(
+    query: str,
+    chunks: list[SourceChunk],
+    *,
+    budget_tokens: int = DEFAULT_CONTEXT_TOKENS,
+) -> list[str]:
+    """Pick the sentences that best match `query` across `chunks` within `budget_tokens`.
+
+    Sentences are scored by the query terms they contain, rarer terms
+    weighing more; ties go to higher-ranked chunks and earlier sentences.
+    Sentences without any query term are left out, so the budget is an
+    upper bound. The selection is returned in document order; if nothing
+    matches, the opening sentences of the best chunk are used.
+    """
+    candidates: list[tuple[int, int, str, set[str]]] = []
+    seen: set[str] = set()
+    for rank, chunk in enumerate(chunks):
+        for position, sentence in enumerate(split_sentences(chunk.text)):
+            if sentence in seen:
+                continue
+            seen.add(sentence)
+            candidates.append((rank, position, sentence, set(tokenize(sentence))))
+    if not candidates or budget_tokens <= 0:
+        return []
+
+    query_terms = set(tokenize(query))
+    doc_freq = {term: sum(1 for *_rest, terms in candidates if term in terms) for term in query_terms}
+    total = len(candidates)
+
+    def score(candidate: tuple[int, int, str, set[str]]) -> float:
+        terms = candidate[3]
+        return sum(math.log(1 + total / doc_freq[term]) for term in query_terms if term in terms)
+
+    ranked = [candidate for candidate in candidates if score(candidate) > 0]
+    if ranked:
+        ranked.sort(key=lambda candidate: (-score(candidate), candidate[0], candidate[1]))
+    else:
+        ranked = candidates
+
+    picked: list[tuple[int, int, str, set[str]]] = []
+    used = 0
+    for candidate in ranked:
+        cost = estimate_tokens(candidate[2])
+        if used + cost > budget_tokens:
+            continue
+        picked.append(candidate)
+        used += cost
+    picked.sort(key=lambda candidate: (candidate[0], candidate[1]))
+    return [candidate[2] for candidate in picked]
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+"""Near-duplicate text detection with SimHash and banded lookup tables."""
+
+import hashlib
+import re
+import unicodedata
+from typing import Callable, Iterable
+
+SIMHASH_BITS = 64
+DEFAULT_MAX_DISTANCE = 3
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize_text(text: str) -> str:
+    """Casefold, strip diacritics and punctuation, keep letters of every script."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(_WORD_RE.findall(stripped))
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word unigrams and bigrams of `text` (already normalized)."""
+    words = text.split()
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    if not features:
+        return 0
+    weights = [0] * SIMHASH_BITS
+    for feature in features:
+        value = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            if value >> bit & 1:
+                weights[bit] += 1
+            else:
+                weights[bit] -= 1
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class NearDuplicateFilter:
+    """Remember fingerprints and reject texts within `max_distance` bits of one seen before.
+
+    The fingerprint is cut into `max_distance + 1` bands. Two fingerprints
+    that differ in at most `max_distance` bits must agree on at least one
+    whole band, so only items sharing a band value are compared. Lookup is
+    close to constant time per item.
+    """
+
+    def __init__(self, *, max_distance: int = DEFAULT_MAX_DISTANCE) -> None:
+        if max_distance < 0 or max_distance >= SIMHASH_BITS // 2:
+            raise ValueError(f"max_distance must be between 0 and {SIMHASH_BITS // 2 - 1}")
+        self.max_distance = max_distance
+        band_count = max_distance + 1
+        width = SIMHASH_BITS // band_count
+        self._bands = [
+            (start, (1 << (width if index < band_count - 1 else SIMHASH_BITS - start)) - 1)
+            for index, start in enumerate(range(0, width * band_count, width))
+        ]
+        self._tables: list[dict[int, list[int]]] = [{} for _ in self._bands]
+        self._fingerprints: list[int] = []
+        self._exact: set[str] = set()
+
+    def add(self, normalized: str) -> bool:
+        """Record `normalized`; return False if it is a (near) duplicate of an earlier text."""
+        if normalized in self._exact:
+            return False
+        fingerprint = simhash(normalized)
+        keys = [(fingerprint >> start) & mask for start, mask in self._bands]
+        for table, key in zip(self._tables, keys):
+            for other in table.get(key, ()):
+                if hamming_distance(fingerprint, self._fingerprints[other]) <= self.max_distance:
+                    return False
+        position = len(self._fingerprints)
+        self._fingerprints.append(fingerprint)
+        self._exact.add(normalized)
+        for table, key in zip(self._tables, keys):
+            table.setdefault(key, []).append(position)
+        return True
+
+
+def dedupe_near(
+    items: Iterable[str],
+    *,
+    max_distance: int = DEFAULT_MAX_DISTANCE,
+    key: Callable[[str], str] = normalize_text,
+) -> list[str]:
+    """Keep the first of every group of near-identical items, preserving order."""
+    seen = NearDuplicateFilter(max_distance=max_distance)
+    return [item for item in items if seen.add(key(item))]
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+"""Streaming keyphrase extraction scored by chunk-level TF-IDF."""
+
+import heapq
+import math
+import re
+from collections import Counter
+from typing import Iterable
+
+from app.core.local_sources import SourceChunk
+from app.core.retrieval import STOPWORDS
+
+# Retrieval's stopwords plus the Czech function words it lacks; words under
+# three letters never become tokens, so they are not listed.
+TOPIC_STOPWORDS = STOPWORDS | {
+    "které", "který", "která", "kterou", "kterým", "tedy", "proto",
+    "může", "muset", "bude", "jsou", "pro", "ale", "tak",
+}
+
+_WORD_SPLIT_RE = re.compile(r"\W+")
+_ALPHA_RE = re.compile(r"[a-zěščřžýáíéúůóťň]")
+
+
+class KeyphraseExtractor:
+    """Count unigrams and bigrams chunk by chunk without keeping the token stream.
+
+    Memory is bounded by the vocabulary, not the corpus length. Phrases are
+    ranked by term frequency weighted with chunk-level inverse document
+    frequency; bigrams are preferred over single words.
+    """
+
+    def __init__(self, *, stopwords: set[str] | None = None) -> None:
+        self.stopwords = TOPIC_STOPWORDS if stopwords is None else stopwords
+        self.chunk_count = 0
+        self.uni_tf: Counter[str] = Counter()
+        self.uni_df: Counter[str] = Counter()
+        self.bi_tf: Counter[str] = Counter()
+        self.bi_df: Counter[str] = Counter()
+        self._alpha: dict[str, bool] = {}
+
+    def add_chunk(self, text: str) -> None:
+        tokens = [
+            token
+            for token in _WORD_SPLIT_RE.split(text.lower())
+            if len(token) > 2 and token not in self.stopwords
+        ]
+        self.chunk_count += 1
+        if not tokens:
+            return
+        unigrams = Counter(token for token in tokens if self._has_alpha(token))
+        bigrams = Counter(
+            f"{a} {b}" for a, b in zip(tokens, tokens[1:]) if self._has_alpha(a) or self._has_alpha(b)
+        )
+        self.uni_tf.update(unigrams)
+        self.uni_df.update(unigrams.keys())
+        self.bi_tf.update(bigrams)
+        self.bi_df.update(bigrams.keys())
+
+    def top(self, k: int) -> list[str]:
+        if k <= 0:
+            return []
+        topics = [phrase for _score, phrase in self._top_scored(self.bi_tf, self.bi_df, k)]
+        if len(topics) < k:
+            chosen = set(topics)
+            for _score, term in self._top_scored(self.uni_tf, self.uni_df, k):
+                if term in chosen:
+                    continue
+                topics.append(term)
+                if len(topics) >= k:
+                    break
+        return topics
+
+    def _top_scored(self, tf: Counter[str], df: Counter[str], k: int) -> list[tuple[float, str]]:
+        total = max(1, self.chunk_count)
+        # Bounded heap: O(V log k) instead of sorting the whole vocabulary.
+        return heapq.nlargest(
+            k,
+            ((count * math.log(1.0 + total / df[phrase]), phrase) for phrase, count in tf.items()),
+            key=lambda item: item[0],
+        )
+
+    def _has_alpha(self, token: str) -> bool:
+        cached = self._alpha.get(token)
+        if cached is None:
+            cached = bool(_ALPHA_RE.search(token))
+            self._alpha[token] = cached
+        return cached
+
+
+def extract_topics(chunks: Iterable[SourceChunk], k: int) -> list[str]:
+    extractor = KeyphraseExtractor()
+    for chunk in chunks:
+        extractor.add_chunk(chunk.text)
+    return extractor.top(k)
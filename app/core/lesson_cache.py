@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+"""Persistent cache of generated lessons with LRU eviction."""
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+from app.core.local_sources import SourceChunk, corpus_fingerprint, ingest_file
+from app.core.question_engine import LESSON_GENERATOR_VERSION, LessonAnalysis, generate_lesson_from_sources
+
+DEFAULT_MAX_ENTRIES = 200
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class LessonKey:
+    fingerprint: str
+    subject: str
+    level: str
+    strictness: int
+    n_total: int
+    preview_len: int
+    per_topic_min: int
+    generator_version: int = LESSON_GENERATOR_VERSION
+
+    def digest(self) -> str:
+        raw = json.dumps(self.__dict__, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LessonCache:
+    """One JSON file per lesson; file mtime doubles as the LRU clock."""
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.directory = directory
+        self.max_entries = max(1, max_entries)
+        self.max_bytes = max(1, max_bytes)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: LessonKey) -> tuple[list[str], LessonAnalysis] | None:
+        path = self._path(key)
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+        if not isinstance(payload, dict) or payload.get("key") != key.__dict__:
+            self.misses += 1
+            return None
+        lesson = payload.get("lesson")
+        analysis = payload.get("analysis")
+        if not isinstance(lesson, list) or not isinstance(analysis, dict):
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return [str(item) for item in lesson], LessonAnalysis(
+            topics=[str(topic) for topic in analysis.get("topics", [])],
+            explicit_questions=[str(question) for question in analysis.get("explicit_questions", [])],
+        )
+
+    def put(self, key: LessonKey, lesson: list[str], analysis: LessonAnalysis) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "key": key.__dict__,
+            "lesson": lesson,
+            "analysis": {"topics": analysis.topics, "explicit_questions": analysis.explicit_questions},
+        }
+        path = self._path(key)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        tmp_path.write_text(json.dumps(payload, ensure_ascii=True), encoding="utf-8")
+        tmp_path.replace(path)
+        self.evict()
+
+    def evict(self) -> int:
+        """Drop least recently used lessons until both caps hold; return the count removed."""
+        entries: list[tuple[int, int, Path]] = []
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        entries.sort()
+        total_bytes = sum(size for _mtime, size, _path in entries)
+        removed = 0
+        while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+            _mtime, size, path = entries.pop(0)
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total_bytes -= size
+            removed += 1
+        return removed
+
+    def _path(self, key: LessonKey) -> Path:
+        return self.directory / f"{key.digest()}.json"
+
+
+def default_cache_dir() -> Path:
+    return Path(__file__).resolve().parents[2] / "uploads" / ".lessons"
+
+
+_DEFAULT_CACHE: LessonCache | None = None
+
+
+def default_cache() -> LessonCache:
+    global _DEFAULT_CACHE
+    if _DEFAULT_CACHE is None:
+        _DEFAULT_CACHE = LessonCache(default_cache_dir())
+    return _DEFAULT_CACHE
+
+
+def generate_lesson_cached(
+    sources: list[SourceChunk],
+    subject: str | None = None,
+    level: str | None = None,
+    strictness: int = 4,
+    *,
+    n_total: int = 30,
+    preview_len: int = 300,
+    per_topic_min: int = 3,
+    cache: LessonCache | None = None,
+) -> tuple[list[str], LessonAnalysis]:
+    """Serve a lesson from the cache, generating and storing it on a miss."""
+    if not sources:
+        return [], LessonAnalysis(topics=[], explicit_questions=[])
+    cache = cache or default_cache()
+    started = time.perf_counter()
+    key = LessonKey(
+        fingerprint=corpus_fingerprint(sources),
+        subject=subject or "obecne",
+        level=level or "zakladni",
+        strictness=strictness,
+        n_total=n_total,
+        preview_len=preview_len,
+        per_topic_min=per_topic_min,
+        generator_version=LESSON_GENERATOR_VERSION,
+    )
+    cached = cache.get(key)
+    if cached is not None:
+        lesson, analysis = cached
+        analysis.timings = {"lookup": time.perf_counter() - started}
+        analysis.cached = True
+        return lesson, analysis
+    lesson, analysis = generate_lesson_from_sources(
+        sources,
+        subject=subject,
+        level=level,
+        strictness=strictness,
+        n_total=n_total,
+        preview_len=preview_len,
+        per_topic_min=per_topic_min,
+        return_meta=True,
+    )
+    cache.put(key, lesson, analysis)
+    return lesson, analysis
+
+
+def prewarm_lessons(
+    paths: list[Path],
+    *,
+    subject: str | None = None,
+    level: str | None = None,
+    strictness: int = 4,
+    n_total: int = 30,
+    preview_len: int = 300,
+    per_topic_min: int = 3,
+    cache: LessonCache | None = None,
+) -> dict[str, int]:
+    """Generate and cache lessons for every file in `paths`.
+
+    Returns the number of lesson items per file name; unreadable files are skipped.
+    """
+    results: dict[str, int] = {}
+    for path in paths:
+        try:
+            chunks = ingest_file(path)
+        except ValueError:
+            continue
+        lesson, _analysis = generate_lesson_cached(
+            chunks,
+            subject=subject,
+            level=level,
+            strictness=strictness,
+            n_total=n_total,
+            preview_len=preview_len,
+            per_topic_min=per_topic_min,
+            cache=cache,
+        )
+        results[path.name] = len(lesson)
+    return results
@@ -2,9 +2,38 @@ from __future__ import annotations
 
 """LLM-backed question generation."""
 
+import time
+from collections import Counter
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Callable
+
+from app.core.context_packer import pack_context
 from app.core.local_sources import SourceChunk, retrieve_chunks
 from app.core.question_engine import Question, QuestionMeta, TYPE_EXPLAIN
-from app.llm.ollama_client import generate
+from app.llm.ollama_client import (
+    DEFAULT_NUM_PARALLEL,
+    OPTION_PRESETS,
+    GenerationResult,
+    llm_available,
+    stream_generate,
+)
+from app.llm.response_cache import ResponseCache, default_response_cache
+from app.llm.router import default_router
+from app.llm.scheduler import PRIORITY_INTERACTIVE, default_scheduler
+
+
+# Concurrent requests per batch: the server's parallelism (OLLAMA_NUM_PARALLEL).
+DEFAULT_MAX_IN_FLIGHT = DEFAULT_NUM_PARALLEL
+
+# Identical for every request so Ollama can reuse its KV cache for it;
+# anything that varies goes after it, most stable first.
+PROMPT_PREFIX = (
+    "You are a tutoring assistant.\n"
+    "Create one short question in Czech without diacritics.\n"
+    "Use the subject, level, and topic.\n"
+    "Return only the question text, no bullets, no numbering.\n"
+)
 
 
 def generate_llm_question(
@@ -16,13 +45,168 @@ def generate_llm_question(
     sources: list[SourceChunk],
     model: str,
     preview_len: int = 300,
+    use_cache: bool = True,
+    cache: ResponseCache | None = None,
+    priority: int = PRIORITY_INTERACTIVE,
+    session: str = "",
+    fast_model: str | None = None,
+    budget_s: float | None = None,
+    on_result: Callable[[GenerationResult], None] | None = None,
 ) -> Question | None:
+    """Ask the LLM for one question; None means the caller should use a template.
+
+    With `budget_s`, the router picks `model` or `fast_model` from observed
+    latencies, and the call gives up (returns None) once the budget is spent.
+    `on_result` receives the timings of a request sent to Ollama (not of a
+    cache hit), so each caller can keep its own.
+    """
+    if not llm_available():
+        # Circuit open: skip retrieval and the request, the caller falls back to templates.
+        return None
+    deadline = None if budget_s is None else time.monotonic() + budget_s
+    model = default_router().choose([model, fast_model] if fast_model else [model], budget_s)
     subject_label = subject or "obecne"
     level_label = level or "zakladni"
     topic_text = topic.strip() if topic else "tematu"
-    retrieved = retrieve_chunks(sources, f"{subject_label} {topic_text} {level_label}", limit=3)
-    prompt = _build_prompt(subject_label, level_label, topic_text, strictness, retrieved)
-    response = generate(prompt, model=model)
+    query = f"{subject_label} {topic_text} {level_label}"
+    retrieved = retrieve_chunks(sources, query, limit=3)
+    prompt = _build_prompt(subject_label, level_label, topic_text, strictness, pack_context(query, retrieved))
+    response_cache = (cache or default_response_cache()) if use_cache else None
+    return _question_from_prompt(
+        prompt,
+        retrieved,
+        subject_label,
+        level_label,
+        topic_text,
+        model=model,
+        preview_len=preview_len,
+        response_cache=response_cache,
+        priority=priority,
+        session=session,
+        deadline=deadline,
+        on_result=on_result,
+    )
+
+
+def generate_llm_questions(
+    topics: list[str | None],
+    subject: str | None,
+    level: str | None,
+    strictness: int,
+    *,
+    sources: list[SourceChunk],
+    model: str,
+    preview_len: int = 300,
+    use_cache: bool = True,
+    cache: ResponseCache | None = None,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    priority: int = PRIORITY_INTERACTIVE,
+    session: str = "",
+    fast_model: str | None = None,
+    budget_s: float | None = None,
+    on_result: Callable[[GenerationResult], None] | None = None,
+) -> list[Question | None]:
+    """Generate one question per entry of `topics` with up to `max_in_flight` concurrent requests.
+
+    Results keep the order of `topics`; failed requests are None so callers
+    can fill them from the template engine. Retrieval runs once per distinct
+    topic, and repeated topics get numbered variants so their prompts differ.
+    `budget_s` bounds the whole batch and `on_result` is called per request,
+    as in `generate_llm_question`.
+    """
+    if not llm_available():
+        return [None] * len(topics)
+    deadline = None if budget_s is None else time.monotonic() + budget_s
+    model = default_router().choose([model, fast_model] if fast_model else [model], budget_s)
+    subject_label = subject or "obecne"
+    level_label = level or "zakladni"
+    response_cache = (cache or default_response_cache()) if use_cache else None
+    topic_texts = [topic.strip() if topic else "tematu" for topic in topics]
+    totals = Counter(topic_texts)
+    retrieved_by_topic: dict[str, list[SourceChunk]] = {}
+    context_by_topic: dict[str, list[str]] = {}
+    occurrences: dict[str, int] = {}
+    jobs: list[tuple[str, str, list[SourceChunk]]] = []
+    for topic_text in topic_texts:
+        if topic_text not in retrieved_by_topic:
+            query = f"{subject_label} {topic_text} {level_label}"
+            retrieved_by_topic[topic_text] = retrieve_chunks(sources, query, limit=3)
+            context_by_topic[topic_text] = pack_context(query, retrieved_by_topic[topic_text])
+        occurrences[topic_text] = occurrences.get(topic_text, 0) + 1
+        retrieved = retrieved_by_topic[topic_text]
+        variant = occurrences[topic_text] if totals[topic_text] > 1 else None
+        prompt = _build_prompt(
+            subject_label, level_label, topic_text, strictness, context_by_topic[topic_text], variant=variant
+        )
+        jobs.append((prompt, topic_text, retrieved))
+
+    def run(job: tuple[str, str, list[SourceChunk]]) -> Question | None:
+        prompt, topic_text, retrieved = job
+        try:
+            return _question_from_prompt(
+                prompt,
+                retrieved,
+                subject_label,
+                level_label,
+                topic_text,
+                model=model,
+                preview_len=preview_len,
+                response_cache=response_cache,
+                priority=priority,
+                session=session,
+                deadline=deadline,
+                on_result=on_result,
+            )
+        except Exception:
+            return None
+
+    if len(jobs) <= 1 or max_in_flight <= 1:
+        return [run(job) for job in jobs]
+    with ThreadPoolExecutor(max_workers=min(max_in_flight, len(jobs)), thread_name_prefix="llm-batch") as pool:
+        return list(pool.map(run, jobs))
+
+
+def _question_from_prompt(
+    prompt: str,
+    retrieved: list[SourceChunk],
+    subject_label: str,
+    level_label: str,
+    topic_text: str,
+    *,
+    model: str,
+    preview_len: int,
+    response_cache: ResponseCache | None,
+    priority: int,
+    session: str,
+    deadline: float | None,
+    on_result: Callable[[GenerationResult], None] | None = None,
+) -> Question | None:
+    options = OPTION_PRESETS["question"]
+    cache_key = ResponseCache.key(prompt, model, {"stop": "first_question", **options})
+    response = response_cache.get(cache_key) if response_cache else None
+    if response is None:
+
+        def request() -> str:
+            # Runs to completion even after the caller's deadline, so the
+            # latency is still observed and the answer still cached.
+            result = stream_generate(prompt, model=model, stop=_question_complete, options=options)
+            if on_result:
+                on_result(result)
+            if not result.error:
+                default_router().observe(model, result.total_s)
+            if response_cache and not _looks_unavailable(result.text):
+                response_cache.put(cache_key, result.text)
+            return result.text
+
+        future = default_scheduler().submit(request, priority=priority, session=session)
+        try:
+            response = future.result(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        except CancelledError:
+            # Stale background work (e.g. a prefetch for a topic the student left).
+            return None
+        except FutureTimeoutError:
+            future.cancel()
+            return None
     cleaned = _extract_question(response)
     if not cleaned or _looks_unavailable(response):
         return None
@@ -45,24 +229,27 @@ def _build_prompt(
     level: str,
     topic: str,
     strictness: int,
-    sources: list[SourceChunk],
+    context: list[str],
+    *,
+    variant: int | None = None,
 ) -> str:
-    header = (
-        "You are a tutoring assistant.\n"
-        "Create one short question in Czech without diacritics.\n"
-        "Use the subject, level, and topic.\n"
-        "Return only the question text, no bullets, no numbering.\n"
-        f"Subject: {subject}\n"
-        f"Level: {level}\n"
-        f"Topic: {topic}\n"
-        f"Strictness: {strictness}\n"
-    )
-    if not sources:
-        return header
-    source_lines = "\n".join(
-        f"- {chunk.text[:300]}" for chunk in sources if chunk.text.strip()
-    )
-    return f"{header}Sources:\n{source_lines}"
+    prompt = f"{PROMPT_PREFIX}Subject: {subject}\nLevel: {level}\nStrictness: {strictness}\n"
+    if context:
+        source_lines = "\n".join(f"- {sentence}" for sentence in context)
+        prompt += f"Sources:\n{source_lines}\n"
+    prompt += f"Topic: {topic}\n"
+    if variant is not None:
+        prompt += f"Variant: {variant} (ask something different from other variants)\n"
+    return prompt
+
+
+def _question_complete(text: str) -> bool:
+    """True once the first line is finished; everything after it is discarded anyway."""
+    stripped = text.lstrip()
+    if not stripped:
+        return False
+    first_line, newline, _rest = stripped.partition("\n")
+    return bool(newline) or first_line.rstrip().endswith("?")
 
 
 def _extract_question(text: str) -> str:
@@ -7,10 +7,64 @@ import importlib
 import importlib.util
 import json
 import re
+import struct
+import threading
+import zlib
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
 
 from app.core import retrieval
+from app.core.blockstore import BlockReader, write_records
+from app.core.question_scanner import ExplicitQuestionScanner
+
+# Codec for on-disk index and chunk caches: "auto" (zstd if installed, else zlib),
+# "zlib", "zstd", or "none" for the legacy uncompressed JSON index.
+INDEX_CODEC = "auto"
+# Open compressed indexes kept in memory, one per indexed corpus.
+MAX_OPEN_INDEXES = 16
+# Corpus metadata kept in memory; the rest is reloaded from .meta.json files.
+MAX_CORPUS_META = 64
+# Errors a damaged, truncated or vanished block file can raise while it is read.
+_BLOCK_ERRORS = (OSError, ValueError, KeyError, struct.error, zlib.error)
+
+
+class _LruCache:
+    """A small process-wide cache that drops its least recently used entry when full."""
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max(1, max_entries)
+        self._items: OrderedDict[object, object] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: object) -> object | None:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key: object, value: object) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def pop(self, key: object) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+_COMPRESSED_INDEXES = _LruCache(MAX_OPEN_INDEXES)
+_CORPUS_META = _LruCache(MAX_CORPUS_META)
 
 
 @dataclass
@@ -22,29 +76,64 @@ class SourceChunk:
 def ingest_file(path: Path, *, chunk_size: int = 400, overlap: int = 40) -> list[SourceChunk]:
     if not path.exists():
         raise ValueError(f"File not found: {path}")
+    chunk_cache = _chunk_cache_path(path, chunk_size=chunk_size, overlap=overlap)
+    if chunk_cache and chunk_cache.exists():
+        cached = _load_cached_chunks(chunk_cache, source=str(path))
+        if cached is not None:
+            return cached
+    chunks = _ingest_uncached(path, chunk_size=chunk_size, overlap=overlap)
+    if chunk_cache and chunks:
+        _save_cached_chunks(chunk_cache, chunks)
+    return chunks
+
+
+def scan_source_questions(path: Path) -> list[str]:
+    """Explicit questions of a source file, scanned line by line.
+
+    Chunking collapses whitespace, so this needs the file itself.
+    """
+    return _scan_blocks(_read_text_blocks(path))
+
+
+def _ingest_uncached(path: Path, *, chunk_size: int, overlap: int) -> list[SourceChunk]:
+    blocks = _read_text_blocks(path)
+    chunks = _chunk_text("\n".join(blocks), source=str(path), chunk_size=chunk_size, overlap=overlap)
+    if chunks:
+        # Scan while the line structure still exists; lessons could not recover it later.
+        fingerprint = corpus_fingerprint(chunks)
+        meta = load_corpus_meta(fingerprint)
+        save_corpus_meta(fingerprint, {**meta, "explicit_questions": _scan_blocks(blocks)})
+    return chunks
+
+
+def _scan_blocks(blocks: list[str]) -> list[str]:
+    scanner = ExplicitQuestionScanner()
+    for index, block in enumerate(blocks):
+        if index:
+            scanner.feed("\n")
+        scanner.feed(block)
+    return scanner.finish()
+
+
+def _read_text_blocks(path: Path) -> list[str]:
     suffix = path.suffix.lower()
     if suffix in {".txt", ".md"}:
-        text = path.read_text(encoding="utf-8", errors="ignore")
-        return _chunk_text(text, source=str(path), chunk_size=chunk_size, overlap=overlap)
+        return [path.read_text(encoding="utf-8", errors="ignore")]
     if suffix == ".pdf":
         _ensure_dependency("pypdf", "pypdf")
         pdf = importlib.import_module("pypdf")
         try:
             reader = pdf.PdfReader(str(path))
-            pages = [page.extract_text() or "" for page in reader.pages]
-            text = "\n".join(pages)
+            return [page.extract_text() or "" for page in reader.pages]
         except Exception:
             # Fallback: some uploaded files may be plain text saved with .pdf extension
             # or malformed PDFs; try to read as text to still extract content.
-            text = path.read_text(encoding="utf-8", errors="ignore")
-        return _chunk_text(text, source=str(path), chunk_size=chunk_size, overlap=overlap)
+            return [path.read_text(encoding="utf-8", errors="ignore")]
     if suffix == ".docx":
         _ensure_dependency("docx", "python-docx")
         docx = importlib.import_module("docx")
         document = docx.Document(str(path))
-        paragraphs = [paragraph.text for paragraph in document.paragraphs]
-        text = "\n".join(paragraphs)
-        return _chunk_text(text, source=str(path), chunk_size=chunk_size, overlap=overlap)
+        return ["\n".join(paragraph.text for paragraph in document.paragraphs)]
     raise ValueError("Unsupported file type. Use txt, md, pdf, or docx.")
 
 
@@ -52,17 +141,72 @@ def retrieve_chunks(chunks: list[SourceChunk], query: str, *, limit: int = 3) ->
     if not chunks:
         return []
     cache_context = _get_cache_context(chunks)
-    if cache_context and cache_context.cache_path.exists():
+    if cache_context and INDEX_CODEC != "none":
+        compressed = _load_compressed_index(cache_context, chunks)
+        if compressed:
+            try:
+                return retrieval.search_compressed(compressed, query, k=limit)
+            except _BLOCK_ERRORS:
+                # Index file deleted or damaged under a cached reader: rebuild it.
+                _COMPRESSED_INDEXES.pop(cache_context.cache_path.with_suffix(".klb"))
+    elif cache_context and cache_context.cache_path.exists():
         cached = _load_cached_index(cache_context, chunks)
         if cached:
             return retrieval.search(cached, query, k=limit)
     results = _simple_retrieve(chunks, query, limit=limit)
     if cache_context:
         index = retrieval.build_index(chunks)
-        _save_cached_index(cache_context, index)
+        if INDEX_CODEC != "none":
+            _save_compressed_index(cache_context, index)
+        else:
+            _save_cached_index(cache_context, index)
     return results
 
 
+def corpus_fingerprint(chunks: list[SourceChunk]) -> str:
+    """Content hash of a chunk list; identical corpora share derived metadata."""
+    digest = hashlib.sha256(str(len(chunks)).encode("ascii"))
+    for chunk in chunks:
+        digest.update(b"\0")
+        digest.update(chunk.text.encode("utf-8", errors="ignore"))
+    return digest.hexdigest()
+
+
+def load_corpus_meta(fingerprint: str) -> dict[str, object]:
+    """Return derived metadata (topics, explicit questions, ...) for a corpus."""
+    cached = _CORPUS_META.get(fingerprint)
+    if cached is not None:
+        return cached
+    meta: dict[str, object] = {}
+    path = _index_dir() / f"{fingerprint}.meta.json"
+    if path.exists():
+        try:
+            payload = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            payload = None
+        if isinstance(payload, dict):
+            meta = payload
+    _CORPUS_META.put(fingerprint, meta)
+    return meta
+
+
+def save_corpus_meta(fingerprint: str, meta: dict[str, object], *, persist: bool = True) -> None:
+    """Store corpus metadata in memory and, when `persist`, next to the index caches."""
+    _CORPUS_META.put(fingerprint, meta)
+    if not persist:
+        return
+    cache_dir = _index_dir()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = cache_dir / f"{fingerprint}.meta.json"
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.write_text(json.dumps(meta, ensure_ascii=True), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+def sources_on_disk(chunks: list[SourceChunk]) -> bool:
+    return bool(chunks) and all(Path(source).exists() for source in {chunk.source for chunk in chunks})
+
+
 def _ensure_dependency(module_name: str, package_name: str) -> None:
     if importlib.util.find_spec(module_name) is None:
         raise ValueError(
@@ -149,6 +293,64 @@ def _save_cached_index(context: _CacheContext, index: retrieval.Index) -> None:
     context.cache_path.write_text(json.dumps(payload), encoding="utf-8")
 
 
+def _load_compressed_index(
+    context: _CacheContext, chunks: list[SourceChunk]
+) -> retrieval.CompressedIndex | None:
+    path = context.cache_path.with_suffix(".klb")
+    loaded = _COMPRESSED_INDEXES.get(path)
+    if loaded is None:
+        if not path.exists():
+            return None
+        loaded = retrieval.load_compressed_index(path, chunks)
+        if loaded is None or loaded.reader.meta.get("chunk_hashes") != context.chunk_hashes:
+            return None
+        _COMPRESSED_INDEXES.put(path, loaded)
+    if len(loaded.doc_len) != len(chunks):
+        return None
+    if loaded.chunks is chunks:
+        return loaded
+    return retrieval.CompressedIndex(
+        chunks=chunks,
+        terms=loaded.terms,
+        df=loaded.df,
+        doc_len=loaded.doc_len,
+        avgdl=loaded.avgdl,
+        reader=loaded.reader,
+    )
+
+
+def _save_compressed_index(context: _CacheContext, index: retrieval.Index) -> None:
+    path = context.cache_path.with_suffix(".klb")
+    retrieval.write_compressed_index(
+        path,
+        index,
+        codec=INDEX_CODEC,
+        meta={"file_hash": context.file_hash, "chunk_hashes": context.chunk_hashes},
+    )
+    _COMPRESSED_INDEXES.pop(path)
+
+
+def _chunk_cache_path(path: Path, *, chunk_size: int, overlap: int) -> Path | None:
+    if INDEX_CODEC == "none":
+        return None
+    cache_dir = _index_dir()
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir / f"{_hash_file(path)}_{chunk_size}_{overlap}.chunks.klb"
+
+
+def _load_cached_chunks(path: Path, *, source: str) -> list[SourceChunk] | None:
+    try:
+        reader = BlockReader(path)
+        texts = [item.decode("utf-8") for item in reader.iter_all()]
+    except _BLOCK_ERRORS:
+        return None
+    return [SourceChunk(text=text, source=source) for text in texts]
+
+
+def _save_cached_chunks(path: Path, chunks: list[SourceChunk]) -> None:
+    write_records(path, [chunk.text.encode("utf-8") for chunk in chunks], codec=INDEX_CODEC)
+
+
 def _index_dir() -> Path:
     return Path(__file__).resolve().parents[2] / "uploads" / ".index"
 
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+"""Background prefetching of upcoming questions for one session."""
+
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable
+
+from app.core.question_engine import Question
+
+
+@dataclass(frozen=True)
+class PrefetchKey:
+    """Everything that decides which question comes next.
+
+    A question generated for one key is never served for another, so a
+    change of subject, level, topic, strictness or LLM settings drops the
+    queue.
+    """
+
+    subject: str | None
+    level: str | None
+    topic: str | None
+    strictness: int
+    prefer_easy: bool
+    llm_enabled: bool
+    llm_model: str
+    source_count: int
+    llm_fast_model: str | None = None
+    llm_cache: bool = True
+    llm_budget_s: float | None = None
+
+
+class QuestionPrefetcher:
+    """Keep up to `depth` questions ready, generated on a daemon worker thread.
+
+    `on_wait(True)` is called when take() starts waiting for the worker and
+    `on_wait(False)` when it stops, so the caller can raise the priority of
+    the work a student is now waiting for.
+    """
+
+    def __init__(
+        self,
+        produce: Callable[[PrefetchKey], Question],
+        *,
+        depth: int = 2,
+        on_wait: Callable[[bool], None] | None = None,
+    ) -> None:
+        self._produce = produce
+        self._on_wait = on_wait
+        self.depth = max(1, depth)
+        self._queue: deque[Question] = deque()
+        self._key: PrefetchKey | None = None
+        self._generation = 0
+        self._failed = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="question-prefetch", daemon=True)
+        self._thread.start()
+        self.hits = 0
+        self.misses = 0
+
+    def take(self, key: PrefetchKey, *, wait_s: float | None = None) -> Question | None:
+        """Pop a ready question for `key`, or return None so the caller generates inline.
+
+        If the queue is empty, wait up to `wait_s` seconds for the worker's
+        result instead of issuing a duplicate request; on a new `key` the
+        worker is switched to it first. None means the worker failed or did
+        not finish in time.
+        """
+        with self._cond:
+            if key != self._key:
+                self._reset(key)
+            must_wait = not self._queue and not self._failed
+        if must_wait:
+            if self._on_wait:
+                self._on_wait(True)
+            try:
+                with self._cond:
+                    self._cond.wait_for(
+                        lambda: self._queue or self._failed or self._closed or self._key != key,
+                        timeout=wait_s,
+                    )
+            finally:
+                if self._on_wait:
+                    self._on_wait(False)
+        with self._cond:
+            if self._queue and self._key == key:
+                question = self._queue.popleft()
+                self._failed = False
+                self._cond.notify_all()
+                self.hits += 1
+                return question
+            self._failed = False
+            self._cond.notify_all()
+            self.misses += 1
+            return None
+
+    def prime(self, key: PrefetchKey) -> None:
+        """Start filling the queue for `key` ahead of the next take()."""
+        with self._cond:
+            if key != self._key:
+                self._reset(key)
+
+    def invalidate(self) -> None:
+        with self._cond:
+            self._reset(None)
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._queue.clear()
+            self._cond.notify_all()
+        # close() may run from a finalizer on the worker thread itself.
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout=1.0)
+
+    def _reset(self, key: PrefetchKey | None) -> None:
+        self._key = key
+        self._generation += 1
+        self._queue.clear()
+        self._failed = False
+        self._cond.notify_all()
+
+    def _needs_work(self) -> bool:
+        return (
+            self._closed
+            or (self._key is not None and not self._failed and len(self._queue) < self.depth)
+        )
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(self._needs_work)
+                if self._closed:
+                    return
+                key = self._key
+                generation = self._generation
+            question: Question | None = None
+            try:
+                question = self._produce(key)
+            except Exception:
+                question = None
+            with self._cond:
+                if generation == self._generation:
+                    if question is None:
+                        # Stop retrying until the next take(); avoids a hot loop on errors.
+                        self._failed = True
+                    else:
+                        self._queue.append(question)
+                self._cond.notify_all()
@@ -4,11 +4,15 @@ from __future__ import annotations
 
 import random
 import re
-from collections import Counter
-from dataclasses import dataclass
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
 from typing import Iterable
 
+from app.core.dedupe import DEFAULT_MAX_DISTANCE, dedupe_near, normalize_text
+from app.core.keyphrases import extract_topics
 from app.core.local_sources import SourceChunk
+from app.core.question_scanner import scan_text_blocks
 
 SUPPORTIVE_TONES = [
     "Zkusme to spolu v klidu.",
@@ -28,6 +32,15 @@ STRICT_TONES = [
     "Disciplina. Strucna odpoved.",
 ]
 
+# SimHash bits two lesson questions may differ by and still count as duplicates.
+NEAR_DUPLICATE_DISTANCE = DEFAULT_MAX_DISTANCE
+# Bump when generate_lesson_from_sources produces different lessons for the
+# same input; cached lessons of other versions are then regenerated.
+LESSON_GENERATOR_VERSION = 1
+
+_PREVIEW_RE = re.compile(r"\n\[From document: .*\]\s*$", re.DOTALL)
+_ORIGIN_TAG_RE = re.compile(r"^\[(?:Generated|From document)\]\s*")
+
 TYPE_FACT = "TYPE_FACT"
 TYPE_EXPLAIN = "TYPE_EXPLAIN"
 TYPE_ANALYZE = "TYPE_ANALYZE"
@@ -241,6 +254,56 @@ DEFAULT_TEMPLATES = {
 }
 
 
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """Template pre-split around `{topic}` so filling is a plain join."""
+
+    template_id: str
+    text_parts: tuple[str, ...]
+    keyword_parts: tuple[tuple[str, ...], ...]
+    difficulty: str
+    question_type: str
+    expected_answer: float | None
+
+    def fill(self, topic: str) -> tuple[str, list[str]]:
+        text = topic.join(self.text_parts)
+        keywords = [topic.join(parts) for parts in self.keyword_parts]
+        return text, keywords
+
+
+_COMPILED_CHOICES: dict[tuple[str, str, bool], tuple[CompiledTemplate, ...]] = {}
+
+
+def compile_template(template: Template) -> CompiledTemplate:
+    return CompiledTemplate(
+        template_id=str(template.get("id", "unknown")),
+        text_parts=tuple(str(template["text"]).split("{topic}")),
+        keyword_parts=tuple(
+            tuple(str(keyword).split("{topic}")) for keyword in template.get("keywords", [])
+        ),
+        difficulty=str(template.get("difficulty", "easy")),
+        question_type=str(template.get("type", TYPE_EXPLAIN)),
+        expected_answer=_coerce_expected_answer(template.get("expected_answer")),
+    )
+
+
+def compiled_choices(subject: str, level: str, *, prefer_easy: bool = False) -> tuple[CompiledTemplate, ...]:
+    """Return the compiled template pool for a subject/level, built once per key."""
+    key = (subject, level, prefer_easy)
+    cached = _COMPILED_CHOICES.get(key)
+    if cached is not None:
+        return cached
+    templates = SUBJECT_TEMPLATES.get(subject, DEFAULT_TEMPLATES)
+    choices = [compile_template(template) for template in templates.get(level, DEFAULT_TEMPLATES[level])]
+    if prefer_easy:
+        easy_choices = [template for template in choices if template.difficulty == "easy"]
+        if easy_choices:
+            choices = easy_choices
+    compiled = tuple(choices)
+    _COMPILED_CHOICES[key] = compiled
+    return compiled
+
+
 def generate_question(
     subject: str | None,
     level: str | None,
@@ -251,50 +314,73 @@ def generate_question(
     sources: list[SourceChunk] | None = None,
     preview_len: int = 300,
 ) -> Question:
+    return generate_questions(
+        1,
+        subject,
+        level,
+        topic,
+        strictness,
+        prefer_easy=prefer_easy,
+        sources=sources,
+        preview_len=preview_len,
+    )[0]
+
+
+def generate_questions(
+    n: int,
+    subject: str | None,
+    level: str | None,
+    topic: str | None,
+    strictness: int,
+    *,
+    prefer_easy: bool = False,
+    sources: list[SourceChunk] | None = None,
+    preview_len: int = 300,
+    rng: random.Random | None = None,
+) -> list[Question]:
+    """Generate `n` template questions sharing one retrieval and one RNG."""
+    chooser = rng or random
     normalized_subject = subject or "obecne"
     normalized_level = _normalize_level(level)
     topic_text = topic.strip() if topic else "tematu"
-    
-    # Get base question from templates
-    templates = SUBJECT_TEMPLATES.get(normalized_subject, DEFAULT_TEMPLATES)
-    choices = templates.get(normalized_level, DEFAULT_TEMPLATES[normalized_level])
+    choices = compiled_choices(normalized_subject, normalized_level, prefer_easy=prefer_easy)
 
-    if prefer_easy:
-        easy_choices = [template for template in choices if template.get("difficulty") == "easy"]
-        if easy_choices:
-             choices = easy_choices
-    selected = random.choice(choices)
-
-    # Build question text
-    text = str(selected["text"]).format(topic=topic_text)
-    
-    # If sources available, retrieve relevant context and add context hint
+    # All questions of a batch use the same query, so retrieve the context once.
+    preview = ""
     if sources:
         query = f"{normalized_subject} {topic_text} {normalized_level}"
-        text = _attach_document_preview(text, sources, query, preview_len)
-    
-    keywords = [str(keyword).format(topic=topic_text) for keyword in selected.get("keywords", [])]
-    meta = QuestionMeta(
-        subject=normalized_subject,
-        level=normalized_level,
-        topic=topic_text,
-        template_id=str(selected.get("id", "unknown")),
-        expected_keywords=keywords,
-        difficulty_tag=str(selected.get("difficulty", "easy")),
-        question_type=str(selected.get("type", TYPE_EXPLAIN)),
-        expected_answer=_coerce_expected_answer(selected.get("expected_answer")),
-    )
-
+        preview = _document_preview(sources, query, preview_len)
+
+    questions: list[Question] = []
+    for _ in range(max(0, n)):
+        selected = chooser.choice(choices)
+        text, keywords = selected.fill(topic_text)
+        text = _with_preview(text, preview)
+        meta = QuestionMeta(
+            subject=normalized_subject,
+            level=normalized_level,
+            topic=topic_text,
+            template_id=selected.template_id,
+            expected_keywords=keywords,
+            difficulty_tag=selected.difficulty,
+            question_type=selected.question_type,
+            expected_answer=selected.expected_answer,
+        )
+        questions.append(Question(text=_apply_tone(text, topic_text, strictness, chooser), meta=meta))
+    return questions
+
+
+def _apply_tone(text: str, topic_text: str, strictness: int, chooser) -> str:
     if strictness <= 2:
-        tone = random.choice(SUPPORTIVE_TONES)
-        return Question(text=f"{tone} {text}", meta=meta)
+        tone = chooser.choice(SUPPORTIVE_TONES)
+        return f"{tone} {text}"
     if strictness == 3:
-        tone = random.choice(NEUTRAL_TONES)
-        return Question(text=f"{tone} Otazka: {text}", meta=meta)
-    tone = random.choice(STRICT_TONES)
+        tone = chooser.choice(NEUTRAL_TONES)
+        return f"{tone} Otazka: {text}"
+    tone = chooser.choice(STRICT_TONES)
     step_1 = "Krok 1: Ujasni si pojmy."
     step_2 = f"Krok 2: Zamer se na {topic_text}."
-    return Question(text=f"{tone} {step_1} {step_2} Otazka: {text}", meta=meta)
+    return f"{tone} {step_1} {step_2} Otazka: {text}"
 
 
 def _normalize_level(level: str | None) -> str:
@@ -309,102 +395,88 @@ def _coerce_expected_answer(value: object) -> float | None:
     return None
 
 
-def _extract_explicit_questions_from_text(text: str) -> list[str]:
-    """Extract obviously formatted questions from a block of text.
-
-    Looks for numbered lists (e.g. "1) ...", "1.") and headings like
-    "Názorné otázky" followed by lines that look like questions.
-    """
-    questions: list[str] = []
-    # numbered items like '1) ...' or '1. ...'
-    for m in re.finditer(r"^\s*(?:\d+\)|\d+\.)\s*(.+)$", text, flags=re.MULTILINE):
-        q = m.group(1).strip()
-        if q and len(q) > 10:
-            questions.append(q)
-
-    # sections with the word 'otáz' (covers 'otázky' / 'otázka')
-    for m in re.finditer(r"(?mi)(?:názorné\s+otázky|otázky|otázka)\s*[:\-]?\s*\n(.*?)\n\n", text + "\n\n"):
-        block = m.group(1).strip()
-        for line in block.splitlines():
-            line = line.strip()
-            if line and len(line) > 10:
-                questions.append(line)
-
-    # deduplicate while preserving order
-    seen = set()
-    out = []
-    for q in questions:
-        if q not in seen:
-            seen.add(q)
-            out.append(q)
-    return out
-
-
 @dataclass
 class LessonAnalysis:
     topics: list[str]
     explicit_questions: list[str]
+    timings: dict[str, float] = field(default_factory=dict)
+    cached: bool = False
 
 
 def analyze_sources(sources: Iterable[SourceChunk], *, topic_k: int = 6) -> LessonAnalysis:
     if not sources:
         return LessonAnalysis(topics=[], explicit_questions=[])
-    full = "\n\n".join(chunk.text for chunk in sources)
-    explicit = _extract_explicit_questions_from_text(full)
-    topics = _select_topics_from_sources(sources, topic_k)
-    return LessonAnalysis(topics=topics, explicit_questions=explicit)
-
-
-def _select_topics_from_sources(sources: Iterable[SourceChunk], k: int) -> list[str]:
-    """Select up to `k` topic phrases from sources using simple unigram+bigram scoring.
-
-    This is a lightweight keyphrase extractor that prefers frequent bigrams,
-    falling back to frequent unigrams. Does not require external libraries.
+    from app.core.local_sources import corpus_fingerprint, load_corpus_meta, save_corpus_meta, sources_on_disk
+
+    chunks = list(sources)
+    timings: dict[str, float] = {}
+    started = time.perf_counter()
+    fingerprint = corpus_fingerprint(chunks)
+    meta = load_corpus_meta(fingerprint)
+    timings["fingerprint"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    explicit = meta.get("explicit_questions")
+    if not isinstance(explicit, list):
+        explicit = _explicit_questions(chunks)
+        meta = {**meta, "explicit_questions": explicit}
+        save_corpus_meta(fingerprint, meta, persist=sources_on_disk(chunks))
+    timings["explicit"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    cached_topics = meta.get("topics")
+    if not isinstance(cached_topics, dict):
+        cached_topics = {}
+    topics = cached_topics.get(str(topic_k))
+    if not isinstance(topics, list):
+        topics = extract_topics(chunks, topic_k)
+        cached_topics[str(topic_k)] = topics
+        save_corpus_meta(fingerprint, {**meta, "topics": cached_topics}, persist=sources_on_disk(chunks))
+    timings["topics"] = time.perf_counter() - started
+    return LessonAnalysis(topics=list(topics), explicit_questions=list(explicit), timings=timings)
+
+
+def _explicit_questions(chunks: list[SourceChunk]) -> list[str]:
+    """Merge the per-file scans stored at ingest, without duplicates across files.
+
+    A file without a stored scan (its metadata was lost while its chunks
+    stayed cached) is scanned again from disk, where its lines still exist.
     """
-    full = "\n\n".join(chunk.text for chunk in sources)
-    text = full.lower()
-
-    # Basic tokenization
-    tokens = [t for t in re.split(r"\W+", text) if t and len(t) > 2]
-
-    stopwords = {
-        "které", "který", "která", "tedy", "proto", "kterou", "kterým",
-        "může", "muset", "bude", "jsou", "je", "se", "s", "v", "na",
-        "do", "pro", "za", "od", "ale", "ne", "od", "tak", "co",
-    }
-
-    filtered = [t for t in tokens if t not in stopwords]
-
-    # unigrams frequency
-    uni_freq = Counter(filtered)
-
-    # bigrams frequency (adjacent tokens)
-    bigrams = []
-    for a, b in zip(filtered, filtered[1:]):
-        if a not in stopwords and b not in stopwords:
-            bigrams.append(f"{a} {b}")
-    bi_freq = Counter(bigrams)
-
-    # Score bigrams higher to prefer phrase topics
-    candidates = []
-    for phrase, score in bi_freq.most_common():
-        candidates.append((phrase, score * 2))
-    for term, score in uni_freq.most_common():
-        candidates.append((term, score))
-
-    seen = set()
-    topics: list[str] = []
-    for phrase, _ in candidates:
-        if phrase in seen:
-            continue
-        # prefer phrases with at least one alphabetic char
-        if not re.search(r"[a-zěščřžýáíéúůóťň]+", phrase):
-            continue
-        seen.add(phrase)
-        topics.append(phrase)
-        if len(topics) >= k:
-            break
-    return topics
+    from app.core.local_sources import corpus_fingerprint, load_corpus_meta, save_corpus_meta, sources_on_disk
+
+    by_source: dict[str, list[SourceChunk]] = {}
+    for chunk in chunks:
+        by_source.setdefault(chunk.source, []).append(chunk)
+    questions: list[str] = []
+    seen: set[str] = set()
+    for source, group in by_source.items():
+        fingerprint = corpus_fingerprint(group) if len(by_source) > 1 else None
+        # A single file's fingerprint is the corpus one the caller already missed.
+        stored = load_corpus_meta(fingerprint).get("explicit_questions") if fingerprint else None
+        if not isinstance(stored, list):
+            stored = _rescan_source(source, group)
+            if fingerprint:
+                meta = {**load_corpus_meta(fingerprint), "explicit_questions": stored}
+                save_corpus_meta(fingerprint, meta, persist=sources_on_disk(group))
+        for question in stored:
+            key = _normalize_question(question)
+            if key not in seen:
+                seen.add(key)
+                questions.append(question)
+    return questions
+
+
+def _rescan_source(source: str, group: list[SourceChunk]) -> list[str]:
+    from app.core.local_sources import scan_source_questions
+
+    path = Path(source)
+    if path.exists():
+        try:
+            return scan_source_questions(path)
+        except (OSError, ValueError):
+            pass
+    # Chunks were joined by blank lines historically, so a chunk boundary ends a section.
+    return scan_text_blocks([chunk.text for chunk in group], separator="\n\n")
 
 
 def generate_lesson_from_sources(
@@ -417,10 +489,13 @@ def generate_lesson_from_sources(
     preview_len: int = 300,
     per_topic_min: int = 3,
     return_meta: bool = False,
+    dedupe_distance: int = NEAR_DUPLICATE_DISTANCE,
 ) -> list[str] | tuple[list[str], LessonAnalysis]:
     """Create a lesson: extract explicit questions from sources and generate additional ones.
 
     Returns a list of question texts (strings) combining extracted and generated items.
+    Per-stage timings (seconds) are recorded in `LessonAnalysis.timings`.
+    Questions within `dedupe_distance` SimHash bits of an earlier one are dropped.
     """
     if not sources:
         return [] if not return_meta else ([], LessonAnalysis(topics=[], explicit_questions=[]))
@@ -435,58 +510,55 @@ def generate_lesson_from_sources(
 
     combined: list[str] = [f"[From document] {q}" for q in explicit]
     target_count = max(n_total, len(combined))
+    per_topic = max(1, per_topic_min)
+
+    # Every variant of a topic uses the same retrieval query, so resolve it once.
+    started = time.perf_counter()
+    previews: dict[str, str] = {}
+
+    def topic_preview(topic: str) -> str:
+        if topic not in previews:
+            previews[topic] = _document_preview(sources, f"{subject_label} {topic} {level_label}", preview_len)
+        return previews[topic]
 
     generated: list[str] = []
     for topic in topics:
         variants = _topic_question_variants(topic, subject_label)
-        for base in variants[: max(1, per_topic_min)]:
-            question = _attach_document_preview(
-                base,
-                sources,
-                f"{subject_label} {topic} {level_label}",
-                preview_len,
-            )
-            generated.append(f"[Generated] {question}")
+        for base in variants[:per_topic]:
+            generated.append(f"[Generated] {_with_preview(base, topic_preview(topic))}")
 
     if len(combined) + len(generated) < target_count:
         for topic in topics:
             variants = _topic_question_variants(topic, subject_label)
-            for base in variants[max(1, per_topic_min) :]:
+            for base in variants[per_topic:]:
                 if len(combined) + len(generated) >= target_count:
                     break
-                question = _attach_document_preview(
-                    base,
-                    sources,
-                    f"{subject_label} {topic} {level_label}",
-                    preview_len,
-                )
-                generated.append(f"[Generated] {question}")
+                generated.append(f"[Generated] {_with_preview(base, topic_preview(topic))}")
             if len(combined) + len(generated) >= target_count:
                 break
+    analysis.timings["previews"] = time.perf_counter() - started
 
+    started = time.perf_counter()
     combined.extend(generated)
-    combined = _dedupe_questions(combined)
+    combined = _dedupe_questions(combined, max_distance=dedupe_distance)
     if len(combined) > target_count:
         combined = combined[:target_count]
+    analysis.timings["assemble"] = time.perf_counter() - started
     if return_meta:
         return combined, analysis
     return combined
 
 
-def _attach_document_preview(
-    question: str,
-    sources: list[SourceChunk],
-    query: str,
-    preview_len: int,
-) -> str:
-    if not sources:
-        return question
+def _document_preview(sources: list[SourceChunk], query: str, preview_len: int) -> str:
     from app.core.local_sources import retrieve_chunks
 
     retrieved = retrieve_chunks(sources, query, limit=1)
     if not retrieved:
-        return question
-    preview = _clip_text(retrieved[0].text, preview_len)
+        return ""
+    return _clip_text(retrieved[0].text, preview_len)
+
+
+def _with_preview(question: str, preview: str) -> str:
     if not preview:
         return question
     return f"{question}\n[From document: {preview}]"
@@ -513,19 +585,13 @@ def _topic_question_variants(topic: str, subject: str) -> list[str]:
     return variants
 
 
-def _dedupe_questions(items: list[str]) -> list[str]:
-    seen: set[str] = set()
-    deduped: list[str] = []
-    for item in items:
-        key = _normalize_question(item)
-        if key in seen:
-            continue
-        seen.add(key)
-        deduped.append(item)
-    return deduped
+def _dedupe_questions(items: list[str], *, max_distance: int = NEAR_DUPLICATE_DISTANCE) -> list[str]:
+    return dedupe_near(items, max_distance=max_distance, key=_normalize_question)
 
 
 def _normalize_question(text: str) -> str:
-    lowered = text.lower()
-    normalized = re.sub(r"[^a-z0-9]+", " ", lowered)
-    return " ".join(normalized.split())
+    # Compare the question itself, not its origin tag or the attached preview,
+    # which is shared by every question of a topic.
+    question = _PREVIEW_RE.sub("", text)
+    question = _ORIGIN_TAG_RE.sub("", question)
+    return normalize_text(question)
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+"""Line-oriented streaming scanner for questions written out in source text."""
+
+import re
+
+NUMBERED_RE = re.compile(r"^\s*(?:\d+\)|\d+\.)\s*(.+)$")
+HEADING_RE = re.compile(r"(?i)(?:názorné\s+otázky|otázky|otázka)\s*[:\-]?\s*$")
+MIN_QUESTION_LEN = 10
+
+
+class ExplicitQuestionScanner:
+    """Find numbered items and lines under "otázky" headings, one line at a time.
+
+    Text can be fed in arbitrary pieces (pages, chunks): a trailing partial
+    line and the open-section state carry over to the next `feed`. Repeated
+    questions, e.g. from overlapping chunks, are reported once.
+    """
+
+    def __init__(self) -> None:
+        self.questions: list[str] = []
+        self._seen: set[str] = set()
+        self._partial = ""
+        self._in_section = False
+
+    def feed(self, text: str) -> None:
+        if not text:
+            return
+        data = self._partial + text
+        lines = data.split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._scan_line(line)
+
+    def finish(self) -> list[str]:
+        if self._partial:
+            self._scan_line(self._partial)
+            self._partial = ""
+        self._in_section = False
+        return self.questions
+
+    def _scan_line(self, line: str) -> None:
+        stripped = line.strip()
+        if not stripped:
+            self._in_section = False
+            return
+        match = NUMBERED_RE.match(line)
+        if match:
+            self._add(match.group(1).strip())
+        if self._in_section:
+            self._add(stripped)
+        elif HEADING_RE.search(stripped):
+            self._in_section = True
+
+    def _add(self, question: str) -> None:
+        if len(question) > MIN_QUESTION_LEN and question not in self._seen:
+            self._seen.add(question)
+            self.questions.append(question)
+
+
+def scan_text_blocks(blocks: list[str], *, separator: str = "\n") -> list[str]:
+    scanner = ExplicitQuestionScanner()
+    for index, block in enumerate(blocks):
+        if index:
+            scanner.feed(separator)
+        scanner.feed(block)
+    return scanner.finish()
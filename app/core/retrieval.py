@@ -4,10 +4,14 @@ from __future__ import annotations
 
 import math
 import re
+import struct
 from collections import Counter
 from dataclasses import dataclass
+from pathlib import Path
 from typing import TYPE_CHECKING
 
+from app.core.blockstore import BlockReader, write_records
+
 if TYPE_CHECKING:
     from app.core.local_sources import SourceChunk
 
@@ -48,6 +52,24 @@ class Index:
     avgdl: float
 
 
+@dataclass
+class CompressedIndex:
+    """BM25 index whose postings stay compressed on disk until a query needs them."""
+
+    chunks: list["SourceChunk"]
+    terms: dict[str, int]
+    df: list[int]
+    doc_len: list[int]
+    avgdl: float
+    reader: BlockReader
+
+    def postings(self, term: str) -> list[tuple[int, int]]:
+        term_id = self.terms.get(term)
+        if term_id is None:
+            return []
+        return _decode_postings(self.reader.get(term_id))
+
+
 def tokenize(text: str) -> list[str]:
     tokens = [t for t in TOKEN_RE.split(text.lower()) if len(t) > 2]
     return [t for t in tokens if t not in STOPWORDS]
@@ -77,8 +99,6 @@ def search(index: Index, query: str, *, k: int = 3) -> list["SourceChunk"]:
     total_docs = len(index.chunks)
     scores: list[tuple[float, int]] = []
     avgdl = index.avgdl or 1.0
-    k1 = 1.5
-    b = 0.75
     for doc_id, tf in enumerate(index.tf):
         score = 0.0
         doc_length = index.doc_len[doc_id] if doc_id < len(index.doc_len) else 0
@@ -86,10 +106,7 @@ def search(index: Index, query: str, *, k: int = 3) -> list["SourceChunk"]:
             freq = tf.get(term, 0)
             if not freq:
                 continue
-            doc_freq = index.df.get(term, 0)
-            idf = math.log(1.0 + (total_docs - doc_freq + 0.5) / (doc_freq + 0.5))
-            denom = freq + k1 * (1 - b + b * (doc_length / avgdl))
-            score += idf * (freq * (k1 + 1)) / denom
+            score += _bm25_term(freq, index.df.get(term, 0), doc_length, total_docs, avgdl)
         scores.append((score, doc_id))
     scores.sort(reverse=True)
     if not scores or scores[0][0] <= 0:
@@ -97,6 +114,118 @@ def search(index: Index, query: str, *, k: int = 3) -> list["SourceChunk"]:
     return [index.chunks[doc_id] for score, doc_id in scores[:k] if score > 0]
 
 
+def search_compressed(index: CompressedIndex, query: str, *, k: int = 3) -> list["SourceChunk"]:
+    """Same ranking as `search`, but only touches postings of the query terms."""
+    if not index.chunks:
+        return []
+    tokens = tokenize(query)
+    if not tokens:
+        return index.chunks[:k]
+    total_docs = len(index.chunks)
+    avgdl = index.avgdl or 1.0
+    scores: dict[int, float] = {}
+    postings_cache: dict[str, list[tuple[int, int]]] = {}
+    for term in tokens:
+        if term not in postings_cache:
+            postings_cache[term] = index.postings(term)
+        term_id = index.terms.get(term)
+        doc_freq = index.df[term_id] if term_id is not None else 0
+        for doc_id, freq in postings_cache[term]:
+            doc_length = index.doc_len[doc_id] if doc_id < len(index.doc_len) else 0
+            scores[doc_id] = scores.get(doc_id, 0.0) + _bm25_term(
+                freq, doc_freq, doc_length, total_docs, avgdl
+            )
+    ranked = sorted(((score, doc_id) for doc_id, score in scores.items() if score > 0), reverse=True)
+    if not ranked:
+        return index.chunks[:k]
+    return [index.chunks[doc_id] for _score, doc_id in ranked[:k] if doc_id < len(index.chunks)]
+
+
+def write_compressed_index(
+    path: Path,
+    index: Index,
+    *,
+    codec: str = "auto",
+    meta: dict[str, object] | None = None,
+) -> None:
+    """Store `index` as term-id postings in a block-compressed file.
+
+    Each term string is written once in the header vocabulary instead of once
+    per document, and postings are delta-encoded before compression.
+    """
+    terms = sorted(index.df)
+    term_ids = {term: term_id for term_id, term in enumerate(terms)}
+    postings: list[list[int]] = [[] for _ in terms]
+    for doc_id, tf in enumerate(index.tf):
+        for term, freq in tf.items():
+            postings[term_ids[term]].extend((doc_id, freq))
+    header = dict(meta or {})
+    header.update(
+        {
+            "version": 2,
+            "terms": terms,
+            "df": [index.df[term] for term in terms],
+            "doc_len": index.doc_len,
+        }
+    )
+    write_records(path, [_encode_postings(items) for items in postings], meta=header, codec=codec)
+
+
+def load_compressed_index(path: Path, chunks: list["SourceChunk"]) -> CompressedIndex | None:
+    try:
+        reader = BlockReader(path)
+    except (OSError, ValueError, KeyError, struct.error):
+        return None
+    meta = reader.meta
+    terms = meta.get("terms")
+    df = meta.get("df")
+    doc_len = meta.get("doc_len")
+    if meta.get("version") != 2:
+        return None
+    if not isinstance(terms, list) or not isinstance(df, list) or not isinstance(doc_len, list):
+        return None
+    if len(doc_len) != len(chunks) or len(terms) != len(df) or len(terms) != len(reader):
+        return None
+    doc_len_int = [int(length) for length in doc_len]
+    avgdl = sum(doc_len_int) / len(doc_len_int) if doc_len_int else 0.0
+    return CompressedIndex(
+        chunks=chunks,
+        terms={str(term): term_id for term_id, term in enumerate(terms)},
+        df=[int(value) for value in df],
+        doc_len=doc_len_int,
+        avgdl=avgdl,
+        reader=reader,
+    )
+
+
+def _bm25_term(freq: int, doc_freq: int, doc_length: int, total_docs: int, avgdl: float) -> float:
+    k1 = 1.5
+    b = 0.75
+    idf = math.log(1.0 + (total_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+    denom = freq + k1 * (1 - b + b * (doc_length / avgdl))
+    return idf * (freq * (k1 + 1)) / denom
+
+
+def _encode_postings(flat: list[int]) -> bytes:
+    deltas: list[int] = []
+    previous = 0
+    for position in range(0, len(flat), 2):
+        doc_id, freq = flat[position], flat[position + 1]
+        deltas.extend((doc_id - previous, freq))
+        previous = doc_id
+    return struct.pack(f"<{len(deltas)}I", *deltas)
+
+
+def _decode_postings(raw: bytes) -> list[tuple[int, int]]:
+    values = struct.unpack(f"<{len(raw) // 4}I", raw)
+    postings: list[tuple[int, int]] = []
+    doc_id = 0
+    for position in range(0, len(values), 2):
+        doc_id += values[position]
+        postings.append((doc_id, values[position + 1]))
+    return postings
+
+
 def index_to_cache(index: Index) -> dict[str, object]:
     return {
         "version": 1,
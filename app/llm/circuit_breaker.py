@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+"""Circuit breaker that stops calling an LLM server that keeps failing."""
+
+import threading
+import time
+from typing import Callable
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Fail fast after `failure_threshold` consecutive failures.
+
+    While open, requests are refused without touching the network. A daemon
+    thread calls `probe` every `probe_interval_s` and closes the circuit as
+    soon as it succeeds. Without a probe (or if it keeps failing), one trial
+    request is let through after `cooldown_s`; its outcome closes or reopens
+    the circuit.
+    """
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int = 3,
+        cooldown_s: float = 30.0,
+        probe: Callable[[], bool] | None = None,
+        probe_interval_s: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_s = cooldown_s
+        self.probe = probe
+        self.probe_interval_s = probe_interval_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._probe_thread: threading.Thread | None = None
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def is_open(self) -> bool:
+        """True while requests would be refused (open and still cooling down)."""
+        with self._lock:
+            if self._state == STATE_CLOSED:
+                return False
+            if self._state == STATE_OPEN and self._clock() - self._opened_at >= self.cooldown_s:
+                return False
+            return self._state == STATE_OPEN or self._trial_in_flight
+
+    def retry_in(self) -> float:
+        with self._lock:
+            if self._state != STATE_OPEN:
+                return 0.0
+            return max(0.0, self.cooldown_s - (self._clock() - self._opened_at))
+
+    def allow(self) -> bool:
+        """Return True if a request may go out now."""
+        with self._lock:
+            if self._state == STATE_CLOSED:
+                return True
+            if self._state == STATE_OPEN and self._clock() - self._opened_at >= self.cooldown_s:
+                self._state = STATE_HALF_OPEN
+            if self._state == STATE_HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._close_locked()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == STATE_HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = STATE_OPEN
+                self._opened_at = self._clock()
+                self._trial_in_flight = False
+                self._start_probe_locked()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._close_locked()
+
+    def _close_locked(self) -> None:
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._trial_in_flight = False
+
+    def _start_probe_locked(self) -> None:
+        if self.probe is None or self._probe_thread is not None:
+            return
+        self._probe_thread = threading.Thread(target=self._probe_loop, name="llm-health-probe", daemon=True)
+        self._probe_thread.start()
+
+    def _probe_loop(self) -> None:
+        while True:
+            time.sleep(self.probe_interval_s)
+            with self._lock:
+                if self._state == STATE_CLOSED:
+                    self._probe_thread = None
+                    return
+            try:
+                healthy = bool(self.probe())
+            except Exception:
+                healthy = False
+            if healthy:
+                with self._lock:
+                    self._close_locked()
+                    self._probe_thread = None
+                return
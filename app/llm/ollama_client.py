@@ -2,29 +2,406 @@ from __future__ import annotations
 
 """Minimal Ollama client wrapper."""
 
+import http.client
 import json
-from urllib.error import URLError
-from urllib.request import Request, urlopen
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+from urllib.parse import urlsplit
 
-OLLAMA_URL = "http://localhost:11434/api/generate"
-DEFAULT_MODEL = "llama3.1"
+from app.llm.circuit_breaker import CircuitBreaker
+from app.llm.single_flight import SingleFlight
+
+
+def _base_url_from_env() -> str:
+    # Same variable the Ollama CLI reads; scheme and port are optional ("host:port").
+    host = os.environ.get("OLLAMA_HOST", "").strip().rstrip("/")
+    if not host:
+        return "http://localhost:11434"
+    url = host if "://" in host else f"http://{host}"
+    return url if urlsplit(url).port else f"{url}:11434"
 
 
-def generate(prompt: str, *, model: str = DEFAULT_MODEL, timeout_s: int = 30) -> str:
-    payload = {"model": model, "prompt": prompt, "stream": False}
-    data = json.dumps(payload).encode("utf-8")
-    request = Request(OLLAMA_URL, data=data, headers={"Content-Type": "application/json"})
+def _num_parallel_from_env(default: int = 4) -> int:
+    # Requests the server runs at once per model; set it to the server's own
+    # OLLAMA_NUM_PARALLEL so batches neither queue on the server nor idle slots.
     try:
-        with urlopen(request, timeout=timeout_s) as response:
-            body = response.read().decode("utf-8")
-        parsed = json.loads(body)
+        return max(1, int(os.environ.get("OLLAMA_NUM_PARALLEL", "")))
+    except ValueError:
+        return default
+
+
+DEFAULT_BASE_URL = _base_url_from_env()
+DEFAULT_NUM_PARALLEL = _num_parallel_from_env()
+DEFAULT_MODEL = "llama3.1"
+HEALTH_TTL_S = 10.0
+# How long the server keeps the model loaded after a request (Ollama's own default is 5m).
+DEFAULT_KEEP_ALIVE = "30m"
+
+# Generation options per use case. Questions are one short line, so the
+# completion is capped well above a long question and far below a lecture.
+OPTION_PRESETS: dict[str, dict[str, object]] = {
+    "question": {"num_predict": 64, "temperature": 0.7, "num_ctx": 2048},
+    "lesson": {"num_predict": 512, "temperature": 0.5, "num_ctx": 4096},
+}
+
+NOT_RUNNING_MESSAGE = "Ollama is not running. Start it with: ollama serve"
+
+
+@dataclass
+class GenerationResult:
+    text: str
+    first_token_s: float | None
+    total_s: float
+    stopped_early: bool = False
+    error: str | None = None
+
+
+class OllamaClient:
+    """Thread-safe Ollama client that reuses keep-alive HTTP connections.
+
+    Idle connections are kept in a small pool; a request takes one (or opens
+    a new one when none is idle) and returns it once the response body has
+    been read. A pooled connection the server already closed is retried
+    once on a fresh connection.
+
+    Connection failures and timeouts feed a circuit breaker: once it opens,
+    requests return the "not running" message immediately and a background
+    `/api/tags` probe closes it again when the server is back.
+
+    Concurrent calls with byte-identical requests share one in flight
+    (`coalesce=True`); `single_flight` counts issued and coalesced calls.
+    """
+
+    def __init__(
+        self,
+        base_url: str = DEFAULT_BASE_URL,
+        *,
+        timeout_s: float = 30,
+        connect_timeout_s: float = 5,
+        pool_size: int = DEFAULT_NUM_PARALLEL,
+        failure_threshold: int = 3,
+        cooldown_s: float = 30.0,
+        probe_interval_s: float = 5.0,
+        keep_alive: str | None = DEFAULT_KEEP_ALIVE,
+        coalesce: bool = True,
+    ) -> None:
+        parts = urlsplit(base_url)
+        if parts.scheme not in {"http", "https"} or not parts.hostname:
+            raise ValueError(f"Invalid Ollama base URL: {base_url}")
+        self.base_url = base_url.rstrip("/")
+        self.timeout_s = timeout_s
+        self.connect_timeout_s = connect_timeout_s
+        self.pool_size = max(1, pool_size)
+        self.keep_alive = keep_alive
+        self.coalesce = coalesce
+        self.single_flight: SingleFlight[object] = SingleFlight()
+        self._scheme = parts.scheme
+        self._host = parts.hostname
+        self._port = parts.port or (443 if parts.scheme == "https" else 80)
+        self._prefix = parts.path.rstrip("/")
+        self._idle: list[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self._health: tuple[float, bool] | None = None
+        self.breaker = CircuitBreaker(
+            failure_threshold=failure_threshold,
+            cooldown_s=cooldown_s,
+            probe=lambda: self.check_health(max_age_s=0),
+            probe_interval_s=probe_interval_s,
+        )
+
+    def available(self) -> bool:
+        """False while the circuit is open; costs no network round trip."""
+        return not self.breaker.is_open()
+
+    def check_health(self, *, max_age_s: float = HEALTH_TTL_S) -> bool:
+        """Probe `/api/tags`, reusing a result younger than `max_age_s`."""
+        now = time.monotonic()
+        if self._health is not None and now - self._health[0] < max_age_s:
+            return self._health[1]
+        try:
+            status, _data = self._request("GET", "/api/tags", None, timeout_s=self.connect_timeout_s)
+            healthy = status < 400
+        except Exception:
+            healthy = False
+        self._health = (time.monotonic(), healthy)
+        return healthy
+
+    def warm_up(self, model: str = DEFAULT_MODEL, *, timeout_s: float | None = None) -> bool:
+        """Load `model` into memory with an empty prompt, which generates no tokens."""
+        if not self.breaker.allow():
+            return False
+        try:
+            self.post_json("/api/generate", self._payload(model, "", stream=False, options=None), timeout_s=timeout_s)
+        except OSError:
+            self.breaker.record_failure()
+            return False
+        except Exception:
+            self.breaker.record_success()
+            return False
+        self.breaker.record_success()
+        return True
+
+    def generate(
+        self,
+        prompt: str,
+        *,
+        model: str = DEFAULT_MODEL,
+        options: dict[str, object] | None = None,
+        timeout_s: float | None = None,
+    ) -> str:
+        payload = self._payload(model, prompt, stream=False, options=options)
+        body = json.dumps(payload, sort_keys=True)
+        if not self.coalesce:
+            return self._generate(payload, timeout_s)
+        return self.single_flight.do(("generate", body), lambda: self._generate(payload, timeout_s))
+
+    def _generate(self, payload: dict[str, object], timeout_s: float | None) -> str:
+        if not self.breaker.allow():
+            return NOT_RUNNING_MESSAGE
+        try:
+            parsed = self.post_json("/api/generate", payload, timeout_s=timeout_s)
+        except TimeoutError:
+            self.breaker.record_failure()
+            return "Ollama request timed out. Try again."
+        except OSError:
+            self.breaker.record_failure()
+            return NOT_RUNNING_MESSAGE
+        except Exception as exc:  # pragma: no cover - unexpected runtime error
+            self.breaker.record_success()
+            return f"Ollama error: {exc}"
+        self.breaker.record_success()
         reply = str(parsed.get("response", "")).strip()
         if reply:
             return reply
         return "Ollama returned an empty response."
-    except URLError:
-        return "Ollama is not running. Start it with: ollama serve"
-    except TimeoutError:
-        return "Ollama request timed out. Try again."
-    except Exception as exc:  # pragma: no cover - unexpected runtime error
-        return f"Ollama error: {exc}"
+
+    def stream_generate(
+        self,
+        prompt: str,
+        *,
+        model: str = DEFAULT_MODEL,
+        stop: Callable[[str], bool] | None = None,
+        options: dict[str, object] | None = None,
+        timeout_s: float | None = None,
+    ) -> GenerationResult:
+        """Consume Ollama's NDJSON stream, closing it as soon as `stop(text)` is true.
+
+        The result carries time to first token and total time; on failure its
+        text is the same human-readable message `generate` returns.
+        """
+        body = json.dumps(self._payload(model, prompt, stream=True, options=options), sort_keys=True).encode("utf-8")
+        if not self.coalesce:
+            return self._stream_generate(body, stop, timeout_s)
+        # The stop predicate shapes the result, so callers share a request only if they share it.
+        return self.single_flight.do(
+            ("stream", body, id(stop)), lambda: self._stream_generate(body, stop, timeout_s)
+        )
+
+    def _stream_generate(
+        self, body: bytes, stop: Callable[[str], bool] | None, timeout_s: float | None
+    ) -> GenerationResult:
+        started = time.perf_counter()
+        first_token_s: float | None = None
+        parts: list[str] = []
+        stopped_early = False
+        if not self.breaker.allow():
+            return self._finish(NOT_RUNNING_MESSAGE, started, None, error="circuit_open")
+        try:
+            connection, response = self._open("POST", "/api/generate", body, timeout_s=timeout_s)
+            try:
+                if response.status >= 400:
+                    detail = response.read(200).decode("utf-8", errors="ignore")
+                    raise RuntimeError(f"HTTP {response.status}: {detail}")
+                while True:
+                    line = response.readline()
+                    if not line:
+                        break
+                    if not line.strip():
+                        continue
+                    event = json.loads(line.decode("utf-8"))
+                    token = str(event.get("response", ""))
+                    if token:
+                        if first_token_s is None:
+                            first_token_s = time.perf_counter() - started
+                        parts.append(token)
+                        if stop is not None and stop("".join(parts)):
+                            stopped_early = True
+                            break
+                    if event.get("done"):
+                        break
+            except BaseException:
+                connection.close()
+                raise
+            if stopped_early or response.will_close:
+                # Unread stream data would poison a pooled connection.
+                connection.close()
+            else:
+                response.read()
+                self._release(connection)
+        except TimeoutError:
+            self.breaker.record_failure()
+            return self._finish("Ollama request timed out. Try again.", started, first_token_s, error="timeout")
+        except OSError:
+            self.breaker.record_failure()
+            return self._finish(NOT_RUNNING_MESSAGE, started, None, error="unavailable")
+        except Exception as exc:  # pragma: no cover - unexpected runtime error
+            # The server answered (e.g. HTTP 500), so it is reachable.
+            self.breaker.record_success()
+            return self._finish(f"Ollama error: {exc}", started, first_token_s, error="error")
+        self.breaker.record_success()
+        text = "".join(parts).strip() or "Ollama returned an empty response."
+        return self._finish(text, started, first_token_s, stopped_early=stopped_early)
+
+    def _payload(
+        self, model: str, prompt: str, *, stream: bool, options: dict[str, object] | None
+    ) -> dict[str, object]:
+        payload: dict[str, object] = {"model": model, "prompt": prompt, "stream": stream}
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        if options:
+            payload["options"] = options
+        return payload
+
+    def _finish(
+        self,
+        text: str,
+        started: float,
+        first_token_s: float | None,
+        *,
+        stopped_early: bool = False,
+        error: str | None = None,
+    ) -> GenerationResult:
+        return GenerationResult(
+            text=text,
+            first_token_s=first_token_s,
+            total_s=time.perf_counter() - started,
+            stopped_early=stopped_early,
+            error=error,
+        )
+
+    def post_json(self, path: str, payload: dict[str, object], *, timeout_s: float | None = None) -> dict[str, object]:
+        body = json.dumps(payload).encode("utf-8")
+        status, data = self._request("POST", path, body, timeout_s=timeout_s)
+        if status >= 400:
+            raise RuntimeError(f"HTTP {status}: {data[:200].decode('utf-8', errors='ignore')}")
+        parsed = json.loads(data.decode("utf-8"))
+        return parsed if isinstance(parsed, dict) else {}
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def _request(self, method: str, path: str, body: bytes | None, *, timeout_s: float | None) -> tuple[int, bytes]:
+        connection, response = self._open(method, path, body, timeout_s=timeout_s)
+        try:
+            data = response.read()
+        except BaseException:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(connection)
+        return response.status, data
+
+    def _open(
+        self, method: str, path: str, body: bytes | None, *, timeout_s: float | None
+    ) -> tuple[http.client.HTTPConnection, http.client.HTTPResponse]:
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        for attempt in range(2):
+            connection, reused = self._acquire()
+            try:
+                if connection.sock is None:
+                    connection.connect()
+                    connection.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                connection.sock.settimeout(self.timeout_s if timeout_s is None else timeout_s)
+                connection.request(method, f"{self._prefix}{path}", body=body, headers=headers)
+                return connection, connection.getresponse()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                connection.close()
+                if reused and attempt == 0:
+                    continue
+                raise
+            except BaseException:
+                connection.close()
+                raise
+        raise ConnectionError("Ollama connection failed")  # pragma: no cover - loop always returns
+
+    def _acquire(self) -> tuple[http.client.HTTPConnection, bool]:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+            self.connections_opened += 1
+        connection_class = http.client.HTTPSConnection if self._scheme == "https" else http.client.HTTPConnection
+        return connection_class(self._host, self._port, timeout=self.connect_timeout_s), False
+
+    def _release(self, connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+
+_DEFAULT_CLIENT: OllamaClient | None = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def default_client() -> OllamaClient:
+    global _DEFAULT_CLIENT
+    with _DEFAULT_LOCK:
+        if _DEFAULT_CLIENT is None:
+            _DEFAULT_CLIENT = OllamaClient()
+        return _DEFAULT_CLIENT
+
+
+def configure_default_client(base_url: str = DEFAULT_BASE_URL, **options: object) -> OllamaClient:
+    """Replace the shared client, e.g. to point at another host or change timeouts."""
+    global _DEFAULT_CLIENT
+    client = OllamaClient(base_url, **options)
+    with _DEFAULT_LOCK:
+        previous, _DEFAULT_CLIENT = _DEFAULT_CLIENT, client
+    if previous is not None:
+        previous.close()
+    return client
+
+
+def llm_available() -> bool:
+    return default_client().available()
+
+
+def warm_up(model: str = DEFAULT_MODEL, *, background: bool = True) -> None:
+    """Load `model` ahead of the first question; in a daemon thread unless `background` is False."""
+    client = default_client()
+    if not background:
+        client.warm_up(model)
+        return
+    threading.Thread(target=client.warm_up, args=(model,), name="llm-warm-up", daemon=True).start()
+
+
+def generate(
+    prompt: str,
+    *,
+    model: str = DEFAULT_MODEL,
+    options: dict[str, object] | None = None,
+    timeout_s: int = 30,
+) -> str:
+    return default_client().generate(prompt, model=model, options=options, timeout_s=timeout_s)
+
+
+def stream_generate(
+    prompt: str,
+    *,
+    model: str = DEFAULT_MODEL,
+    stop: Callable[[str], bool] | None = None,
+    options: dict[str, object] | None = None,
+    timeout_s: int = 30,
+) -> GenerationResult:
+    return default_client().stream_generate(prompt, model=model, stop=stop, options=options, timeout_s=timeout_s)
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+"""Content-addressed on-disk cache of LLM responses."""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_TTL_S = 7 * 24 * 3600
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_VARIANTS = 1
+
+
+class ResponseCache:
+    """Map (prompt, model, options) to stored responses.
+
+    By default the first stored response is served on every later lookup.
+    Callers can opt into diversity mode with `variants` > 1: a key then
+    counts as a miss until it holds that many distinct responses, after
+    which lookups rotate through them. Responses expire after `ttl_s`; the
+    directory is kept under `max_bytes` by evicting least recently used keys.
+
+    Hits never touch the disk: the rotation cursor and the recency used for
+    eviction are kept in memory.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        *,
+        ttl_s: float = DEFAULT_TTL_S,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        variants: int = DEFAULT_VARIANTS,
+        enabled: bool = True,
+    ) -> None:
+        self.directory = directory
+        self.ttl_s = ttl_s
+        self.max_bytes = max(1, max_bytes)
+        self.variants = max(1, variants)
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._cursors: dict[str, int] = {}
+        self._last_used: dict[str, float] = {}
+
+    @staticmethod
+    def key(prompt: str, model: str, options: dict[str, object] | None = None) -> str:
+        raw = json.dumps({"prompt": prompt, "model": model, "options": options or {}}, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._read(key)
+            responses = entry["responses"] if entry else []
+            if len(responses) < self.variants:
+                self.misses += 1
+                return None
+            cursor = self._cursors.get(key, 0) % len(responses)
+            if self.variants > 1:
+                self._cursors[key] = cursor + 1
+            self._last_used[key] = time.time()
+            self.hits += 1
+            return responses[cursor]["text"]
+
+    def put(self, key: str, response: str) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            entry = self._read(key) or {"responses": []}
+            responses = entry["responses"]
+            if any(item["text"] == response for item in responses):
+                return
+            responses.append({"text": response, "created": time.time()})
+            del responses[: -self.variants]
+            self._write(key, entry)
+            self._last_used[key] = time.time()
+            self._evict()
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in self.directory.glob("*.json"):
+                path.unlink(missing_ok=True)
+            self._cursors.clear()
+            self._last_used.clear()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _read(self, key: str) -> dict[str, object] | None:
+        try:
+            entry = json.loads(self._path(key).read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return None
+        if not isinstance(entry, dict) or not isinstance(entry.get("responses"), list):
+            return None
+        now = time.time()
+        entry["responses"] = [
+            item
+            for item in entry["responses"]
+            if isinstance(item, dict)
+            and isinstance(item.get("text"), str)
+            and isinstance(item.get("created", 0), (int, float))
+            and now - float(item.get("created", 0)) <= self.ttl_s
+        ]
+        return entry
+
+    def _write(self, key: str, entry: dict[str, object]) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        tmp_path.write_text(json.dumps(entry, ensure_ascii=True), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def _evict(self) -> None:
+        entries: list[tuple[float, int, Path]] = []
+        for path in self.directory.glob("*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            used = max(stat.st_mtime, self._last_used.get(path.stem, 0.0))
+            entries.append((used, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _used, size, _path in entries)
+        while entries and total > self.max_bytes:
+            _used, size, path = entries.pop(0)
+            path.unlink(missing_ok=True)
+            self._cursors.pop(path.stem, None)
+            self._last_used.pop(path.stem, None)
+            total -= size
+
+
+def default_cache_dir() -> Path:
+    return Path(__file__).resolve().parents[1] / "storage" / "llm_cache"
+
+
+_DEFAULT_CACHE: ResponseCache | None = None
+
+
+def default_response_cache() -> ResponseCache:
+    global _DEFAULT_CACHE
+    if _DEFAULT_CACHE is None:
+        _DEFAULT_CACHE = ResponseCache(default_cache_dir())
+    return _DEFAULT_CACHE
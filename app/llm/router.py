@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+"""Choose an LLM model that fits a latency budget from observed latencies."""
+
+import threading
+import time
+
+# Time a student waits for an LLM question before the template engine answers.
+DEFAULT_LATENCY_BUDGET_S = 8.0
+EWMA_ALPHA = 0.3
+# An over-budget estimate older than this is retried once, so a model can
+# recover from a slow outlier such as a cold load.
+DEFAULT_RETRY_AFTER_S = 300.0
+
+
+class ModelRouter:
+    """Keep an exponentially weighted moving average of each model's latency.
+
+    `choose` walks the candidate models best first and returns the first
+    whose average fits the budget. A model without observations counts as
+    fitting, so it gets tried once. If none fits, the fastest is returned;
+    the caller's deadline still decides whether its answer is used.
+
+    An estimate that has not been updated for `retry_after_s` counts as
+    unknown again: the model is chosen for one probe request, and the
+    probe's latency replaces the stale average instead of blending into it.
+    """
+
+    def __init__(self, *, alpha: float = EWMA_ALPHA, retry_after_s: float = DEFAULT_RETRY_AFTER_S) -> None:
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.retry_after_s = retry_after_s
+        self._ewma: dict[str, float] = {}
+        self._updated: dict[str, float] = {}
+        self._probing: set[str] = set()
+        self._lock = threading.Lock()
+
+    def observe(self, model: str, seconds: float) -> None:
+        with self._lock:
+            previous = self._ewma.get(model)
+            if previous is None or model in self._probing:
+                self._ewma[model] = seconds
+            else:
+                self._ewma[model] = previous + self.alpha * (seconds - previous)
+            self._updated[model] = time.monotonic()
+            self._probing.discard(model)
+
+    def estimate(self, model: str) -> float | None:
+        with self._lock:
+            return self._ewma.get(model)
+
+    def estimates(self) -> dict[str, float]:
+        with self._lock:
+            return dict(self._ewma)
+
+    def choose(self, models: list[str], budget_s: float | None) -> str:
+        if not models:
+            raise ValueError("No models to choose from")
+        if budget_s is None or len(models) == 1:
+            return models[0]
+        with self._lock:
+            now = time.monotonic()
+            for model in models:
+                estimate = self._ewma.get(model)
+                if estimate is None or estimate <= budget_s:
+                    return model
+                if now - self._updated[model] >= self.retry_after_s:
+                    # Restart the clock so concurrent callers do not all probe,
+                    # and a probe that is never observed is retried later.
+                    self._probing.add(model)
+                    self._updated[model] = now
+                    return model
+            return min(models, key=lambda model: self._ewma[model])
+
+
+_DEFAULT_ROUTER: ModelRouter | None = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def default_router() -> ModelRouter:
+    global _DEFAULT_ROUTER
+    with _DEFAULT_LOCK:
+        if _DEFAULT_ROUTER is None:
+            _DEFAULT_ROUTER = ModelRouter()
+        return _DEFAULT_ROUTER
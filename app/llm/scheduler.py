@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+"""Priority scheduling of LLM requests shared by all sessions of one process."""
+
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Callable, TypeVar
+
+from app.llm.ollama_client import DEFAULT_NUM_PARALLEL
+
+T = TypeVar("T")
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_PREFETCH = 1
+PRIORITY_BATCH = 2
+PRIORITIES = (PRIORITY_INTERACTIVE, PRIORITY_PREFETCH, PRIORITY_BATCH)
+
+DEFAULT_MAX_CONCURRENCY = DEFAULT_NUM_PARALLEL
+
+
+@dataclass
+class _Job:
+    fn: Callable[[], object]
+    priority: int
+    session: str
+    future: Future = field(default_factory=Future)
+
+
+class LlmScheduler:
+    """Run LLM calls on `max_concurrency` workers, interactive work first.
+
+    Queued jobs are served by priority class (interactive, prefetch,
+    batch) and round-robin across sessions within a class, so one session
+    cannot starve the others. Background classes never hold more than
+    `max_concurrency - reserved_interactive` workers, which keeps a slot
+    free for a student who is waiting. Queued jobs can be cancelled; a job
+    that already started runs to completion. A session marked urgent (a
+    student is waiting for its prefetch) has its prefetch work served as
+    interactive.
+    """
+
+    def __init__(self, *, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, reserved_interactive: int = 1) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.background_limit = max(1, self.max_concurrency - max(0, reserved_interactive))
+        self._queues: dict[int, OrderedDict[str, deque[_Job]]] = {priority: OrderedDict() for priority in PRIORITIES}
+        self._running = 0
+        self._running_background = 0
+        self._closed = False
+        self._urgent: set[str] = set()
+        self._cond = threading.Condition()
+        self.completed = 0
+        self.cancelled = 0
+        self._workers = [
+            threading.Thread(target=self._work, name=f"llm-scheduler-{index}", daemon=True)
+            for index in range(self.max_concurrency)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, fn: Callable[[], T], *, priority: int = PRIORITY_INTERACTIVE, session: str = "") -> Future:
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+        job = _Job(fn=fn, priority=priority, session=session)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Scheduler is closed")
+            if priority == PRIORITY_PREFETCH and session in self._urgent:
+                job.priority = PRIORITY_INTERACTIVE
+            self._queues[job.priority].setdefault(session, deque()).append(job)
+            self._cond.notify_all()
+        return job.future
+
+    def run(self, fn: Callable[[], T], *, priority: int = PRIORITY_INTERACTIVE, session: str = "") -> T:
+        """Submit `fn` and wait for its result; raises CancelledError if it was cancelled first."""
+        return self.submit(fn, priority=priority, session=session).result()
+
+    def cancel(self, session: str, *, priority: int | None = None) -> int:
+        """Drop queued jobs of `session` (only of class `priority`, if given)."""
+        dropped: list[_Job] = []
+        with self._cond:
+            for level in PRIORITIES if priority is None else (priority,):
+                dropped.extend(self._queues[level].pop(session, ()))
+            self.cancelled += len(dropped)
+        for job in dropped:
+            job.future.cancel()
+        return len(dropped)
+
+    def set_urgent(self, session: str, urgent: bool) -> None:
+        """While `urgent`, queue `session`'s prefetch jobs, queued or new, as interactive."""
+        with self._cond:
+            if not urgent:
+                self._urgent.discard(session)
+                return
+            self._urgent.add(session)
+            jobs = self._queues[PRIORITY_PREFETCH].pop(session, None)
+            if jobs:
+                for job in jobs:
+                    job.priority = PRIORITY_INTERACTIVE
+                self._queues[PRIORITY_INTERACTIVE].setdefault(session, deque()).extend(jobs)
+                self._cond.notify_all()
+
+    def pending(self) -> dict[int, int]:
+        with self._cond:
+            return {level: sum(len(jobs) for jobs in queue.values()) for level, queue in self._queues.items()}
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            dropped = [job for queue in self._queues.values() for jobs in queue.values() for job in jobs]
+            for queue in self._queues.values():
+                queue.clear()
+            self._cond.notify_all()
+        for job in dropped:
+            job.future.cancel()
+        for worker in self._workers:
+            worker.join(timeout=1.0)
+
+    def _next_job(self) -> _Job | None:
+        for level in PRIORITIES:
+            queue = self._queues[level]
+            if not queue:
+                continue
+            if level != PRIORITY_INTERACTIVE and self._running_background >= self.background_limit:
+                return None
+            # Round-robin: serve the first session, then move it to the back.
+            session, jobs = next(iter(queue.items()))
+            job = jobs.popleft()
+            if jobs:
+                queue.move_to_end(session)
+            else:
+                del queue[session]
+            return job
+        return None
+
+    def _work(self) -> None:
+        while True:
+            with self._cond:
+                job = None
+                while not self._closed:
+                    job = self._next_job()
+                    if job is not None:
+                        break
+                    self._cond.wait()
+                if job is None:
+                    return
+                self._running += 1
+                background = job.priority != PRIORITY_INTERACTIVE
+                if background:
+                    self._running_background += 1
+            if job.future.set_running_or_notify_cancel():
+                try:
+                    job.future.set_result(job.fn())
+                except BaseException as exc:
+                    job.future.set_exception(exc)
+            with self._cond:
+                self._running -= 1
+                if background:
+                    self._running_background -= 1
+                self.completed += 1
+                self._cond.notify_all()
+
+
+_DEFAULT_SCHEDULER: LlmScheduler | None = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def default_scheduler() -> LlmScheduler:
+    global _DEFAULT_SCHEDULER
+    with _DEFAULT_LOCK:
+        if _DEFAULT_SCHEDULER is None:
+            _DEFAULT_SCHEDULER = LlmScheduler()
+        return _DEFAULT_SCHEDULER
+
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+"""Local stand-in for the Ollama HTTP API, for benchmarks and tests."""
+
+import argparse
+import json
+import random
+import re
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubOllamaServer:
+    """Serve `/api/generate` and `/api/tags` on localhost with a fixed reply and optional latency.
+
+    Like Ollama, requests stream NDJSON unless they send `"stream": false`.
+    The reply is streamed word by word with `token_delay_s` between tokens.
+    At most `max_concurrency` generations run at once and the rest wait,
+    like Ollama with OLLAMA_NUM_PARALLEL. A share `error_rate` of
+    generations fails with HTTP `error_status` (seeded, so runs repeat).
+
+    With `prompt_token_delay_s`, prompt processing costs that much per
+    prompt token before the first token. As in Ollama, the part of the
+    prompt shared with the previous request is served from cache and free.
+    The first request pays `load_s` for loading the model. An empty prompt
+    only loads it and generates nothing; the `num_predict` option caps the
+    number of streamed tokens.
+    """
+
+    def __init__(
+        self,
+        *,
+        reply: str = "Co je inflace?",
+        latency_s: float = 0.0,
+        token_delay_s: float = 0.0,
+        prompt_token_delay_s: float = 0.0,
+        load_s: float = 0.0,
+        max_concurrency: int | None = None,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.reply = reply
+        self.latency_s = latency_s
+        self.token_delay_s = token_delay_s
+        self.prompt_token_delay_s = prompt_token_delay_s
+        self.load_s = load_s
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.connections = 0
+        self.requests = 0
+        self.errors = 0
+        self.streams_aborted = 0
+        self.active = 0
+        self.peak_active = 0
+        self.prompt_tokens = 0
+        self.warmups = 0
+        self.last_payload: dict[str, object] = {}
+        self.prompt_tokens_evaluated = 0
+        self._last_prompt = ""
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def setup(self) -> None:
+                super().setup()
+                # Go's net/http (and so Ollama) disables Nagle; mirror that.
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with server._lock:
+                    server.connections += 1
+
+            def do_GET(self) -> None:  # noqa: N802 - http.server naming
+                if self.path.rstrip("/") != "/api/tags":
+                    self.send_error(404)
+                    return
+                with server._lock:
+                    server.requests += 1
+                self._send_json({"models": [{"name": "stub"}]})
+
+            def do_POST(self) -> None:  # noqa: N802 - http.server naming
+                length = int(self.headers.get("Content-Length", "0"))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if self.path.rstrip("/") != "/api/generate":
+                    self.send_error(404)
+                    return
+                with server._lock:
+                    server.requests += 1
+                    failed = server._random.random() < server.error_rate
+                if server._slots:
+                    server._slots.acquire()
+                with server._lock:
+                    server.active += 1
+                    server.peak_active = max(server.peak_active, server.active)
+                try:
+                    self._generate(payload, failed)
+                finally:
+                    with server._lock:
+                        server.active -= 1
+                    if server._slots:
+                        server._slots.release()
+
+            def _generate(self, payload: dict[str, object], failed: bool) -> None:
+                prompt = str(payload.get("prompt", ""))
+                with server._lock:
+                    server.last_payload = payload
+                with server._load_lock:
+                    if not server._loaded:
+                        time.sleep(server.load_s)
+                        server._loaded = True
+                if not prompt:
+                    with server._lock:
+                        server.warmups += 1
+                    self._send_json({"response": "", "done": True, "done_reason": "load"})
+                    return
+                with server._lock:
+                    cached = _common_prefix_len(server._last_prompt, prompt)
+                    server._last_prompt = prompt
+                    evaluated = _estimate_tokens(prompt[cached:])
+                    server.prompt_tokens += _estimate_tokens(prompt)
+                    server.prompt_tokens_evaluated += evaluated
+                delay = server.latency_s + server.prompt_token_delay_s * evaluated
+                if delay:
+                    time.sleep(delay)
+                if failed:
+                    with server._lock:
+                        server.errors += 1
+                    self._send_json({"error": "injected failure"}, status=server.error_status)
+                    return
+                tokens = _tokens(server.reply)
+                options = payload.get("options")
+                if isinstance(options, dict) and isinstance(options.get("num_predict"), int):
+                    tokens = tokens[: max(0, options["num_predict"])]
+                if payload.get("stream", True) is False:
+                    # A full completion costs the same generation time as the whole stream.
+                    if server.token_delay_s:
+                        time.sleep(server.token_delay_s * len(tokens))
+                    self._send_json({"response": "".join(tokens), "done": True})
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                try:
+                    for token in tokens:
+                        self._send_chunk({"response": token, "done": False})
+                        if server.token_delay_s:
+                            time.sleep(server.token_delay_s)
+                    self._send_chunk({"response": "", "done": True})
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    with server._lock:
+                        server.streams_aborted += 1
+                    self.close_connection = True
+
+            def _send_json(self, data: dict[str, object], *, status: int = 200) -> None:
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_chunk(self, data: dict[str, object]) -> None:
+                line = json.dumps(data).encode("utf-8") + b"\n"
+                self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+
+            def log_message(self, format: str, *args: object) -> None:
+                return
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "StubOllamaServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def _estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def _common_prefix_len(a: str, b: str) -> int:
+    limit = min(len(a), len(b))
+    index = 0
+    while index < limit and a[index] == b[index]:
+        index += 1
+    return index
+
+
+def _tokens(text: str) -> list[str]:
+    # Word-sized pieces with their leading whitespace, roughly like model tokens.
+    return re.findall(r"\s*\S+|\s+", text)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve a fake Ollama API for benchmarks.")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--reply", default="Co je inflace?")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between tokens")
+    parser.add_argument("--prompt-token-delay", type=float, default=0.0, help="seconds per uncached prompt token")
+    parser.add_argument("--max-concurrency", type=int, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server = StubOllamaServer(
+        reply=args.reply,
+        latency_s=args.latency,
+        token_delay_s=args.token_delay,
+        prompt_token_delay_s=args.prompt_token_delay,
+        max_concurrency=args.max_concurrency,
+        error_rate=args.error_rate,
+        port=args.port,
+    )
+    with server:
+        print(f"Stub Ollama listening on {server.base_url} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
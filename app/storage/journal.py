@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+"""Append-only JSONL journal of lesson and answer events on top of a memory snapshot."""
+
+import json
+import os
+from pathlib import Path
+
+from app.storage.memory import LessonRecord, StudentMemory, _coerce_record, update_weakness_stats
+
+DEFAULT_COMPACT_BYTES = 256 * 1024
+
+OP_LESSON = "lesson"
+OP_ANSWER = "answer"
+
+
+def journal_path_for(snapshot_path: Path) -> Path:
+    return snapshot_path.with_name(f"{snapshot_path.name}.journal")
+
+
+class MemoryJournal:
+    """One JSON event per line, appended after the snapshot was written.
+
+    Every event carries a sequence number and the snapshot stores the last
+    one it includes (`StudentMemory.journal_seq`), so events a crash left
+    in the journal after the snapshot was written are not applied twice.
+    A line without its trailing newline is a write torn by a crash; it is
+    ignored and cut off so the next append starts on a clean line.
+    Complete lines that fail to parse are skipped. `truncate` empties the
+    journal once a new snapshot holds everything it recorded.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.skipped = 0
+        # Bytes consumed by the last replay; pass it as `start` to read only newer events.
+        self.offset = 0
+
+    def size(self) -> int:
+        try:
+            return self.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def append(self, event: dict[str, object]) -> None:
+        line = (json.dumps(event, ensure_ascii=True, separators=(",", ":")) + "\n").encode("ascii")
+        with self.path.open("ab") as handle:
+            handle.write(line)
+        self.offset += len(line)
+
+    def replay(self, memory: StudentMemory, *, start: int = 0) -> int:
+        """Apply every complete event from byte `start` on to `memory`; return how many were applied."""
+        try:
+            with self.path.open("rb") as handle:
+                handle.seek(start)
+                data = handle.read()
+        except FileNotFoundError:
+            self.offset = 0
+            return 0
+        applied = 0
+        good_end = 0
+        position = 0
+        while True:
+            newline = data.find(b"\n", position)
+            if newline < 0:
+                break
+            line = data[position:newline]
+            position = newline + 1
+            good_end = position
+            if not line.strip():
+                continue
+            try:
+                event = json.loads(line.decode("utf-8"))
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                self.skipped += 1
+                continue
+            seq = event.get("seq") if isinstance(event, dict) else None
+            if isinstance(seq, int) and seq <= memory.journal_seq:
+                continue
+            if apply_event(memory, event):
+                applied += 1
+                if isinstance(seq, int):
+                    memory.journal_seq = seq
+            else:
+                self.skipped += 1
+        if good_end < len(data):
+            with self.path.open("r+b") as handle:
+                handle.truncate(start + good_end)
+        self.offset = start + good_end
+        return applied
+
+    def truncate(self) -> None:
+        self.offset = 0
+        if self.path.exists():
+            with self.path.open("w", encoding="utf-8") as handle:
+                handle.flush()
+                os.fsync(handle.fileno())
+
+
+def lesson_event(seq: int, record: LessonRecord) -> dict[str, object]:
+    return {"seq": seq, "op": OP_LESSON, "record": record.__dict__}
+
+
+def answer_event(seq: int, subject: str, topic: str, ok: bool, at: float | None = None) -> dict[str, object]:
+    event: dict[str, object] = {"seq": seq, "op": OP_ANSWER, "subject": subject, "topic": topic, "ok": ok}
+    if at is not None:
+        event["at"] = at
+    return event
+
+
+def apply_event(memory: StudentMemory, event: object) -> bool:
+    if not isinstance(event, dict):
+        return False
+    if event.get("op") == OP_LESSON:
+        record = _coerce_record(event.get("record"))
+        if record is None:
+            return False
+        memory.lesson_history.append(record)
+        return True
+    if event.get("op") == OP_ANSWER:
+        subject, topic, ok, at = event.get("subject"), event.get("topic"), event.get("ok"), event.get("at")
+        if not isinstance(subject, str) or not isinstance(topic, str) or not isinstance(ok, bool):
+            return False
+        # Answers are aged from when they were given, not from the replay.
+        now = at if isinstance(at, (int, float)) and not isinstance(at, bool) else None
+        update_weakness_stats(memory, subject=subject, topic=topic, ok=ok, now=now)
+        return True
+    return False
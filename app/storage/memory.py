@@ -3,10 +3,14 @@ from __future__ import annotations
 """Persistence helpers for student memory and preferences."""
 
 import json
+import os
+import time
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
 
+from app.storage.weakness_index import WeaknessIndex, decay_stats
+
 
 @dataclass
 class LessonRecord:
@@ -20,6 +24,31 @@ class LessonRecord:
     section_reached: str | None = None
 
 
+@dataclass
+class LessonRollup:
+    """Totals of lessons rolled out of lesson_history; see app.storage.retention."""
+
+    lessons: int = 0
+    errors: int = 0
+    strictness_peak: int = 0
+    strictness_total: int = 0
+    questions_asked: int = 0
+
+    def add(self, record: LessonRecord) -> None:
+        self.lessons += 1
+        self.errors += record.errors
+        self.strictness_peak = max(self.strictness_peak, record.strictness_peak)
+        self.strictness_total += record.strictness_peak
+        self.questions_asked += record.questions_asked_count
+
+    def merge(self, other: LessonRollup) -> None:
+        self.lessons += other.lessons
+        self.errors += other.errors
+        self.strictness_peak = max(self.strictness_peak, other.strictness_peak)
+        self.strictness_total += other.strictness_total
+        self.questions_asked += other.questions_asked
+
+
 @dataclass
 class StudentMemory:
     lesson_history: list[LessonRecord] = field(default_factory=list)
@@ -28,9 +57,22 @@ class StudentMemory:
     custom_subjects: list[str] = field(default_factory=list)
     custom_subject_aliases: dict[str, str] = field(default_factory=dict)
     todos: list[str] = field(default_factory=list)
+    # Last journal event included in this snapshot; see app.storage.journal.
+    journal_seq: int = 0
+    # Bumped by every MemoryStore snapshot; see app.storage.shards.
+    version: int = 0
+    # Lessons older than the retention window, per UTC day and per subject/topic.
+    daily_rollups: dict[str, LessonRollup] = field(default_factory=dict)
+    topic_rollups: dict[str, dict[str, LessonRollup]] = field(default_factory=dict)
+    # Built on first use from weakness_stats; not persisted.
+    weakness_index: WeaknessIndex | None = field(default=None, repr=False, compare=False)
 
 
 def load_memory(path: Path) -> StudentMemory:
+    if _is_sqlite(path):
+        from app.storage.sqlite_memory import load_memory_sqlite
+
+        return load_memory_sqlite(path)
     if not path.exists():
         return StudentMemory()
     data = json.loads(path.read_text(encoding="utf-8"))
@@ -52,6 +94,9 @@ def load_memory(path: Path) -> StudentMemory:
         "topic": preferences.get("topic"),
         "llm_enabled": preferences.get("llm_enabled"),
         "llm_model": preferences.get("llm_model"),
+        "llm_cache": preferences.get("llm_cache"),
+        "llm_fast_model": preferences.get("llm_fast_model"),
+        "llm_budget_s": preferences.get("llm_budget_s"),
         "voice_enabled": preferences.get("voice_enabled"),
         "mode": preferences.get("mode", "teacher"),
     }
@@ -74,6 +119,15 @@ def load_memory(path: Path) -> StudentMemory:
     if not isinstance(todos, list):
         todos = []
     todos = [todo for todo in todos if isinstance(todo, str) and todo]
+    journal_seq = data.get("journal_seq", 0)
+    version = data.get("version", 0)
+    daily_rollups = _coerce_rollups(data.get("daily_rollups"))
+    topic_rollups_data = data.get("topic_rollups", {})
+    if not isinstance(topic_rollups_data, dict):
+        topic_rollups_data = {}
+    topic_rollups = {
+        subject: _coerce_rollups(topics) for subject, topics in topic_rollups_data.items() if isinstance(subject, str)
+    }
     return StudentMemory(
         lesson_history=history,
         preferences=preferences,
@@ -81,10 +135,19 @@ def load_memory(path: Path) -> StudentMemory:
         custom_subjects=custom_subjects,
         custom_subject_aliases=custom_subject_aliases,
         todos=todos,
+        journal_seq=journal_seq if isinstance(journal_seq, int) else 0,
+        version=version if isinstance(version, int) else 0,
+        daily_rollups=daily_rollups,
+        topic_rollups=topic_rollups,
     )
 
 
 def save_memory(path: Path, memory: StudentMemory) -> None:
+    if _is_sqlite(path):
+        from app.storage.sqlite_memory import save_memory_sqlite
+
+        save_memory_sqlite(path, memory)
+        return
     payload = {
         "lesson_history": [record.__dict__ for record in memory.lesson_history],
         "preferences": memory.preferences,
@@ -92,8 +155,17 @@ def save_memory(path: Path, memory: StudentMemory) -> None:
         "custom_subjects": memory.custom_subjects,
         "custom_subject_aliases": memory.custom_subject_aliases,
         "todos": memory.todos,
+        "journal_seq": memory.journal_seq,
+        "version": memory.version,
+        "daily_rollups": rollups_to_dict(memory.daily_rollups),
+        "topic_rollups": {subject: rollups_to_dict(topics) for subject, topics in memory.topic_rollups.items()},
     }
-    path.write_text(json.dumps(payload, ensure_ascii=True, indent=2), encoding="utf-8")
+    text = json.dumps(payload, ensure_ascii=True, indent=2)
+    # Write a sibling temp file and rename it over the original, so a crash
+    # mid-write never leaves a truncated memory file behind.
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    tmp_path.write_text(text, encoding="utf-8")
+    os.replace(tmp_path, path)
 
 
 def add_lesson_record(
@@ -128,14 +200,21 @@ def update_weakness_stats(
     subject: str,
     topic: str,
     ok: bool,
+    now: float | None = None,
 ) -> None:
     subject_stats = memory.weakness_stats.setdefault(subject, {})
     topic_stats = subject_stats.setdefault(topic, {"total": 0, "ok": 0, "fail": 0})
+    decay_stats(topic_stats, time.time() if now is None else now)
     topic_stats["total"] += 1
+    topic_stats["decayed_total"] += 1
     if ok:
         topic_stats["ok"] += 1
     else:
         topic_stats["fail"] += 1
+        topic_stats["decayed_fail"] += 1
+    index = memory.weakness_index
+    if index is not None and index.source is memory.weakness_stats:
+        index.update(subject, topic, topic_stats)
 
 
 def get_topic_stats(
@@ -154,21 +233,48 @@ def get_topic_stats(
 
 
 def get_weakest_topics(memory: StudentMemory, *, subject: str, limit: int) -> list[tuple[str, float, int]]:
-    subject_stats = memory.weakness_stats.get(subject, {})
-    if not isinstance(subject_stats, dict):
-        return []
-    scored: list[tuple[str, float, int]] = []
-    for topic, stats in subject_stats.items():
-        if not isinstance(stats, dict):
-            continue
-        total = stats.get("total", 0)
-        fail = stats.get("fail", 0)
-        if not isinstance(total, int) or not isinstance(fail, int) or total <= 0:
+    """(topic, decayed fail rate, total answers), weakest first."""
+    return weakness_index(memory).top(subject, limit)
+
+
+def get_weakest_overall(memory: StudentMemory) -> tuple[str, str, float, int] | None:
+    """(subject, topic, decayed fail rate, total answers) of the weakest topic of any subject."""
+    return weakness_index(memory).weakest()
+
+
+def weakness_index(memory: StudentMemory) -> WeaknessIndex:
+    """The index over `memory.weakness_stats`, rebuilt if the stats were replaced."""
+    index = memory.weakness_index
+    if index is None or index.source is not memory.weakness_stats:
+        index = WeaknessIndex(memory.weakness_stats)
+        memory.weakness_index = index
+    return index
+
+
+def rollups_to_dict(rollups: dict[str, LessonRollup]) -> dict[str, dict[str, int]]:
+    return {key: rollup.__dict__ for key, rollup in rollups.items()}
+
+
+def _coerce_rollups(data: object) -> dict[str, LessonRollup]:
+    if not isinstance(data, dict):
+        return {}
+    rollups: dict[str, LessonRollup] = {}
+    for key, item in data.items():
+        if not isinstance(key, str) or not isinstance(item, dict):
             continue
-        fail_rate = fail / total
-        scored.append((topic, fail_rate, total))
-    scored.sort(key=lambda item: (item[1], item[2]), reverse=True)
-    return scored[:limit]
+        rollups[key] = LessonRollup(
+            **{
+                name: value
+                for name, value in item.items()
+                if name in LessonRollup.__dataclass_fields__ and isinstance(value, int) and not isinstance(value, bool)
+            }
+        )
+    return rollups
+
+
+def _is_sqlite(path: Path) -> bool:
+    # Mirrors sqlite_memory.SQLITE_SUFFIXES without importing it eagerly.
+    return path.suffix.lower() in {".db", ".sqlite", ".sqlite3"}
 
 
 def _coerce_record(item: object) -> LessonRecord | None:
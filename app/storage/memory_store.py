@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+"""Authoritative in-memory StudentMemory with debounced write-behind persistence."""
+
+import atexit
+import threading
+import time
+from pathlib import Path
+
+from app.storage.journal import DEFAULT_COMPACT_BYTES, MemoryJournal, answer_event, journal_path_for, lesson_event
+from app.storage.memory import (
+    StudentMemory,
+    add_lesson_record,
+    load_memory,
+    save_memory,
+    update_weakness_stats,
+)
+from app.storage.retention import DEFAULT_RETENTION_DAYS, compact_history
+from app.storage.shards import file_lock, snapshot_stamp
+
+DEFAULT_FLUSH_DELAY_S = 1.0
+
+
+class MemoryStore:
+    """Load a memory file once and write it back in the background.
+
+    Callers mutate `memory` directly and call `mark_dirty()`. A daemon
+    thread writes the file (atomically, via save_memory) at most once per
+    `flush_delay_s`, so a burst of commands costs one write. `flush()`
+    writes immediately; `close()` flushes and stops the thread.
+
+    Answers and lessons go through `record_answer`/`record_lesson`
+    instead, which append one line to the journal next to the snapshot
+    rather than rewriting it. The journal is replayed at load, and once it
+    grows past `compact_bytes` the next background flush writes a fresh
+    snapshot and empties it. Every snapshot first rolls lessons older
+    than `retention_days` up into aggregates (None keeps them all).
+
+    Several processes may share one file. Journal appends and snapshots
+    run under the file's advisory lock, and each first catches up: new
+    journal lines written by other processes are applied, and if another
+    process wrote a snapshot since ours (optimistic versioning: its stamp
+    no longer matches and `version` moved on) the memory is reloaded from
+    it before our write goes on top. Answers and lessons are never lost
+    this way; preferences and other directly mutated fields are last
+    writer wins.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        flush_delay_s: float = DEFAULT_FLUSH_DELAY_S,
+        journal: bool = True,
+        compact_bytes: int = DEFAULT_COMPACT_BYTES,
+        retention_days: int | None = DEFAULT_RETENTION_DAYS,
+    ) -> None:
+        self.path = path
+        self.flush_delay_s = flush_delay_s
+        self.compact_bytes = compact_bytes
+        self.retention_days = retention_days
+        self.journal: MemoryJournal | None = MemoryJournal(journal_path_for(path)) if journal else None
+        with file_lock(path):
+            self.memory: StudentMemory = load_memory(path)
+            if self.journal is not None:
+                self.journal.replay(self.memory)
+            self._stamp = snapshot_stamp(path)
+        self.flushes = 0
+        self.reloads = 0
+        self.last_error: Exception | None = None
+        self._dirty = False
+        self._dirty_since = 0.0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def dirty(self) -> bool:
+        with self._cond:
+            return self._dirty
+
+    def mark_dirty(self) -> None:
+        with self._cond:
+            if self._dirty:
+                return
+            self._dirty = True
+            self._dirty_since = time.monotonic()
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name="memory-write-behind", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def record_answer(self, *, subject: str, topic: str, ok: bool) -> None:
+        with self._write_lock, file_lock(self.path):
+            self._sync(keep_settings=self.dirty)
+            now = time.time()
+            update_weakness_stats(self.memory, subject=subject, topic=topic, ok=ok, now=now)
+            self._journal(answer_event(self.memory.journal_seq + 1, subject, topic, ok, now))
+
+    def record_lesson(self, **fields: object) -> None:
+        """Add a lesson record; `fields` are the keyword arguments of add_lesson_record."""
+        with self._write_lock, file_lock(self.path):
+            self._sync(keep_settings=self.dirty)
+            add_lesson_record(self.memory, **fields)
+            self._journal(lesson_event(self.memory.journal_seq + 1, self.memory.lesson_history[-1]))
+
+    def _journal(self, event: dict[str, object]) -> None:
+        # Caller holds _write_lock and the file lock, so no snapshot or
+        # other process's event lands between the mutation and its line.
+        if self.journal is None:
+            self.mark_dirty()
+            return
+        try:
+            self.journal.append(event)
+        except OSError as exc:
+            self.last_error = exc
+            self.mark_dirty()
+            return
+        self.memory.journal_seq = event["seq"]
+        if self.journal.offset >= self.compact_bytes:
+            self.mark_dirty()
+
+    def _sync(self, *, keep_settings: bool) -> None:
+        """Catch up with writes by other processes; caller holds the file lock."""
+        if snapshot_stamp(self.path) != self._stamp:
+            self._reload(keep_settings=keep_settings)
+            return
+        if self.journal is None:
+            return
+        size = self.journal.size()
+        if size < self.journal.offset:
+            self._reload(keep_settings=keep_settings)
+        elif size > self.journal.offset:
+            self.journal.replay(self.memory, start=self.journal.offset)
+
+    def _reload(self, *, keep_settings: bool) -> None:
+        fresh = load_memory(self.path)
+        if self.journal is not None:
+            self.journal.replay(fresh)
+        # Update in place: sessions hold references to self.memory.
+        memory = self.memory
+        memory.lesson_history = fresh.lesson_history
+        memory.daily_rollups = fresh.daily_rollups
+        memory.topic_rollups = fresh.topic_rollups
+        memory.weakness_stats = fresh.weakness_stats
+        memory.journal_seq = fresh.journal_seq
+        memory.version = fresh.version
+        if not keep_settings:
+            memory.preferences = fresh.preferences
+            memory.custom_subjects = fresh.custom_subjects
+            memory.custom_subject_aliases = fresh.custom_subject_aliases
+            memory.todos = fresh.todos
+        self._stamp = snapshot_stamp(self.path)
+        self.reloads += 1
+
+    def flush(self) -> bool:
+        """Write pending changes now; return True if anything was written."""
+        with self._write_lock:
+            with self._cond:
+                if not self._dirty:
+                    return False
+                self._dirty = False
+            try:
+                with file_lock(self.path):
+                    self._sync(keep_settings=True)
+                    if self.retention_days is not None:
+                        compact_history(self.memory, retention_days=self.retention_days)
+                    self.memory.version += 1
+                    try:
+                        save_memory(self.path, self.memory)
+                    except BaseException:
+                        self.memory.version -= 1
+                        raise
+                    self._stamp = snapshot_stamp(self.path)
+                    if self.journal is not None:
+                        self.journal.truncate()
+            except RuntimeError:
+                # Another session mutated the memory mid-serialization; try again shortly.
+                self._redirty()
+                return False
+            except OSError as exc:
+                self.last_error = exc
+                self._redirty()
+                raise
+            self.flushes += 1
+            self.last_error = None
+            return True
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=2.0)
+        self.flush()
+
+    def _redirty(self) -> None:
+        with self._cond:
+            self._dirty = True
+            self._dirty_since = time.monotonic()
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._dirty or self._closed)
+                if self._closed:
+                    return
+                remaining = self._dirty_since + self.flush_delay_s - time.monotonic()
+                if remaining > 0:
+                    self._cond.wait(remaining)
+                    continue
+            try:
+                self.flush()
+            except OSError:
+                pass  # kept dirty and retried; see last_error
+
+
+_STORES: dict[Path, MemoryStore] = {}
+_STORES_LOCK = threading.Lock()
+_ATEXIT_REGISTERED = False
+
+
+def open_store(path: Path) -> MemoryStore:
+    """Return the process-wide store for `path`, so every session shares one authoritative copy."""
+    global _ATEXIT_REGISTERED
+    key = path.resolve()
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            if not _ATEXIT_REGISTERED:
+                atexit.register(close_all_stores)
+                _ATEXIT_REGISTERED = True
+            store = MemoryStore(path)
+            _STORES[key] = store
+        return store
+
+
+def close_all_stores() -> None:
+    with _STORES_LOCK:
+        stores = list(_STORES.values())
+        _STORES.clear()
+    for store in stores:
+        try:
+            store.close()
+        except OSError:
+            pass
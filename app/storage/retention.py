@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+"""Lesson history retention: keep recent raw records, roll older ones up.
+
+`compact_history` moves every LessonRecord older than the retention window
+out of `lesson_history` and into per-day and per-subject/topic
+LessonRollup totals, so the memory file stops growing with every lesson.
+MemoryStore runs it before each snapshot.
+
+The summaries below merge the roll-ups with the records still inside the
+window. Their cost is one step per day or topic plus the retained records,
+which the window bounds, instead of one step per lesson ever taught.
+"""
+
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+
+from app.storage.memory import LessonRecord, LessonRollup, StudentMemory
+
+DEFAULT_RETENTION_DAYS = 90
+
+
+def compact_history(
+    memory: StudentMemory,
+    *,
+    retention_days: int = DEFAULT_RETENTION_DAYS,
+    now: datetime | None = None,
+) -> int:
+    """Roll up records older than `retention_days`; return how many were rolled up."""
+    if retention_days < 0:
+        raise ValueError("retention_days must not be negative")
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=retention_days)
+    kept: list[LessonRecord] = []
+    rolled = 0
+    for record in memory.lesson_history:
+        when = _parse_timestamp(record.timestamp)
+        if when is None or when >= cutoff:
+            kept.append(record)
+            continue
+        memory.daily_rollups.setdefault(when.date().isoformat(), LessonRollup()).add(record)
+        subject_rollups = memory.topic_rollups.setdefault(record.subject or "", {})
+        subject_rollups.setdefault(record.topic or "", LessonRollup()).add(record)
+        rolled += 1
+    if rolled:
+        # In place: sessions may hold a reference to the list.
+        memory.lesson_history[:] = kept
+    return rolled
+
+
+def daily_summary(
+    memory: StudentMemory,
+    *,
+    days: int | None = None,
+    now: datetime | None = None,
+) -> list[tuple[str, LessonRollup]]:
+    """(UTC date, totals) per day with lessons, oldest first; only the last `days` days if given."""
+    totals = {day: replace(rollup) for day, rollup in memory.daily_rollups.items()}
+    for record in memory.lesson_history:
+        when = _parse_timestamp(record.timestamp)
+        if when is not None:
+            totals.setdefault(when.date().isoformat(), LessonRollup()).add(record)
+    summary = sorted(totals.items())
+    if days is not None:
+        first_day = ((now or datetime.now(timezone.utc)) - timedelta(days=days - 1)).date().isoformat()
+        summary = [(day, rollup) for day, rollup in summary if day >= first_day]
+    return summary
+
+
+def topic_summary(memory: StudentMemory) -> dict[str, dict[str, LessonRollup]]:
+    """Totals per subject and topic over the whole history; "" stands for an unset subject or topic."""
+    totals = {
+        subject: {topic: replace(rollup) for topic, rollup in topics.items()}
+        for subject, topics in memory.topic_rollups.items()
+    }
+    for record in memory.lesson_history:
+        subject_totals = totals.setdefault(record.subject or "", {})
+        subject_totals.setdefault(record.topic or "", LessonRollup()).add(record)
+    return totals
+
+
+def _parse_timestamp(value: str) -> datetime | None:
+    try:
+        when = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.astimezone(timezone.utc)
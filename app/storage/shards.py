@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+"""Per-student memory files and the advisory lock that guards each one.
+
+Every student gets their own memory file under a shared directory, so
+students never contend with each other. Processes that share one
+student's file serialize on `file_lock`; MemoryStore takes it around
+every journal append and snapshot, and compares `snapshot_stamp` with
+the stamp it last saw to notice that another process wrote a snapshot.
+"""
+
+import os
+import re
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_UNSAFE_CHARS = re.compile(r"[^a-z0-9_-]+")
+
+
+def student_memory_path(root: Path, student_id: str, *, suffix: str = ".json") -> Path:
+    """Path of `student_id`'s memory file inside `root`."""
+    name = _UNSAFE_CHARS.sub("_", student_id.strip().lower()).strip("_")
+    if not name:
+        raise ValueError(f"Invalid student id: {student_id!r}")
+    return root / f"{name}{suffix}"
+
+
+def lock_path_for(path: Path) -> Path:
+    return path.with_name(f"{path.name}.lock")
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive advisory lock on `path`'s lock file for the duration of the block."""
+    lock_path = lock_path_for(path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with lock_path.open("a+b") as handle:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def snapshot_stamp(path: Path) -> tuple[int, ...] | None:
+    """Cheap identity of the snapshot at `path`; it changes whenever a snapshot is written."""
+    stamp: list[int] = []
+    # A SQLite snapshot in WAL mode commits into the -wal file first.
+    for candidate in (path, path.with_name(f"{path.name}-wal")):
+        try:
+            stat = os.stat(candidate)
+        except FileNotFoundError:
+            continue
+        stamp.extend((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+    return tuple(stamp) or None
@@ -0,0 +1,298 @@
+from __future__ import annotations
+
+"""SQLite backend for student memory.
+
+load_memory/save_memory in app.storage.memory switch to this module for
+paths ending in .db, .sqlite or .sqlite3. Lessons are appended and only
+changed weakness and preference rows are written. Weakness rows also carry
+the rank WeaknessIndex sorts by, so query_weakest_topics reads the weakest
+topics of a subject with an index range scan, without loading the memory.
+
+One-shot import of an existing JSON file:
+    python -m app.storage.sqlite_memory app/storage/student_memory.json app/storage/student_memory.db
+"""
+
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from app.storage.memory import LessonRecord, StudentMemory, _coerce_rollups, load_memory, rollups_to_dict
+from app.storage.weakness_index import decay_stats, fail_mass_rank
+
+SQLITE_SUFFIXES = {".db", ".sqlite", ".sqlite3"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS lessons (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    errors INTEGER NOT NULL,
+    strictness_peak INTEGER NOT NULL,
+    topic TEXT,
+    subject TEXT,
+    level TEXT,
+    questions_asked_count INTEGER NOT NULL DEFAULT 0,
+    section_reached TEXT
+);
+CREATE INDEX IF NOT EXISTS lessons_subject_time ON lessons (subject, timestamp);
+CREATE TABLE IF NOT EXISTS weakness (
+    subject TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    ok INTEGER NOT NULL,
+    fail INTEGER NOT NULL,
+    fail_rate REAL NOT NULL,
+    decayed_total REAL,
+    decayed_fail REAL,
+    updated_at REAL,
+    fail_mass REAL,
+    PRIMARY KEY (subject, topic)
+);
+CREATE TABLE IF NOT EXISTS preferences (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Weakness columns that may be missing from a database created by an
+# earlier version of this module; connect() adds them.
+_DECAY_COLUMNS = ("decayed_total", "decayed_fail", "updated_at")
+_ADDED_COLUMNS = (*_DECAY_COLUMNS, "fail_mass")
+_WEAKNESS_COLUMNS = ("total", "ok", "fail", "fail_rate", *_ADDED_COLUMNS)
+
+_LESSON_COLUMNS = (
+    "timestamp",
+    "errors",
+    "strictness_peak",
+    "topic",
+    "subject",
+    "level",
+    "questions_asked_count",
+    "section_reached",
+)
+
+
+def is_sqlite_path(path: Path) -> bool:
+    return path.suffix.lower() in SQLITE_SUFFIXES
+
+
+def connect(path: Path) -> sqlite3.Connection:
+    """Open `path` in WAL mode (readers never block the writer) and ensure the schema exists."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(path, timeout=10)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executescript(_SCHEMA)
+    existing = {row[1] for row in connection.execute("PRAGMA table_info(weakness)")}
+    for column in _ADDED_COLUMNS:
+        if column not in existing:
+            connection.execute(f"ALTER TABLE weakness ADD COLUMN {column} REAL")
+    # Same order as WeaknessIndex; replaces an older index on fail rate alone.
+    connection.execute("DROP INDEX IF EXISTS weakness_rank")
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS weakness_weakest ON weakness (subject, fail_mass DESC, fail_rate DESC, topic)"
+    )
+    return connection
+
+
+def load_memory_sqlite(path: Path) -> StudentMemory:
+    if not path.exists():
+        return StudentMemory()
+    connection = connect(path)
+    try:
+        columns = ", ".join(_LESSON_COLUMNS)
+        history = [
+            LessonRecord(**dict(zip(_LESSON_COLUMNS, row)))
+            for row in connection.execute(f"SELECT {columns} FROM lessons ORDER BY id")
+        ]
+        weakness_stats: dict[str, dict[str, dict[str, object]]] = {}
+        for subject, topic, total, ok, fail, *decay in connection.execute(
+            f"SELECT subject, topic, total, ok, fail, {', '.join(_DECAY_COLUMNS)} FROM weakness"
+        ):
+            stats: dict[str, object] = {"total": total, "ok": ok, "fail": fail}
+            stats.update((column, value) for column, value in zip(_DECAY_COLUMNS, decay) if value is not None)
+            weakness_stats.setdefault(subject, {})[topic] = stats
+        preferences = {key: json.loads(value) for key, value in connection.execute("SELECT key, value FROM preferences")}
+        meta = {key: json.loads(value) for key, value in connection.execute("SELECT key, value FROM meta")}
+    finally:
+        connection.close()
+    preferences.setdefault("mode", "teacher")
+    return StudentMemory(
+        lesson_history=history,
+        preferences=preferences,
+        weakness_stats=weakness_stats,
+        custom_subjects=list(meta.get("custom_subjects", [])),
+        custom_subject_aliases=dict(meta.get("custom_subject_aliases", {})),
+        todos=list(meta.get("todos", [])),
+        journal_seq=int(meta.get("journal_seq", 0)),
+        version=int(meta.get("version", 0)),
+        daily_rollups=_coerce_rollups(meta.get("daily_rollups")),
+        topic_rollups={
+            subject: _coerce_rollups(topics) for subject, topics in dict(meta.get("topic_rollups", {})).items()
+        },
+    )
+
+
+def save_memory_sqlite(path: Path, memory: StudentMemory) -> None:
+    """Store `memory`; lessons already in the database are not written again."""
+    connection = connect(path)
+    try:
+        with connection:
+            stored = connection.execute("SELECT COUNT(*) FROM lessons").fetchone()[0]
+            first = connection.execute("SELECT timestamp FROM lessons ORDER BY id LIMIT 1").fetchone()
+            history = memory.lesson_history
+            if stored > len(history) or (first is not None and first[0] != history[0].timestamp):
+                # History was trimmed (e.g. rolled up by retention); rewrite it.
+                connection.execute("DELETE FROM lessons")
+                stored = 0
+            connection.executemany(
+                f"INSERT INTO lessons ({', '.join(_LESSON_COLUMNS)}) VALUES ({', '.join('?' * len(_LESSON_COLUMNS))})",
+                [
+                    tuple(getattr(record, column) for column in _LESSON_COLUMNS)
+                    for record in memory.lesson_history[stored:]
+                ],
+            )
+            rows = {
+                (subject, topic): _weakness_row(stats)
+                for subject, topics in memory.weakness_stats.items()
+                if isinstance(topics, dict)
+                for topic, stats in topics.items()
+                if _valid_stats(stats)
+            }
+            stored_rows = {
+                (subject, topic): tuple(values)
+                for subject, topic, *values in connection.execute(
+                    f"SELECT subject, topic, {', '.join(_WEAKNESS_COLUMNS)} FROM weakness"
+                )
+            }
+            connection.executemany(
+                "DELETE FROM weakness WHERE subject = ? AND topic = ?",
+                [key for key in stored_rows if key not in rows],
+            )
+            connection.executemany(
+                f"INSERT OR REPLACE INTO weakness (subject, topic, {', '.join(_WEAKNESS_COLUMNS)}) "
+                f"VALUES ({', '.join('?' * (len(_WEAKNESS_COLUMNS) + 2))})",
+                [(*key, *row) for key, row in rows.items() if stored_rows.get(key) != row],
+            )
+            preferences = {key: json.dumps(value) for key, value in memory.preferences.items()}
+            stored_preferences = dict(connection.execute("SELECT key, value FROM preferences"))
+            connection.executemany(
+                "DELETE FROM preferences WHERE key = ?",
+                [(key,) for key in stored_preferences if key not in preferences],
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO preferences (key, value) VALUES (?, ?)",
+                [item for item in preferences.items() if stored_preferences.get(item[0]) != item[1]],
+            )
+            connection.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [
+                    ("custom_subjects", json.dumps(memory.custom_subjects)),
+                    ("custom_subject_aliases", json.dumps(memory.custom_subject_aliases)),
+                    ("todos", json.dumps(memory.todos)),
+                    ("journal_seq", json.dumps(memory.journal_seq)),
+                    ("version", json.dumps(memory.version)),
+                    ("daily_rollups", json.dumps(rollups_to_dict(memory.daily_rollups))),
+                    (
+                        "topic_rollups",
+                        json.dumps({subject: rollups_to_dict(topics) for subject, topics in memory.topic_rollups.items()}),
+                    ),
+                ],
+            )
+    finally:
+        connection.close()
+
+
+def query_weakest_topics(path: Path, *, subject: str, limit: int) -> list[tuple[str, float, int]]:
+    """get_weakest_topics as of the last save, read from the weakness_weakest index."""
+    if not path.exists():
+        return []
+    connection = connect(path)
+    try:
+        rows = connection.execute(
+            "SELECT topic, fail_rate, total FROM weakness WHERE subject = ? "
+            "ORDER BY fail_mass DESC, fail_rate DESC, topic LIMIT ?",
+            (subject, max(0, limit)),
+        ).fetchall()
+    finally:
+        connection.close()
+    return [(topic, fail_rate, total) for topic, fail_rate, total in rows]
+
+
+def import_json(json_path: Path, db_path: Path, *, overwrite: bool = False) -> int:
+    """Copy a JSON memory file into a new SQLite database; return the number of lessons imported."""
+    if not json_path.exists():
+        raise ValueError(f"File not found: {json_path}")
+    if db_path.exists() and not overwrite:
+        connection = connect(db_path)
+        try:
+            has_data = connection.execute("SELECT EXISTS (SELECT 1 FROM lessons)").fetchone()[0]
+        finally:
+            connection.close()
+        if has_data:
+            raise ValueError(f"{db_path} already contains lessons; pass overwrite=True to replace them")
+    memory = load_memory(json_path)
+    if overwrite and db_path.exists():
+        connection = connect(db_path)
+        try:
+            with connection:
+                connection.execute("DELETE FROM lessons")
+        finally:
+            connection.close()
+    save_memory_sqlite(db_path, memory)
+    return len(memory.lesson_history)
+
+
+def _weakness_row(stats: dict[str, object]) -> tuple[object, ...]:
+    """Column values in _WEAKNESS_COLUMNS order."""
+    ranked = stats
+    if not isinstance(stats.get("updated_at"), (int, float)):
+        # WeaknessIndex decays undecayed stats when it is built; rank them the same way.
+        ranked = dict(stats)
+        decay_stats(ranked, time.time())
+    return (
+        stats["total"],
+        stats["ok"],
+        stats["fail"],
+        _fail_rate(stats),
+        *(stats.get(column) for column in _DECAY_COLUMNS),
+        fail_mass_rank(ranked),
+    )
+
+
+def _fail_rate(stats: dict[str, object]) -> float:
+    """The decayed fail rate get_weakest_topics ranks by, or the raw one for undecayed stats."""
+    decayed_total, decayed_fail = stats.get("decayed_total"), stats.get("decayed_fail")
+    if isinstance(decayed_total, (int, float)) and isinstance(decayed_fail, (int, float)) and decayed_total > 0:
+        return decayed_fail / decayed_total
+    return stats["fail"] / stats["total"]
+
+
+def _valid_stats(stats: object) -> bool:
+    if not isinstance(stats, dict):
+        return False
+    values = [stats.get(key) for key in ("total", "ok", "fail")]
+    return all(isinstance(value, int) for value in values) and stats["total"] > 0
+
+
+def main(argv: list[str]) -> int:
+    if len(argv) != 2:
+        print("Usage: python -m app.storage.sqlite_memory <student_memory.json> <student_memory.db>")
+        return 2
+    json_path, db_path = Path(argv[0]), Path(argv[1])
+    try:
+        count = import_json(json_path, db_path)
+    except ValueError as exc:
+        print(exc)
+        return 1
+    print(f"Imported {count} lessons into {db_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
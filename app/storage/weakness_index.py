@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+"""Ranked weak topics per subject, with exponentially decayed answer counts.
+
+Each topic's stats carry, next to the raw total/ok/fail counters,
+`decayed_total` and `decayed_fail` as of `updated_at` (epoch seconds).
+Decay is applied lazily: only when the topic gets a new answer are its
+decayed counters aged to the present, so an answer from one half-life ago
+weighs half as much as one given now.
+
+Topics are ranked by decayed fail mass: the failures still "remembered"
+at a shared moment. Unlike the fail rate, which is unchanged while a topic
+gets no answers, the mass of a topic nobody practises keeps shrinking, so
+fresh mistakes overtake old ones. All topics age by the same factor, so
+log2(decayed_fail) + updated_at / half_life orders them by fail mass at
+any later moment. The rank of a topic therefore only changes when it is
+answered, and WeaknessIndex keeps each subject's topics in a sorted list
+that is updated for that one topic.
+"""
+
+import math
+import time
+from bisect import bisect_left, insort
+
+DEFAULT_HALF_LIFE_DAYS = 30.0
+DEFAULT_HALF_LIFE_S = DEFAULT_HALF_LIFE_DAYS * 24 * 3600
+
+# (-fail_mass, -fail_rate, topic): ascending order is weakest first.
+_RankKey = tuple[float, float, str]
+
+
+def decay_stats(stats: dict[str, object], now: float, *, half_life_s: float = DEFAULT_HALF_LIFE_S) -> None:
+    """Age the decayed counters of `stats` to `now`.
+
+    Stats written before decay existed start from their raw counters.
+    """
+    updated_at = stats.get("updated_at")
+    decayed_total = stats.get("decayed_total")
+    decayed_fail = stats.get("decayed_fail")
+    if not (_is_number(updated_at) and _is_number(decayed_total) and _is_number(decayed_fail)):
+        total, fail = stats.get("total", 0), stats.get("fail", 0)
+        stats["decayed_total"] = float(total) if _is_number(total) else 0.0
+        stats["decayed_fail"] = float(fail) if _is_number(fail) else 0.0
+        stats["updated_at"] = now
+        return
+    factor = 0.5 ** (max(0.0, now - updated_at) / half_life_s)
+    stats["decayed_total"] = decayed_total * factor
+    stats["decayed_fail"] = decayed_fail * factor
+    stats["updated_at"] = now
+
+
+def fail_mass_rank(stats: dict[str, object], *, half_life_s: float = DEFAULT_HALF_LIFE_S) -> float | None:
+    """log2 of the decayed fail mass seen from epoch 0; None without remembered failures.
+
+    Larger means weaker, at any shared moment.
+    """
+    decayed_fail = stats.get("decayed_fail")
+    updated_at = stats.get("updated_at")
+    if not (_is_number(decayed_fail) and _is_number(updated_at)) or decayed_fail <= 0:
+        return None
+    return math.log2(decayed_fail) + updated_at / half_life_s
+
+
+class WeaknessIndex:
+    """Sorted per-subject rankings over a weakness_stats mapping.
+
+    `update` re-ranks one topic: a binary search to remove its old key and
+    `insort` to add the new one. `top` slices the first `limit` keys.
+    """
+
+    def __init__(
+        self,
+        weakness_stats: dict[str, dict[str, dict[str, object]]],
+        *,
+        half_life_s: float = DEFAULT_HALF_LIFE_S,
+        now: float | None = None,
+    ) -> None:
+        self.source = weakness_stats
+        self.half_life_s = half_life_s
+        self._ranked: dict[str, list[_RankKey]] = {}
+        self._keys: dict[str, dict[str, _RankKey]] = {}
+        now = time.time() if now is None else now
+        for subject, topics in weakness_stats.items():
+            if not isinstance(topics, dict):
+                continue
+            for topic, stats in topics.items():
+                if not isinstance(stats, dict):
+                    continue
+                if not _is_number(stats.get("updated_at")):
+                    decay_stats(stats, now, half_life_s=half_life_s)
+                self.update(subject, topic, stats)
+
+    def update(self, subject: str, topic: str, stats: dict[str, object]) -> None:
+        ranked = self._ranked.setdefault(subject, [])
+        keys = self._keys.setdefault(subject, {})
+        old = keys.pop(topic, None)
+        if old is not None:
+            del ranked[bisect_left(ranked, old)]
+        key = self._rank_key(topic, stats)
+        if key is not None:
+            insort(ranked, key)
+            keys[topic] = key
+
+    def top(self, subject: str, limit: int) -> list[tuple[str, float, int]]:
+        """The `limit` weakest topics of `subject` as (topic, decayed fail rate, total answers)."""
+        topics = self.source.get(subject, {})
+        return [(key[2], -key[1], topics[key[2]]["total"]) for key in self._ranked.get(subject, [])[: max(0, limit)]]
+
+    def weakest(self) -> tuple[str, str, float, int] | None:
+        """The weakest topic over all subjects as (subject, topic, decayed fail rate, total answers)."""
+        best: tuple[_RankKey, str] | None = None
+        for subject, ranked in self._ranked.items():
+            if ranked and (best is None or ranked[0] < best[0]):
+                best = (ranked[0], subject)
+        if best is None:
+            return None
+        key, subject = best
+        return subject, key[2], -key[1], self.source[subject][key[2]]["total"]
+
+    def _rank_key(self, topic: str, stats: dict[str, object]) -> _RankKey | None:
+        total = stats.get("total")
+        decayed_total = stats.get("decayed_total")
+        decayed_fail = stats.get("decayed_fail")
+        updated_at = stats.get("updated_at")
+        if not isinstance(total, int) or total <= 0:
+            return None
+        if not (_is_number(decayed_total) and _is_number(decayed_fail) and _is_number(updated_at)):
+            return None
+        if decayed_total <= 0:
+            return None
+        mass = fail_mass_rank(stats, half_life_s=self.half_life_s)
+        # Topics without remembered failures sort after every topic with some.
+        return (math.inf if mass is None else -mass, -decayed_fail / decayed_total, topic)
+
+
+def _is_number(value: object) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
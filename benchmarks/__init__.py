@@ -0,0 +1 @@
+"""Benchmarks run against local stand-in servers."""
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+"""Memory file size and load + save time before and after history roll-up.
+
+Run: python -m benchmarks.lesson_retention [years] [lessons_per_day]
+"""
+
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from app.storage.memory import LessonRecord, StudentMemory, load_memory, save_memory
+from app.storage.retention import DEFAULT_RETENTION_DAYS, compact_history, daily_summary
+
+
+def _load_save(path: Path, rounds: int = 20) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        save_memory(path, load_memory(path))
+    return (time.perf_counter() - started) / rounds
+
+
+def main(years: int = 3, per_day: int = 3) -> None:
+    now = datetime.now(timezone.utc)
+    memory = StudentMemory()
+    for day in range(years * 365, -1, -1):
+        for index in range(per_day):
+            memory.lesson_history.append(
+                LessonRecord(
+                    timestamp=(now - timedelta(days=day, hours=index)).isoformat(),
+                    errors=index,
+                    strictness_peak=2 + index % 3,
+                    topic=f"tema{day % 12}",
+                    subject="ekonomie",
+                    questions_asked_count=5,
+                )
+            )
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "student_memory.json"
+        for label in ("raw history", f"{DEFAULT_RETENTION_DAYS}-day retention"):
+            if label != "raw history":
+                compact_history(memory, now=now)
+            save_memory(path, memory)
+            started = time.perf_counter()
+            daily_summary(memory, days=30, now=now)
+            summary_s = time.perf_counter() - started
+            print(
+                f"{label:<20} records={len(memory.lesson_history):5d} size={path.stat().st_size / 1024:7.0f} KiB "
+                f"load+save={_load_save(path) * 1000:7.1f} ms 30-day summary={summary_s * 1000:6.2f} ms"
+            )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 3, int(args[1]) if len(args) > 1 else 3)
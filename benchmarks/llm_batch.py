@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+"""Sequential vs. concurrent LLM questions for a quiz.
+
+Run: python -m benchmarks.llm_batch [questions] [latency_s]
+
+The stub server runs OLLAMA_NUM_PARALLEL generations at once (4 if unset),
+and the batch keeps the same number in flight, as the app does.
+"""
+
+import sys
+import time
+from unittest import mock
+
+from app.core.llm_question_engine import generate_llm_question, generate_llm_questions
+from app.llm import ollama_client
+from app.llm.ollama_client import DEFAULT_NUM_PARALLEL, OllamaClient
+from app.llm.stub_server import StubOllamaServer
+
+
+def main(count: int = 10, latency_s: float = 0.3) -> None:
+    with StubOllamaServer(latency_s=latency_s, max_concurrency=DEFAULT_NUM_PARALLEL) as server:
+        client = OllamaClient(server.base_url)
+        with mock.patch.object(ollama_client, "_DEFAULT_CLIENT", client):
+            started = time.perf_counter()
+            for _ in range(count):
+                generate_llm_question("ekonomie", "stredni", "inflace", 3, sources=[], model="stub", use_cache=False)
+            sequential_s = time.perf_counter() - started
+
+            started = time.perf_counter()
+            generate_llm_questions(
+                ["inflace"] * count,
+                "ekonomie",
+                "stredni",
+                3,
+                sources=[],
+                model="stub",
+                use_cache=False,
+                max_in_flight=DEFAULT_NUM_PARALLEL,
+            )
+            batch_s = time.perf_counter() - started
+        client.close()
+
+    print(f"questions: {count}, server latency: {latency_s * 1000:.0f} ms, parallel: {DEFAULT_NUM_PARALLEL}")
+    print(f"sequential: {sequential_s:.2f} s")
+    print(f"batched:    {batch_s:.2f} s")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 10, float(args[1]) if len(args) > 1 else 0.3)
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+"""Interactive LLM latency under background load, with and without the scheduler.
+
+Run: python -m benchmarks.llm_scheduler [requests] [latency_s]
+
+The stub server runs two generations at a time and queues the rest, like
+Ollama with OLLAMA_NUM_PARALLEL=2. Six background threads keep it busy
+with batch-class requests while one student asks questions in sequence.
+"""
+
+import itertools
+import sys
+import threading
+import time
+
+from app.llm.ollama_client import OllamaClient
+from app.llm.scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, LlmScheduler
+from app.llm.stub_server import StubOllamaServer
+
+from benchmarks.llm_suite import percentile
+
+BACKGROUND_THREADS = 6
+
+
+def scenario(name: str, count: int, latency_s: float, *, load: bool, scheduled: bool) -> None:
+    with StubOllamaServer(latency_s=latency_s, max_concurrency=2) as server:
+        client = OllamaClient(server.base_url, pool_size=BACKGROUND_THREADS + 2)
+        scheduler = LlmScheduler(max_concurrency=2, reserved_interactive=1) if scheduled else None
+        counter = itertools.count()
+        stop = threading.Event()
+
+        def call(priority: int, session: str) -> None:
+            prompt = f"prompt {next(counter)}"
+            if scheduler is None:
+                client.stream_generate(prompt, model="stub")
+            else:
+                scheduler.run(lambda: client.stream_generate(prompt, model="stub"), priority=priority, session=session)
+
+        def background(index: int) -> None:
+            while not stop.is_set():
+                call(PRIORITY_BATCH, f"batch-{index}")
+
+        threads = [threading.Thread(target=background, args=(index,)) for index in range(BACKGROUND_THREADS if load else 0)]
+        for thread in threads:
+            thread.start()
+        time.sleep(latency_s * 2)
+        samples: list[float] = []
+        for _ in range(count):
+            started = time.perf_counter()
+            call(PRIORITY_INTERACTIVE, "student")
+            samples.append(time.perf_counter() - started)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        if scheduler is not None:
+            scheduler.close()
+        client.close()
+    print(
+        f"{name:<28} p50={percentile(samples, 0.5) * 1000:6.1f} ms "
+        f"p95={percentile(samples, 0.95) * 1000:6.1f} ms "
+        f"background served={server.requests - count}"
+    )
+
+
+def main(count: int = 20, latency_s: float = 0.05) -> None:
+    print(f"interactive requests: {count}, server latency: {latency_s * 1000:.0f} ms, 2 server slots")
+    scenario("idle", count, latency_s, load=False, scheduled=False)
+    scenario("background, direct", count, latency_s, load=True, scheduled=False)
+    scenario("background, scheduler", count, latency_s, load=True, scheduled=True)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 20, float(args[1]) if len(args) > 1 else 0.05)
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+"""Latency and throughput of the LLM paths against the local stub server.
+
+Run: python -m benchmarks.llm_suite [requests] [latency_s] [token_delay_s]
+
+Reports p50/p95 latency and throughput for generate_llm_question, /quiz
+and lesson generation, plus concurrent load against a server limited to
+two parallel generations with 10% injected failures.
+"""
+
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+
+from app.cli import CliContext, handle_command
+from app.core.llm_question_engine import generate_llm_question
+from app.core.local_sources import SourceChunk
+from app.core.question_engine import generate_lesson_from_sources
+from app.core.session import LessonSession
+from app.core.state_machine import TeacherEngine
+from app.llm.ollama_client import configure_default_client
+from app.llm.stub_server import StubOllamaServer
+
+REPLY = "Jak inflace ovlivnuje realnou mzdu?\n" + "Dalsi text, ktery aplikace zahodi. " * 20
+SOURCES = [
+    SourceChunk(
+        text=(
+            f"Kapitola {index}. Inflace snizuje kupni silu penez. Centralni banka nastavuje urokove sazby. "
+            "Realna mzda je nominalni mzda ocistena o inflaci. Nezamestnanost a HDP souvisi s cyklem."
+        ),
+        source="ucebnice.txt",
+    )
+    for index in range(40)
+]
+
+
+def percentile(samples: list[float], share: float) -> float:
+    ordered = sorted(samples)
+    position = min(len(ordered) - 1, max(0, round(share * (len(ordered) - 1))))
+    return ordered[position]
+
+
+def report(name: str, samples: list[float], wall_s: float, operations: int) -> None:
+    print(
+        f"{name:<28} p50={percentile(samples, 0.5) * 1000:7.1f} ms "
+        f"p95={percentile(samples, 0.95) * 1000:7.1f} ms "
+        f"mean={statistics.fmean(samples) * 1000:7.1f} ms "
+        f"throughput={operations / wall_s:6.1f}/s"
+    )
+
+
+def measure(name: str, count: int, action: Callable[[], object], *, per_call: int = 1) -> None:
+    samples: list[float] = []
+    started = time.perf_counter()
+    for _ in range(count):
+        call_started = time.perf_counter()
+        action()
+        samples.append(time.perf_counter() - call_started)
+    report(name, samples, time.perf_counter() - started, count * per_call)
+
+
+def measure_concurrent(name: str, count: int, workers: int, action: Callable[[], object]) -> None:
+    def timed(_index: int) -> float:
+        call_started = time.perf_counter()
+        action()
+        return time.perf_counter() - call_started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        samples = list(pool.map(timed, range(count)))
+    report(name, samples, time.perf_counter() - started, count)
+
+
+def _question() -> object:
+    return generate_llm_question(
+        "ekonomie", "stredni", "inflace", 3, sources=SOURCES, model="stub", use_cache=False
+    )
+
+
+def _quiz_context(memory_dir: Path) -> CliContext:
+    return CliContext(
+        engine=TeacherEngine(),
+        session=LessonSession(),
+        memory_path=memory_dir / "student_memory.json",
+        persona_text="",
+        subject="ekonomie",
+        level="stredni",
+        topic="inflace",
+        llm_enabled=True,
+        llm_model="stub",
+        llm_cache=False,
+        sources=SOURCES,
+    )
+
+
+def main(count: int = 30, latency_s: float = 0.02, token_delay_s: float = 0.002) -> None:
+    print(f"requests: {count}, server latency: {latency_s * 1000:.0f} ms, token delay: {token_delay_s * 1000:.1f} ms")
+    with tempfile.TemporaryDirectory() as tmp:
+        context = _quiz_context(Path(tmp))
+        with StubOllamaServer(reply=REPLY, latency_s=latency_s, token_delay_s=token_delay_s) as server:
+            client = configure_default_client(server.base_url)
+            measure("generate_llm_question", count, _question)
+            measure("/quiz 5", max(1, count // 5), lambda: handle_command(context, "/quiz 5"), per_call=5)
+            measure(
+                "lesson (templates, 30 q)",
+                max(1, count // 5),
+                lambda: generate_lesson_from_sources(SOURCES, "ekonomie", "stredni", n_total=30),
+                per_call=30,
+            )
+            client.close()
+
+        with StubOllamaServer(
+            reply=REPLY, latency_s=latency_s, token_delay_s=token_delay_s, max_concurrency=2, error_rate=0.1, seed=3
+        ) as server:
+            client = configure_default_client(server.base_url, failure_threshold=1000)
+            measure_concurrent("8 clients, 2 slots, 10% err", count, 8, _question)
+            client.close()
+        print(f"stub: peak parallel generations={server.peak_active}, injected errors={server.errors}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(
+        int(args[0]) if args else 30,
+        float(args[1]) if len(args) > 1 else 0.02,
+        float(args[2]) if len(args) > 2 else 0.002,
+    )
@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+"""Per-answer memory cost: load/save of the whole file vs. the write-behind store.
+
+Run: python -m benchmarks.memory_commands [history_records] [answers]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.storage.memory import StudentMemory, add_lesson_record, load_memory, save_memory, update_weakness_stats
+from app.storage.memory_store import MemoryStore
+
+
+def main(history: int = 5000, answers: int = 200) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "student_memory.json"
+        memory = StudentMemory()
+        for index in range(history):
+            add_lesson_record(memory, errors=index % 4, strictness_peak=3, topic="inflace", subject="ekonomie")
+        save_memory(path, memory)
+
+        started = time.perf_counter()
+        for index in range(answers):
+            loaded = load_memory(path)
+            update_weakness_stats(loaded, subject="ekonomie", topic=f"tema{index % 10}", ok=index % 3 == 0)
+            save_memory(path, loaded)
+        load_save_s = (time.perf_counter() - started) / answers
+
+        store = MemoryStore(path)
+        started = time.perf_counter()
+        for index in range(answers):
+            update_weakness_stats(store.memory, subject="ekonomie", topic=f"tema{index % 10}", ok=index % 3 == 0)
+            store.mark_dirty()
+        store_s = (time.perf_counter() - started) / answers
+        store.close()
+
+    print(f"history records: {history}, answers: {answers}")
+    print(f"load + save per answer: {load_save_s * 1000:8.3f} ms")
+    print(f"write-behind store:     {store_s * 1000:8.3f} ms (flushes: {store.flushes})")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 5000, int(args[1]) if len(args) > 1 else 200)
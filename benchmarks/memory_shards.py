@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+"""Load test: several processes recording answers at once.
+
+Run: python -m benchmarks.memory_shards [processes] [answers]
+
+Each process records `answers` answers. "load + save" is the old cycle on
+one shared file with no locking; "store, shared file" runs MemoryStore in
+every process on the same file; "store, per-student shards" gives every
+process its own student file. Lost answers are counted from the final
+weakness stats.
+"""
+
+import multiprocessing
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.storage.memory import StudentMemory, add_lesson_record, load_memory, save_memory, update_weakness_stats
+from app.storage.memory_store import MemoryStore
+from app.storage.shards import student_memory_path
+
+HISTORY_RECORDS = 500
+
+
+def _worker(mode: str, path: str, answers: int, start, results) -> None:
+    start.wait()
+    started = time.perf_counter()
+    if mode == "load_save":
+        for index in range(answers):
+            try:
+                memory = load_memory(Path(path))
+                update_weakness_stats(memory, subject="ekonomie", topic=f"tema{index % 10}", ok=False)
+                save_memory(Path(path), memory)
+            except (OSError, ValueError):
+                pass  # a concurrent rename beat us; the answer is lost
+    else:
+        store = MemoryStore(Path(path), flush_delay_s=0.2)
+        for index in range(answers):
+            store.record_answer(subject="ekonomie", topic=f"tema{index % 10}", ok=False)
+        store.close()
+    results.put(time.perf_counter() - started)
+
+
+def _seed(path: Path) -> None:
+    memory = StudentMemory()
+    for index in range(HISTORY_RECORDS):
+        add_lesson_record(memory, errors=index % 4, strictness_peak=3, topic="inflace", subject="ekonomie")
+    save_memory(path, memory)
+
+
+def _recorded(path: Path) -> int:
+    memory = MemoryStore(path).memory
+    return sum(stats["total"] for stats in memory.weakness_stats.get("ekonomie", {}).values())
+
+
+def scenario(name: str, mode: str, processes: int, answers: int, *, sharded: bool) -> None:
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        paths = [
+            student_memory_path(root, f"student-{index}") if sharded else root / "student_memory.json"
+            for index in range(processes)
+        ]
+        for path in set(paths):
+            _seed(path)
+        start = context.Event()
+        results = context.Queue()
+        workers = [
+            context.Process(target=_worker, args=(mode, str(path), answers, start, results)) for path in paths
+        ]
+        for worker in workers:
+            worker.start()
+        time.sleep(0.5)  # let every interpreter start before the clock does
+        start.set()
+        elapsed = max(results.get() for _ in workers)
+        for worker in workers:
+            worker.join()
+        recorded = sum(_recorded(path) for path in set(paths))
+    expected = processes * answers
+    print(f"{name:<28} {expected / elapsed:9.0f} answers/s   lost {expected - recorded:5d} of {expected}")
+
+
+def main(processes: int = 8, answers: int = 100) -> None:
+    print(f"processes: {processes}, answers each: {answers}, history records: {HISTORY_RECORDS}")
+    scenario("load + save, shared file", "load_save", processes, answers, sharded=False)
+    scenario("store, shared file", "store", processes, answers, sharded=False)
+    scenario("store, per-student shards", "store", processes, answers, sharded=True)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 8, int(args[1]) if len(args) > 1 else 100)
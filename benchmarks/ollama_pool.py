@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+"""Compare per-request urllib connections with the pooled OllamaClient.
+
+Run: python -m benchmarks.ollama_pool [requests]
+"""
+
+import json
+import sys
+import time
+from urllib.request import Request, urlopen
+
+from app.llm.ollama_client import OllamaClient
+from app.llm.stub_server import StubOllamaServer
+
+
+def _urllib_generate(url: str, prompt: str) -> str:
+    data = json.dumps({"model": "stub", "prompt": prompt, "stream": False}).encode("utf-8")
+    request = Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urlopen(request, timeout=30) as response:
+        return str(json.loads(response.read().decode("utf-8")).get("response", ""))
+
+
+def main(count: int = 500) -> None:
+    with StubOllamaServer() as server:
+        url = f"{server.base_url}/api/generate"
+        started = time.perf_counter()
+        for _ in range(count):
+            _urllib_generate(url, "prompt")
+        fresh_s = time.perf_counter() - started
+        fresh_connections = server.connections
+
+        client = OllamaClient(server.base_url)
+        started = time.perf_counter()
+        for _ in range(count):
+            client.generate("prompt", model="stub")
+        pooled_s = time.perf_counter() - started
+        client.close()
+        pooled_connections = server.connections - fresh_connections
+
+    print(f"requests: {count}")
+    print(f"urllib per request: {fresh_s / count * 1000:.3f} ms ({fresh_connections} connections)")
+    print(f"pooled client:      {pooled_s / count * 1000:.3f} ms ({pooled_connections} connections)")
+    print(f"overhead saved:     {(fresh_s - pooled_s) / count * 1000:.3f} ms per request")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
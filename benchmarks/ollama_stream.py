@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+"""Time to question: full completion vs. streaming with early stop.
+
+Run: python -m benchmarks.ollama_stream [requests]
+"""
+
+import sys
+import time
+
+from app.core.llm_question_engine import _question_complete
+from app.llm.ollama_client import OllamaClient
+from app.llm.stub_server import StubOllamaServer
+
+REPLY = "Jak inflace ovlivnuje realnou mzdu?\n" + "Vysvetleni, ktere aplikace zahodi. " * 40
+
+
+def main(count: int = 10) -> None:
+    with StubOllamaServer(reply=REPLY, token_delay_s=0.002) as server:
+        client = OllamaClient(server.base_url)
+        started = time.perf_counter()
+        for _ in range(count):
+            client.generate("prompt", model="stub")
+        full_s = (time.perf_counter() - started) / count
+
+        first_token: list[float] = []
+        started = time.perf_counter()
+        for _ in range(count):
+            result = client.stream_generate("prompt", model="stub", stop=_question_complete)
+            first_token.append(result.first_token_s or 0.0)
+        stream_s = (time.perf_counter() - started) / count
+        client.close()
+
+    print(f"requests: {count}")
+    print(f"full completion:        {full_s * 1000:.1f} ms per question")
+    print(f"stream + early stop:    {stream_s * 1000:.1f} ms per question")
+    print(f"mean time to 1st token: {sum(first_token) / len(first_token) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+"""Prompt size and time to first token: raw chunk prefixes vs. packed context.
+
+Run: python -m benchmarks.prompt_packing [requests] [prompt_token_delay_s]
+
+The stub charges `prompt_token_delay_s` per prompt token it has not seen
+as a prefix of the previous prompt, like Ollama's KV cache reuse.
+"""
+
+import statistics
+import sys
+
+from app.core.context_packer import estimate_tokens, pack_context
+from app.core.llm_question_engine import _build_prompt, _question_complete
+from app.core.local_sources import SourceChunk, retrieve_chunks
+from app.llm.ollama_client import OllamaClient
+from app.llm.stub_server import StubOllamaServer
+
+TOPICS = ["inflace", "nezamestnanost", "urokove sazby", "hdp"]
+FILLER = (
+    "Tato kapitola navazuje na predchozi cast ucebnice. Nejprve si zopakujeme pojmy z minule hodiny. "
+    "Na konci kapitoly najdete shrnuti a cviceni. Obrazek 3 ukazuje vyvoj v case. "
+)
+SOURCES = [
+    SourceChunk(text=FILLER + "Inflace je rust cenove hladiny. Inflace snizuje kupni silu penez.", source="a.txt"),
+    SourceChunk(text=FILLER + "Nezamestnanost meri podil lidi bez prace. Nezamestnanost roste v recesi.", source="a.txt"),
+    SourceChunk(text=FILLER + "Centralni banka meni urokove sazby. Vyssi urokove sazby brzdi inflaci.", source="a.txt"),
+    SourceChunk(text=FILLER + "HDP je hodnota vyrobenych statku a sluzeb. Realne HDP je ocistene o inflaci.", source="a.txt"),
+]
+
+
+def legacy_prompt(subject: str, level: str, topic: str, strictness: int, chunks: list[SourceChunk]) -> str:
+    """The previous layout: topic near the top, first 300 characters of each chunk."""
+    header = (
+        "You are a tutoring assistant.\n"
+        "Create one short question in Czech without diacritics.\n"
+        "Use the subject, level, and topic.\n"
+        "Return only the question text, no bullets, no numbering.\n"
+        f"Subject: {subject}\n"
+        f"Level: {level}\n"
+        f"Topic: {topic}\n"
+        f"Strictness: {strictness}\n"
+    )
+    source_lines = "\n".join(f"- {chunk.text[:300]}" for chunk in chunks if chunk.text.strip())
+    return f"{header}Sources:\n{source_lines}"
+
+
+def packed_prompt(subject: str, level: str, topic: str, strictness: int, chunks: list[SourceChunk]) -> str:
+    query = f"{subject} {topic} {level}"
+    return _build_prompt(subject, level, topic, strictness, pack_context(query, chunks))
+
+
+def run(name: str, build, count: int, prompt_token_delay_s: float) -> None:
+    with StubOllamaServer(prompt_token_delay_s=prompt_token_delay_s) as server:
+        client = OllamaClient(server.base_url)
+        first_token: list[float] = []
+        sizes: list[int] = []
+        for index in range(count):
+            topic = TOPICS[index % len(TOPICS)]
+            chunks = retrieve_chunks(SOURCES, f"ekonomie {topic} stredni", limit=3)
+            prompt = build("ekonomie", "stredni", topic, 3, chunks)
+            sizes.append(estimate_tokens(prompt))
+            result = client.stream_generate(prompt, model="stub", stop=_question_complete)
+            first_token.append(result.first_token_s or 0.0)
+        client.close()
+    print(
+        f"{name:<8} prompt={statistics.fmean(sizes):6.1f} tok "
+        f"evaluated={server.prompt_tokens_evaluated / count:6.1f} tok "
+        f"ttft p50={statistics.median(first_token) * 1000:6.1f} ms "
+        f"mean={statistics.fmean(first_token) * 1000:6.1f} ms"
+    )
+
+
+def main(count: int = 20, prompt_token_delay_s: float = 0.001) -> None:
+    print(f"requests: {count}, prompt processing: {prompt_token_delay_s * 1000:.1f} ms per token")
+    run("before", legacy_prompt, count, prompt_token_delay_s)
+    run("after", packed_prompt, count, prompt_token_delay_s)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 20, float(args[1]) if len(args) > 1 else 0.001)
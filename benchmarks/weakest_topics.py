@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+"""Weakest-topics query: full scan and sort vs. the incremental index.
+
+Run: python -m benchmarks.weakest_topics [topics] [queries]
+
+Each round records one answer and then asks for the top 3, as /weak or
+/status does after every answer.
+"""
+
+import random
+import sys
+import time
+
+from app.storage.memory import StudentMemory, get_weakest_topics, update_weakness_stats
+
+
+def scan_weakest(memory: StudentMemory, *, subject: str, limit: int) -> list[tuple[str, float, int]]:
+    """The previous implementation: score every topic and sort."""
+    scored = [
+        (topic, stats["fail"] / stats["total"], stats["total"])
+        for topic, stats in memory.weakness_stats.get(subject, {}).items()
+        if stats["total"] > 0
+    ]
+    scored.sort(key=lambda item: (item[1], item[2]), reverse=True)
+    return scored[:limit]
+
+
+def main(topics: int = 2000, queries: int = 2000) -> None:
+    rng = random.Random(11)
+    memory = StudentMemory()
+    for index in range(topics * 5):
+        update_weakness_stats(memory, subject="ekonomie", topic=f"tema{index % topics}", ok=rng.random() < 0.6)
+
+    for name, query in (("scan + sort", scan_weakest), ("index", get_weakest_topics)):
+        started = time.perf_counter()
+        for round_index in range(queries):
+            update_weakness_stats(memory, subject="ekonomie", topic=f"tema{round_index % topics}", ok=round_index % 3 == 0)
+            query(memory, subject="ekonomie", limit=3)
+        per_round = (time.perf_counter() - started) / queries
+        print(f"{name:<12} {per_round * 1e6:9.1f} us per answer + top-3 ({topics} topics)")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(int(args[0]) if args else 2000, int(args[1]) if len(args) > 1 else 2000)
@@ -6,15 +6,17 @@ import tempfile
 import json
 import csv
 import io
+import os
 from pathlib import Path
 
 import streamlit as st
 
-from app.cli import CliContext, handle_command
+from app.cli import CliContext, enable_prefetch, handle_command, memory_path_for, restore_budget, warm_up_llm
 from app.core.session import LessonSession
 from app.core.state_machine import TeacherEngine
 from app.llm.ollama_client import DEFAULT_MODEL
-from app.storage.memory import load_memory, save_memory
+from app.storage.memory_store import open_store
+from app.storage.retention import daily_summary
 from app.core.local_sources import ingest_file
 
 
@@ -26,7 +28,6 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
-MEMORY_PATH = Path(__file__).resolve().parent / "app" / "storage" / "student_memory.json"
 PROMPT_PATH = Path(__file__).resolve().parent / "app" / "prompts" / "klara.txt"
 
 
@@ -37,7 +38,10 @@ def init_session_state() -> None:
         if PROMPT_PATH.exists():
             persona_text = PROMPT_PATH.read_text(encoding="utf-8").strip()
         
-        memory = load_memory(MEMORY_PATH)
+        # ?student=<id> gives each student their own memory shard.
+        memory_path = memory_path_for(st.query_params.get("student") or os.environ.get("KLARA_STUDENT_ID"))
+        store = open_store(memory_path)
+        memory = store.memory
         prefs = memory.preferences if isinstance(memory.preferences, dict) else {}
         
         saved_topic = prefs.get("topic")
@@ -45,22 +49,31 @@ def init_session_state() -> None:
         saved_level = prefs.get("level")
         saved_llm_enabled = prefs.get("llm_enabled")
         saved_llm_model = prefs.get("llm_model")
+        saved_llm_cache = prefs.get("llm_cache")
+        saved_llm_fast_model = prefs.get("llm_fast_model")
+        saved_llm_budget_s = prefs.get("llm_budget_s")
         saved_voice_enabled = prefs.get("voice_enabled")
         saved_mode = prefs.get("mode", "teacher")
         
         context = CliContext(
             engine=TeacherEngine(),
             session=LessonSession(),
-            memory_path=MEMORY_PATH,
+            memory_path=memory_path,
+            memory_store=store,
             persona_text=persona_text,
             topic=saved_topic if saved_topic else None,
             subject=saved_subject if saved_subject else None,
             level=saved_level if saved_level else None,
             llm_enabled=True if saved_llm_enabled is True else False,
             llm_model=saved_llm_model if isinstance(saved_llm_model, str) and saved_llm_model else DEFAULT_MODEL,
+            llm_cache=False if saved_llm_cache is False else True,
+            llm_fast_model=saved_llm_fast_model if isinstance(saved_llm_fast_model, str) and saved_llm_fast_model else None,
+            llm_budget_s=restore_budget(saved_llm_budget_s),
             voice_enabled=True if saved_voice_enabled is True else False,
             mode=saved_mode if saved_mode in {"teacher", "assistant"} else "teacher",
         )
+        enable_prefetch(context)
+        warm_up_llm(context)
         st.session_state.context = context
         st.session_state.chat_history = []
         st.session_state.last_response = None
@@ -223,18 +236,17 @@ def main() -> None:
                             st.error(msg2)
                 with col_b:
                     if st.button("Generate lesson from selected"):
-                        from app.core.question_engine import generate_lesson_from_sources
+                        from app.core.lesson_cache import generate_lesson_cached
                         sel_path = uploads_dir / selected
                         try:
                             chunks2 = ingest_file(sel_path)
-                            lesson, analysis = generate_lesson_from_sources(
+                            lesson, analysis = generate_lesson_cached(
                                 chunks2,
                                 subject=context.subject or "ekonomie",
                                 level=context.level or "zakladni",
                                 strictness=context.engine.strictness,
                                 n_total=int(total_questions),
                                 preview_len=int(preview_len),
-                                return_meta=True,
                             )
                             # save lesson in chosen format
                             base_name = f"lesson_{selected}"
@@ -254,7 +266,8 @@ def main() -> None:
                                         writer.writerow([row])
                                 payload = lesson_file.read_bytes()
 
-                            msg3 = f"✅ Generated lesson ({len(lesson)} items) and saved to {lesson_file.name}"
+                            origin = "from cache" if analysis.cached else "generated"
+                            msg3 = f"✅ Lesson {origin} ({len(lesson)} items) and saved to {lesson_file.name}"
                             st.session_state.chat_history.append(("system", msg3))
                             st.session_state.last_response = msg3
                             st.success(msg3)
@@ -263,6 +276,11 @@ def main() -> None:
                                 st.write(f"Top topics: {topics_label}")
                             st.write(f"Explicit questions: {len(analysis.explicit_questions)}")
                             st.write(f"Final lesson count: {len(lesson)}")
+                            if analysis.timings:
+                                timings_label = ", ".join(
+                                    f"{stage} {seconds * 1000:.1f} ms" for stage, seconds in analysis.timings.items()
+                                )
+                                st.caption(f"Stage timings: {timings_label}")
                             # display preview truncated to preview_len
                             st.subheader("Generated lesson preview")
                             for i, it in enumerate(lesson[:20], 1):
@@ -288,6 +306,20 @@ def main() -> None:
 
                 # Extra management actions
                 st.divider()
+                if st.button("Pre-warm lessons for all uploads"):
+                    from app.core.lesson_cache import prewarm_lessons
+                    warm_paths = [
+                        uploads_dir / name for name in uploads_list if not name.startswith("lesson_")
+                    ]
+                    warmed = prewarm_lessons(
+                        warm_paths,
+                        subject=context.subject or "ekonomie",
+                        level=context.level or "zakladni",
+                        strictness=context.engine.strictness,
+                        n_total=int(total_questions),
+                        preview_len=int(preview_len),
+                    )
+                    st.success(f"Pre-warmed {len(warmed)} lessons")
                 if st.button("Clear loaded sources"):
                     context.sources.clear()
                     st.success("Cleared loaded sources")
@@ -309,7 +341,7 @@ def main() -> None:
         
         with tab3:
             st.subheader("Lesson History")
-            memory = load_memory(MEMORY_PATH)
+            memory = open_store(context.memory_path).memory
             if memory.lesson_history:
                 for i, record in enumerate(reversed(memory.lesson_history[-5:])):  # Last 5
                     st.write(
@@ -320,6 +352,11 @@ def main() -> None:
                     )
             else:
                 st.write("No lessons yet")
+            recent = daily_summary(memory, days=7)
+            if recent:
+                lessons = sum(rollup.lessons for _, rollup in recent)
+                errors = sum(rollup.errors for _, rollup in recent)
+                st.caption(f"Last 7 days: {lessons} lessons, {errors} errors on {len(recent)} days")
     
     # Main chat area
     st.subheader("Lesson Interface")
@@ -427,7 +464,7 @@ def main() -> None:
                     st.session_state.chat_history.append(("system", response))
                     st.rerun()
         
-        memory = load_memory(MEMORY_PATH)
+        memory = open_store(context.memory_path).memory
         if memory.todos:
             for i, todo in enumerate(memory.todos, 1):
                 col1, col2 = st.columns([4, 1])
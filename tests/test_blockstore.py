@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+"""Tests for block-compressed storage and the compressed index."""
+
+import struct
+import tempfile
+import threading
+import unittest
+import zlib
+from pathlib import Path
+from unittest import mock
+
+from app.core import local_sources
+from app.core.blockstore import BlockReader, write_records
+from app.core.local_sources import SourceChunk, retrieve_chunks
+from app.core.retrieval import build_index, load_compressed_index, search, search_compressed, write_compressed_index
+
+
+class BlockStoreTests(unittest.TestCase):
+    def test_random_access_roundtrip(self) -> None:
+        records = [f"record {index}".encode("utf-8") for index in range(150)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "records.klb"
+            write_records(path, records, meta={"name": "test"}, codec="zlib", block_records=16)
+            reader = BlockReader(path)
+            self.assertEqual(len(reader), 150)
+            self.assertEqual(reader.meta["name"], "test")
+            self.assertEqual(reader.get(0), b"record 0")
+            self.assertEqual(reader.get(149), b"record 149")
+            self.assertEqual(reader.iter_all(), records)
+
+    def test_compressed_index_matches_json_index(self) -> None:
+        chunks = [
+            SourceChunk(text="apple banana fruit salad", source="test"),
+            SourceChunk(text="car engine fuel and torque", source="test"),
+            SourceChunk(text="banana smoothie recipe with milk", source="test"),
+            SourceChunk(text="inflation and banana prices in the market", source="test"),
+        ]
+        index = build_index(chunks)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "index.klb"
+            write_compressed_index(path, index, codec="zlib")
+            compressed = load_compressed_index(path, chunks)
+            self.assertIsNotNone(compressed)
+            for query in ["banana recipe", "engine", "market inflation", "nothing here"]:
+                self.assertEqual(search(index, query, k=2), search_compressed(compressed, query, k=2))
+
+    def test_shared_reader_survives_concurrent_reads(self) -> None:
+        records = [f"record {index}".encode("utf-8") for index in range(256)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / "records.klb"
+            write_records(path, records, codec="zlib", block_records=4)
+            reader = BlockReader(path, cache_blocks=2)
+            errors: list[BaseException] = []
+
+            def read(offset: int) -> None:
+                try:
+                    for step in range(400):
+                        index = (offset * 37 + step * 13) % len(records)
+                        self.assertEqual(reader.get(index), records[index])
+                except BaseException as exc:  # noqa: BLE001 - reported below
+                    errors.append(exc)
+
+            threads = [threading.Thread(target=read, args=(offset,)) for offset in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(errors, [])
+            self.assertLessEqual(len(reader._cache), 2)
+
+    def test_deleted_index_file_is_rebuilt(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source = Path(tmp_dir) / "notes.txt"
+            source.write_text("banana prices\n\nengine torque", encoding="utf-8")
+            chunks = [
+                SourceChunk(text="banana prices in the market", source=str(source)),
+                SourceChunk(text="engine torque and fuel", source=str(source)),
+            ]
+            index_dir = Path(tmp_dir) / ".index"
+            with mock.patch.object(local_sources, "_index_dir", lambda: index_dir), mock.patch.object(
+                local_sources, "INDEX_CODEC", "zlib"
+            ), mock.patch.object(local_sources, "_COMPRESSED_INDEXES", local_sources._LruCache(4)):
+                retrieve_chunks(chunks, "engine")
+                self.assertEqual(retrieve_chunks(chunks, "engine"), [chunks[1]])
+                index_files = list(index_dir.glob("*.klb"))
+                self.assertEqual(len(index_files), 1)
+                cached = local_sources._COMPRESSED_INDEXES.get(index_files[0])
+                cached.reader._cache.clear()
+                index_files[0].unlink()
+
+                self.assertEqual(retrieve_chunks(chunks, "banana"), [chunks[0]])
+                self.assertTrue(index_files[0].exists())
+
+    def test_damaged_index_blocks_are_rebuilt(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source = Path(tmp_dir) / "notes.txt"
+            source.write_text("notes", encoding="utf-8")
+            chunks = [SourceChunk(text=f"topic{index} banana prices", source=str(source)) for index in range(100)]
+            index_dir = Path(tmp_dir) / ".index"
+            with mock.patch.object(local_sources, "_index_dir", lambda: index_dir), mock.patch.object(
+                local_sources, "INDEX_CODEC", "zlib"
+            ), mock.patch.object(local_sources, "_COMPRESSED_INDEXES", local_sources._LruCache(4)):
+                retrieve_chunks(chunks, "banana")
+                self.assertEqual(retrieve_chunks(chunks, "topic7"), [chunks[7]])
+                (index_file,) = index_dir.glob("*.klb")
+                reader = local_sources._COMPRESSED_INDEXES.get(index_file).reader
+                # Valid zlib streams that decode too short: unpacking the record lengths fails.
+                data = bytearray(index_file.read_bytes())
+                for offset, length in reader._blocks:
+                    start = reader._data_offset + offset
+                    data[start : start + length] = zlib.compress(b"\0").ljust(length, b"\0")
+                index_file.write_bytes(bytes(data))
+                reader._cache.clear()
+                with self.assertRaises(struct.error):
+                    reader.get(0)
+
+                self.assertEqual(retrieve_chunks(chunks, "topic99"), [chunks[99]])
+                self.assertEqual(retrieve_chunks(chunks, "topic98"), [chunks[98]])
+
+    def test_open_indexes_are_bounded(self) -> None:
+        cache = local_sources._LruCache(2)
+        for key in ("a", "b"):
+            cache.put(key, key)
+        cache.get("a")
+        cache.put("c", "c")
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), ("a", None, "c"))
+        self.assertEqual(len(cache), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
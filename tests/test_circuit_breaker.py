@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+"""Tests for the LLM circuit breaker."""
+
+import socket
+import time
+import unittest
+
+from app.llm.circuit_breaker import STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, CircuitBreaker
+from app.llm.ollama_client import OllamaClient
+from app.llm.stub_server import StubOllamaServer
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def test_opens_after_threshold_and_half_opens_after_cooldown(self) -> None:
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, cooldown_s=10, clock=clock)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, STATE_OPEN)
+        self.assertFalse(breaker.allow())
+        clock.now = 10
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, STATE_HALF_OPEN)
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, STATE_OPEN)
+        clock.now = 20
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, STATE_CLOSED)
+
+    def test_probe_closes_circuit(self) -> None:
+        healthy = [False, True]
+        breaker = CircuitBreaker(failure_threshold=1, cooldown_s=60, probe=lambda: healthy.pop(0), probe_interval_s=0.01)
+        breaker.record_failure()
+        self.assertTrue(breaker.is_open())
+        deadline = time.monotonic() + 2
+        while breaker.is_open() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(breaker.state, STATE_CLOSED)
+
+
+class OllamaClientCircuitTests(unittest.TestCase):
+    def test_offline_server_fails_fast(self) -> None:
+        client = OllamaClient(f"http://127.0.0.1:{_free_port()}", connect_timeout_s=1, failure_threshold=2)
+        for _ in range(2):
+            self.assertEqual(client.stream_generate("prompt").error, "unavailable")
+        self.assertFalse(client.available())
+        started = time.perf_counter()
+        result = client.stream_generate("prompt")
+        self.assertEqual(result.error, "circuit_open")
+        self.assertIn("not running", result.text)
+        self.assertLess(time.perf_counter() - started, 0.01)
+
+    def test_health_probe_is_cached(self) -> None:
+        with StubOllamaServer() as server:
+            client = OllamaClient(server.base_url)
+            self.assertTrue(client.check_health())
+            self.assertTrue(client.check_health())
+            client.close()
+        self.assertEqual(server.requests, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+"""Tests for prompt context packing."""
+
+import unittest
+
+from app.core.context_packer import estimate_tokens, pack_context
+from app.core.llm_question_engine import PROMPT_PREFIX, _build_prompt
+from app.core.local_sources import SourceChunk
+
+
+class ContextPackerTests(unittest.TestCase):
+    def test_picks_relevant_sentences_in_document_order(self) -> None:
+        chunks = [
+            SourceChunk(text="Uvod do kapitoly. Inflace snizuje kupni silu. Obrazek 2.", source="a.txt"),
+            SourceChunk(text="Centralni banka a inflace spolu souvisi. Shrnuti na konci.", source="a.txt"),
+        ]
+        packed = pack_context("ekonomie inflace", chunks, budget_tokens=100)
+        self.assertEqual(packed, ["Inflace snizuje kupni silu.", "Centralni banka a inflace spolu souvisi."])
+
+    def test_respects_budget(self) -> None:
+        text = " ".join(f"Inflace veta cislo {index} ma nejaky obsah." for index in range(50))
+        packed = pack_context("inflace", [SourceChunk(text=text, source="a.txt")], budget_tokens=40)
+        self.assertLessEqual(sum(estimate_tokens(sentence) for sentence in packed), 40)
+        self.assertTrue(packed)
+
+    def test_falls_back_to_opening_sentences(self) -> None:
+        chunks = [SourceChunk(text="Prvni veta. Druha veta.", source="a.txt")]
+        self.assertEqual(pack_context("chemie", chunks, budget_tokens=5), ["Prvni veta."])
+
+    def test_prompts_share_a_stable_prefix(self) -> None:
+        first = _build_prompt("ekonomie", "stredni", "inflace", 3, ["Inflace je rust cen."])
+        second = _build_prompt("ekonomie", "stredni", "hdp", 3, ["HDP meri vykon."])
+        shared = f"{PROMPT_PREFIX}Subject: ekonomie\nLevel: stredni\nStrictness: 3\nSources:\n- "
+        self.assertTrue(first.startswith(shared))
+        self.assertTrue(second.startswith(shared))
+
+
+if __name__ == "__main__":
+    unittest.main()
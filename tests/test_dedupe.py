@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+"""Tests for SimHash near-duplicate filtering."""
+
+import random
+import unittest
+
+from app.core.dedupe import NearDuplicateFilter, dedupe_near, normalize_text
+from app.core.question_engine import _dedupe_questions
+
+
+class NearDuplicateTests(unittest.TestCase):
+    def test_czech_questions_are_not_collapsed(self) -> None:
+        items = ["Co je trh práce?", "Co je trh půdy?", "Co je trh prace?"]
+        self.assertEqual(dedupe_near(items), ["Co je trh práce?", "Co je trh půdy?"])
+
+    def test_lesson_dedupe_ignores_tags_and_previews(self) -> None:
+        items = [
+            "[From document] Jak se meri HDP v ceske republice?",
+            "[Generated] Jak se měří HDP v České republice\n[From document: text]",
+            "[Generated] Define the key idea of inflace.\n[From document: text]",
+            "[Generated] Define the key idea of deflace.\n[From document: text]",
+        ]
+        self.assertEqual(len(_dedupe_questions(items)), 3)
+
+    def test_threshold_is_configurable(self) -> None:
+        strict = NearDuplicateFilter(max_distance=0)
+        self.assertTrue(strict.add(normalize_text("Vysvetli pojem inflace")))
+        self.assertFalse(strict.add(normalize_text("Vysvětli pojem inflace!")))
+        with self.assertRaises(ValueError):
+            NearDuplicateFilter(max_distance=40)
+
+    def test_scales_to_large_question_banks(self) -> None:
+        rng = random.Random(3)
+        vocabulary = [f"slovo{index}" for index in range(500)]
+        items = [" ".join(rng.sample(vocabulary, 8)) for _ in range(3000)]
+        self.assertEqual(len(dedupe_near(items + items)), 3000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+"""Tests for the memory journal and its replay after a crash."""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.storage.journal import MemoryJournal, answer_event, journal_path_for
+from app.storage.memory import StudentMemory, load_memory, save_memory
+from app.storage.memory_store import MemoryStore
+
+
+def _counters(stats: dict[str, object]) -> dict[str, object]:
+    return {key: stats[key] for key in ("total", "ok", "fail")}
+
+
+def _crash(store: MemoryStore) -> None:
+    """Drop the store without flushing, as if the process had been killed."""
+    with store._cond:
+        store._closed = True
+        store._dirty = False
+        store._cond.notify_all()
+
+
+class MemoryJournalTests(unittest.TestCase):
+    def test_answers_append_to_journal_and_replay_after_crash(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "memory.json"
+            store = MemoryStore(path, flush_delay_s=60)
+            for index in range(5):
+                store.record_answer(subject="ekonomie", topic="inflace", ok=index % 2 == 0)
+            store.record_lesson(errors=2, strictness_peak=3, topic="inflace", subject="ekonomie")
+            self.assertFalse(path.exists())
+            self.assertEqual(len(journal_path_for(path).read_text(encoding="utf-8").splitlines()), 6)
+            _crash(store)
+
+            memory = MemoryStore(path).memory
+            self.assertEqual(_counters(memory.weakness_stats["ekonomie"]["inflace"]), {"total": 5, "ok": 3, "fail": 2})
+            self.assertEqual(len(memory.lesson_history), 1)
+            self.assertEqual(memory.journal_seq, 6)
+
+    def test_torn_last_line_is_ignored_and_cut_off(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "memory.json"
+            store = MemoryStore(path, flush_delay_s=60)
+            store.record_answer(subject="ekonomie", topic="inflace", ok=False)
+            store.record_answer(subject="ekonomie", topic="inflace", ok=True)
+            _crash(store)
+            journal = journal_path_for(path)
+            with journal.open("a", encoding="utf-8") as handle:
+                handle.write('{"seq":3,"op":"answer","subject":"ekon')
+
+            store = MemoryStore(path, flush_delay_s=60)
+            self.assertEqual(store.memory.weakness_stats["ekonomie"]["inflace"]["total"], 2)
+            self.assertTrue(journal.read_text(encoding="utf-8").endswith("\n"))
+            store.record_answer(subject="ekonomie", topic="inflace", ok=False)
+            _crash(store)
+
+            memory = MemoryStore(path).memory
+            self.assertEqual(_counters(memory.weakness_stats["ekonomie"]["inflace"]), {"total": 3, "ok": 1, "fail": 2})
+
+    def test_events_already_in_snapshot_are_not_applied_twice(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "memory.json"
+            journal = MemoryJournal(journal_path_for(path))
+            memory = StudentMemory()
+            for seq in (1, 2):
+                journal.append(answer_event(seq, "ekonomie", "inflace", False))
+            journal.replay(memory)
+            # Snapshot written, then a crash before the journal was emptied.
+            save_memory(path, memory)
+            journal.append(answer_event(3, "ekonomie", "inflace", True))
+
+            reloaded = load_memory(path)
+            self.assertEqual(journal.replay(reloaded), 1)
+            self.assertEqual(_counters(reloaded.weakness_stats["ekonomie"]["inflace"]), {"total": 3, "ok": 1, "fail": 2})
+
+    def test_large_journal_is_compacted_into_snapshot(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "memory.json"
+            store = MemoryStore(path, flush_delay_s=0, compact_bytes=1024)
+            for _ in range(30):
+                store.record_answer(subject="ekonomie", topic="inflace", ok=False)
+            store.close()
+            self.assertLess(store.journal.size(), 1024)
+            memory = MemoryStore(path).memory
+            self.assertEqual(memory.weakness_stats["ekonomie"]["inflace"]["fail"], 30)
+            self.assertGreater(load_memory(path).journal_seq, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
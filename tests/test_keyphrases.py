@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+"""Tests for streaming keyphrase extraction."""
+
+import unittest
+from unittest import mock
+
+from app.core import question_engine
+from app.core.keyphrases import KeyphraseExtractor
+from app.core.local_sources import SourceChunk
+
+
+class KeyphraseExtractorTests(unittest.TestCase):
+    def test_prefers_frequent_bigrams(self) -> None:
+        extractor = KeyphraseExtractor()
+        extractor.add_chunk("nabidka penez roste, nabidka penez klesa")
+        extractor.add_chunk("centralni banka ridi nabidka penez")
+        extractor.add_chunk("inflace a mzdy")
+        self.assertEqual(extractor.top(1), ["nabidka penez"])
+        self.assertEqual(extractor.chunk_count, 3)
+
+    def test_skips_retrieval_and_czech_stopwords(self) -> None:
+        extractor = KeyphraseExtractor()
+        extractor.add_chunk("proto jsou ceny vysoke, proto jsou mzdy")
+        extractor.add_chunk("the market and the prices with inflation")
+        top = extractor.top(20)
+        for word in ("proto", "jsou", "the", "and", "with"):
+            self.assertFalse(any(word in phrase.split() for phrase in top), word)
+
+    def test_topics_cached_per_corpus(self) -> None:
+        chunks = [SourceChunk(text="hruby domaci produkt a hruby domaci produkt", source="memory-only")]
+        first = question_engine.analyze_sources(chunks, topic_k=2)
+        with mock.patch.object(question_engine, "extract_topics") as extract:
+            second = question_engine.analyze_sources(chunks, topic_k=2)
+        extract.assert_not_called()
+        self.assertEqual(first.topics, second.topics)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+"""Tests for the generated-lesson cache."""
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from app.core import lesson_cache
+from app.core.lesson_cache import LessonCache, LessonKey, generate_lesson_cached
+from app.core.local_sources import SourceChunk
+from app.core.question_engine import LessonAnalysis
+
+
+def _key(n_total: int) -> LessonKey:
+    return LessonKey(
+        fingerprint="corpus",
+        subject="ekonomie",
+        level="zakladni",
+        strictness=4,
+        n_total=n_total,
+        preview_len=300,
+        per_topic_min=3,
+    )
+
+
+class LessonCacheTests(unittest.TestCase):
+    def test_repeat_request_is_served_from_cache(self) -> None:
+        chunks = [SourceChunk(text="nabidka a poptavka na trhu, nabidka a poptavka", source="test")]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = LessonCache(Path(tmp_dir))
+            first, first_analysis = generate_lesson_cached(chunks, subject="ekonomie", n_total=5, cache=cache)
+            with mock.patch.object(lesson_cache, "generate_lesson_from_sources") as generate:
+                second, second_analysis = generate_lesson_cached(chunks, subject="ekonomie", n_total=5, cache=cache)
+            generate.assert_not_called()
+            self.assertEqual(first, second)
+            self.assertFalse(first_analysis.cached)
+            self.assertTrue(second_analysis.cached)
+            self.assertEqual(first_analysis.topics, second_analysis.topics)
+
+    def test_lru_eviction_drops_least_recently_read(self) -> None:
+        analysis = LessonAnalysis(topics=["inflace"], explicit_questions=[])
+        keys = [_key(n_total) for n_total in (3, 4, 5)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = LessonCache(Path(tmp_dir), max_entries=2)
+            for index, key in enumerate(keys[:2]):
+                cache.put(key, [f"lekce {index}"], analysis)
+                # Distinct, old timestamps: the read below must be what keeps keys[0].
+                os.utime(cache._path(key), (1_000_000 + index, 1_000_000 + index))
+            self.assertIsNotNone(cache.get(keys[0]))
+            cache.put(keys[2], ["lekce 2"], analysis)
+            self.assertEqual(len(list(Path(tmp_dir).glob("*.json"))), 2)
+            self.assertIsNotNone(cache.get(keys[0]))
+            self.assertIsNone(cache.get(keys[1]))
+            self.assertIsNotNone(cache.get(keys[2]))
+
+    def test_generator_version_change_regenerates(self) -> None:
+        chunks = [SourceChunk(text="inflace a mzdy na trhu prace", source="test")]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = LessonCache(Path(tmp_dir))
+            lesson, _analysis = generate_lesson_cached(chunks, n_total=3, cache=cache)
+            with mock.patch.object(lesson_cache, "LESSON_GENERATOR_VERSION", 2), mock.patch.object(
+                lesson_cache, "generate_lesson_from_sources", return_value=(lesson, _analysis)
+            ) as generate:
+                generate_lesson_cached(chunks, n_total=3, cache=cache)
+            generate.assert_called_once()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -29,5 +29,14 @@ def test_generate_lesson_basic():
     assert any("[From document:" in item for item in lesson)
 
 
+def test_generate_lesson_reports_stage_timings():
+    chunks = [SourceChunk(text="inflace a trh prace, inflace a mzdy na trhu prace", source="test")]
+    lesson, analysis = generate_lesson_from_sources(chunks, subject="ekonomie", n_total=4, return_meta=True)
+    assert lesson
+    for stage in ("fingerprint", "explicit", "topics", "previews", "assemble"):
+        assert stage in analysis.timings
+        assert analysis.timings[stage] >= 0
+
+
 def test_generate_lesson_no_sources():
     assert generate_lesson_from_sources([], subject="ekonomie", level="zakladni", strictness=3, n_total=3) == []
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+"""Tests for concurrent batch LLM question generation."""
+
+import time
+import unittest
+from unittest import mock
+
+from app.core.llm_question_engine import generate_llm_questions
+from app.llm import ollama_client
+from app.llm.ollama_client import OllamaClient
+from app.llm.stub_server import StubOllamaServer
+
+
+class LlmBatchTests(unittest.TestCase):
+    def test_batch_runs_concurrently_in_order(self) -> None:
+        with StubOllamaServer(reply="Co je inflace?", latency_s=0.2) as server:
+            client = OllamaClient(server.base_url)
+            with mock.patch.object(ollama_client, "_DEFAULT_CLIENT", client):
+                started = time.perf_counter()
+                questions = generate_llm_questions(
+                    ["inflace", "trh", "mzdy", "dane", "inflace", "trh"],
+                    "ekonomie",
+                    "stredni",
+                    3,
+                    sources=[],
+                    model="stub",
+                    use_cache=False,
+                    max_in_flight=6,
+                )
+                elapsed = time.perf_counter() - started
+            client.close()
+        self.assertLess(elapsed, 0.6)
+        self.assertEqual([question.meta.topic for question in questions], ["inflace", "trh", "mzdy", "dane", "inflace", "trh"])
+
+    def test_failures_are_none(self) -> None:
+        with mock.patch("app.core.llm_question_engine.stream_generate", side_effect=RuntimeError("boom")):
+            questions = generate_llm_questions([None, None], "ekonomie", None, 3, sources=[], model="stub", use_cache=False)
+        self.assertEqual(questions, [None, None])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+"""Tests for the write-behind memory store."""
+
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+from app.cli import CliContext, handle_command
+from app.core.session import LessonSession
+from app.core.state_machine import TeacherEngine
+from app.storage.memory import load_memory, update_weakness_stats
+from app.storage.memory_store import MemoryStore
+
+
+class MemoryStoreTests(unittest.TestCase):
+    def test_burst_of_changes_is_one_write(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "memory.json"
+            store = MemoryStore(path, flush_delay_s=0.05)
+            for index in range(20):
+                update_weakness_stats(store.memory, subject="ekonomie", topic=f"tema{index % 3}", ok=False)
+                store.mark_dirty()
+            self.assertFalse(path.exists())
+            deadline = time.monotonic() + 2
+            while store.dirty and time.monotonic() < deadline:
+                time.sleep(0.01)
+            store.close()
+            self.assertEqual(store.flushes, 1)
+            stats = load_memory(path).weakness_stats["ekonomie"]
+            self.assertEqual(sum(topic["fail"] for topic in stats.values()), 20)
+            self.assertEqual(sorted(item.name for item in Path(tmpdir).iterdir()), ["memory.json", "memory.json.lock"])
+
+    def test_commands_write_behind_and_end_flushes(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "memory.json"
+            context = CliContext(
+                engine=TeacherEngine(),
+                session=LessonSession(),
+                memory_path=path,
+                persona_text="",
+                memory_store=MemoryStore(path, flush_delay_s=60),
+            )
+            handle_command(context, "/topic inflace")
+            self.assertFalse(path.exists())
+            handle_command(context, "/end")
+            memory = load_memory(path)
+            self.assertEqual(memory.preferences["topic"], "inflace")
+            self.assertEqual(len(memory.lesson_history), 1)
+            context.memory_store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+"""Tests for the pooled Ollama client."""
+
+import socket
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from app.cli import CliContext, handle_command
+from app.core.llm_question_engine import _question_complete
+from app.core.session import LessonSession
+from app.core.state_machine import TeacherEngine
+from app.llm import ollama_client
+from app.llm.ollama_client import OllamaClient
+from app.llm.stub_server import StubOllamaServer
+from app.storage.memory_store import MemoryStore
+
+
+class OllamaClientTests(unittest.TestCase):
+    def test_reuses_one_connection(self) -> None:
+        with StubOllamaServer(reply="Co je HDP?") as server:
+            client = OllamaClient(server.base_url)
+            replies = [client.generate("prompt", model="stub") for _ in range(5)]
+            client.close()
+        self.assertEqual(replies, ["Co je HDP?"] * 5)
+        self.assertEqual(server.requests, 5)
+        self.assertEqual(server.connections, 1)
+
+    def test_stream_stops_at_first_question(self) -> None:
+        reply = "Co je inflace?\nDalsi text, ktery uz nikdo necte, " + "slovo " * 200
+        with StubOllamaServer(reply=reply, token_delay_s=0.001) as server:
+            client = OllamaClient(server.base_url)
+            result = client.stream_generate("prompt", model="stub", stop=_question_complete)
+            follow_up = client.stream_generate("prompt", model="stub")
+            client.close()
+        self.assertTrue(result.stopped_early)
+        self.assertEqual(result.text, "Co je inflace?")
+        self.assertIsNotNone(result.first_token_s)
+        self.assertLessEqual(result.first_token_s, result.total_s)
+        self.assertFalse(follow_up.stopped_early)
+        self.assertTrue(follow_up.text.endswith("slovo"))
+
+    def test_unreachable_server_reports_not_running(self) -> None:
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        client = OllamaClient(f"http://127.0.0.1:{port}", connect_timeout_s=1)
+        self.assertIn("not running", client.generate("prompt"))
+
+    def test_warm_up_and_options(self) -> None:
+        with StubOllamaServer(reply="jedna dva tri ctyri pet", load_s=0.2) as server:
+            client = OllamaClient(server.base_url, keep_alive="1h")
+            self.assertTrue(client.warm_up("stub"))
+            self.assertEqual(server.warmups, 1)
+            first = client.stream_generate("prompt", model="stub")
+            self.assertLess(first.first_token_s, 0.2)
+            self.assertEqual(server.last_payload["keep_alive"], "1h")
+            reply = client.generate("prompt", model="stub", options={"num_predict": 2})
+            client.close()
+        self.assertEqual(reply, "jedna dva")
+        self.assertEqual(server.last_payload["options"], {"num_predict": 2})
+
+    def test_invalid_base_url(self) -> None:
+        with self.assertRaises(ValueError):
+            OllamaClient("localhost:11434")
+
+    def test_num_parallel_follows_the_server_setting(self) -> None:
+        for value, expected in (("10", 10), ("0", 1), ("", 4), ("auto", 4)):
+            with mock.patch.dict("os.environ", {"OLLAMA_NUM_PARALLEL": value}):
+                self.assertEqual(ollama_client._num_parallel_from_env(), expected)
+
+    def test_status_reports_only_the_sessions_own_request(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir, StubOllamaServer(reply="Co je HDP?") as server:
+            client = OllamaClient(server.base_url)
+            contexts = [
+                CliContext(
+                    engine=TeacherEngine(),
+                    session=LessonSession(),
+                    memory_path=Path(tmpdir) / f"{name}.json",
+                    persona_text="",
+                    memory_store=MemoryStore(Path(tmpdir) / f"{name}.json", flush_delay_s=60),
+                    subject="ekonomie",
+                    llm_enabled=True,
+                    llm_model="stub",
+                    llm_cache=False,
+                )
+                for name in ("asking", "idle")
+            ]
+            with mock.patch.object(ollama_client, "_DEFAULT_CLIENT", client):
+                handle_command(contexts[0], "/ask")
+                statuses = [handle_command(context, "/status") for context in contexts]
+            client.close()
+        self.assertIn("llm_first_token=", statuses[0])
+        self.assertNotIn("llm_first_token=", statuses[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
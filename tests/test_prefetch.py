@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+"""Tests for background question prefetching."""
+
+import gc
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from app.cli import CliContext, enable_prefetch, handle_command
+from app.core.prefetch import PrefetchKey, QuestionPrefetcher
+from app.core.question_engine import Question, generate_question
+from app.core.session import LessonSession
+from app.core.state_machine import TeacherEngine
+from app.llm import ollama_client, router
+from app.llm.ollama_client import OllamaClient
+from app.llm.router import ModelRouter
+from app.llm.stub_server import StubOllamaServer
+from app.storage.memory_store import MemoryStore
+
+
+def _key(topic: str, strictness: int = 1) -> PrefetchKey:
+    return PrefetchKey(
+        subject="dejepis",
+        level="zakladni",
+        topic=topic,
+        strictness=strictness,
+        prefer_easy=False,
+        llm_enabled=False,
+        llm_model="test",
+        source_count=0,
+    )
+
+
+def _produce(key: PrefetchKey) -> Question:
+    return generate_question(key.subject, key.level, key.topic, key.strictness)
+
+
+class QuestionPrefetcherTests(unittest.TestCase):
+    def test_serves_prefetched_question_for_same_key(self) -> None:
+        prefetcher = QuestionPrefetcher(_produce, depth=2)
+        try:
+            key = _key("stredovek")
+            # A new key switches the worker, and take() waits for its question.
+            question = prefetcher.take(key, wait_s=2.0)
+            self.assertIsNotNone(question)
+            self.assertEqual(question.meta.topic, "stredovek")
+            self.assertEqual(prefetcher.take(key, wait_s=2.0).meta.topic, "stredovek")
+            self.assertEqual(prefetcher.hits, 2)
+        finally:
+            prefetcher.close()
+
+    def test_key_change_drops_queue(self) -> None:
+        prefetcher = QuestionPrefetcher(_produce, depth=2)
+        try:
+            prefetcher.prime(_key("stredovek"))
+            prefetcher.take(_key("stredovek"), wait_s=2.0)
+            question = prefetcher.take(_key("stredovek", strictness=4), wait_s=2.0)
+            self.assertIsNotNone(question)
+            self.assertIn("Krok 1", question.text)
+        finally:
+            prefetcher.close()
+
+    def test_waiting_take_reports_through_on_wait(self) -> None:
+        calls: list[bool] = []
+
+        def slow(key: PrefetchKey) -> Question:
+            time.sleep(0.1)
+            return _produce(key)
+
+        prefetcher = QuestionPrefetcher(slow, depth=1, on_wait=calls.append)
+        try:
+            prefetcher.prime(_key("stredovek"))
+            self.assertIsNotNone(prefetcher.take(_key("stredovek"), wait_s=2.0))
+        finally:
+            prefetcher.close()
+        self.assertEqual(calls, [True, False])
+
+    def test_key_change_reuses_worker_result(self) -> None:
+        produced: list[PrefetchKey] = []
+
+        def produce(key: PrefetchKey) -> Question:
+            produced.append(key)
+            return _produce(key)
+
+        prefetcher = QuestionPrefetcher(produce, depth=1)
+        try:
+            prefetcher.prime(_key("stredovek"))
+            prefetcher.take(_key("stredovek"), wait_s=2.0)
+            question = prefetcher.take(_key("novovek"), wait_s=2.0)
+            self.assertEqual(question.meta.topic, "novovek")
+            self.assertEqual(produced[:2], [_key("stredovek"), _key("novovek")])
+            self.assertEqual((prefetcher.hits, prefetcher.misses), (2, 0))
+        finally:
+            prefetcher.close()
+
+    def test_dropped_session_closes_its_prefetcher(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "memory.json"
+            context = CliContext(
+                engine=TeacherEngine(),
+                session=LessonSession(),
+                memory_path=path,
+                persona_text="",
+                memory_store=MemoryStore(path, flush_delay_s=60),
+            )
+            enable_prefetch(context)
+            worker = context.prefetcher._thread
+            del context
+            gc.collect()
+            worker.join(timeout=2.0)
+            self.assertFalse(worker.is_alive())
+
+    def test_llm_setting_changes_drop_prefetched_questions(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "memory.json"
+            context = CliContext(
+                engine=TeacherEngine(),
+                session=LessonSession(),
+                memory_path=path,
+                persona_text="",
+                memory_store=MemoryStore(path, flush_delay_s=60),
+                subject="dejepis",
+            )
+            enable_prefetch(context)
+            try:
+                for command in ("/fastmodel maly", "/budget 2", "/llmcache off"):
+                    handle_command(context, "/ok")
+                    deadline = time.monotonic() + 2
+                    while context.prefetcher.pending() == 0 and time.monotonic() < deadline:
+                        time.sleep(0.01)
+                    self.assertGreater(context.prefetcher.pending(), 0)
+                    handle_command(context, command)
+                    self.assertEqual(context.prefetcher.pending(), 0, command)
+            finally:
+                context.prefetcher.close()
+
+    def test_ask_keeps_budget_while_prefetch_is_in_flight(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir, StubOllamaServer(latency_s=1.5) as server:
+            path = Path(tmpdir) / "memory.json"
+            client = OllamaClient(server.base_url)
+            with mock.patch.object(ollama_client, "_DEFAULT_CLIENT", client), mock.patch.object(
+                router, "_DEFAULT_ROUTER", ModelRouter()
+            ):
+                context = CliContext(
+                    engine=TeacherEngine(),
+                    session=LessonSession(),
+                    memory_path=path,
+                    persona_text="",
+                    memory_store=MemoryStore(path, flush_delay_s=60),
+                    subject="ekonomie",
+                    topic="inflace",
+                    llm_enabled=True,
+                    llm_model="test",
+                    llm_cache=False,
+                    llm_budget_s=0.3,
+                )
+                enable_prefetch(context)
+                try:
+                    handle_command(context, "/ok")  # primes the prefetch with a slow LLM request
+                    time.sleep(0.1)
+                    started = time.perf_counter()
+                    question = handle_command(context, "/ask")
+                    elapsed = time.perf_counter() - started
+                finally:
+                    context.prefetcher.close()
+            client.close()
+        self.assertTrue(question)
+        self.assertNotEqual(context.session.last_question_meta.template_id, "llm")
+        self.assertLess(elapsed, 0.8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,9 +2,10 @@ from __future__ import annotations
 
 """Tests for question generation."""
 
+import random
 import unittest
 
-from app.core.question_engine import generate_question
+from app.core.question_engine import compiled_choices, generate_question, generate_questions
 
 
 class QuestionEngineTests(unittest.TestCase):
@@ -14,6 +15,19 @@ class QuestionEngineTests(unittest.TestCase):
         self.assertIn("1. svetova valka", question.text)
         self.assertEqual(question.meta.topic, "1. svetova valka")
 
+    def test_generate_questions_batch_is_reproducible(self) -> None:
+        first = generate_questions(5, "ekonomie", "stredni", "inflace", 4, rng=random.Random(7))
+        second = generate_questions(5, "ekonomie", "stredni", "inflace", 4, rng=random.Random(7))
+        self.assertEqual([question.text for question in first], [question.text for question in second])
+        self.assertEqual(len(first), 5)
+        for question in first:
+            self.assertIn("inflace", question.meta.expected_keywords)
+
+    def test_compiled_choices_prefer_easy(self) -> None:
+        choices = compiled_choices("dejepis", "zakladni", prefer_easy=True)
+        self.assertTrue(choices)
+        self.assertTrue(all(template.difficulty == "easy" for template in choices))
+
 
 if __name__ == "__main__":
     unittest.main()
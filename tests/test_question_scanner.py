@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+"""Tests for the streaming explicit-question scanner."""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from app.core import local_sources, question_engine
+from app.core.question_scanner import ExplicitQuestionScanner
+
+
+class ExplicitQuestionScannerTests(unittest.TestCase):
+    def test_state_carries_across_feeds(self) -> None:
+        scanner = ExplicitQuestionScanner()
+        scanner.feed("Názorné otázky:\nCo je to inflace a jak")
+        scanner.feed(" se meri?\nJak funguje centralni banka?\n\nDalsi odstavec bez otazek.\n1) Co je HDP")
+        scanner.feed(" a jak se pocita?")
+        self.assertEqual(
+            scanner.finish(),
+            [
+                "Co je to inflace a jak se meri?",
+                "Jak funguje centralni banka?",
+                "Co je HDP a jak se pocita?",
+            ],
+        )
+
+    def test_overlapping_pieces_do_not_duplicate(self) -> None:
+        scanner = ExplicitQuestionScanner()
+        scanner.feed("1) Co je nabidka penez?\n2) Co je poptavka po penezich?\n")
+        scanner.feed("2) Co je poptavka po penezich?\n3) Co je urokova sazba?\n")
+        self.assertEqual(len(scanner.finish()), 3)
+
+    def test_ingest_stores_questions_for_lessons(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source = Path(tmp_dir) / "script.txt"
+            source.write_text("Otázky:\nCo je inflace a proc vznika?\n\nText o trhu a cenach.", encoding="utf-8")
+            with mock.patch.object(local_sources, "_index_dir", lambda: Path(tmp_dir) / ".index"):
+                chunks = local_sources.ingest_file(source)
+                with mock.patch.object(question_engine, "scan_text_blocks") as scan:
+                    analysis = question_engine.analyze_sources(chunks, topic_k=2)
+                scan.assert_not_called()
+        self.assertEqual(analysis.explicit_questions, ["Co je inflace a proc vznika?"])
+
+    def test_multi_file_corpus_reuses_per_file_scans(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            first = Path(tmp_dir) / "first.txt"
+            first.write_text("Otázky:\nCo je inflace a proc vznika?\n\nText o trhu.", encoding="utf-8")
+            second = Path(tmp_dir) / "second.txt"
+            second.write_text("1) Jak se pocita HDP?\n\nText o vykonu ekonomiky.", encoding="utf-8")
+            index_dir = Path(tmp_dir) / ".index"
+            with mock.patch.object(local_sources, "_index_dir", lambda: index_dir), mock.patch.object(
+                local_sources, "_CORPUS_META", local_sources._LruCache(8)
+            ):
+                chunks = local_sources.ingest_file(first) + local_sources.ingest_file(second)
+                with mock.patch.object(question_engine, "scan_text_blocks") as scan:
+                    analysis = question_engine.analyze_sources(chunks, topic_k=2)
+                    scan.assert_not_called()
+                    combined = index_dir / f"{local_sources.corpus_fingerprint(chunks)}.meta.json"
+                    self.assertTrue(combined.exists())
+
+                    local_sources._CORPUS_META.clear()
+                    again = question_engine.analyze_sources(chunks, topic_k=2)
+                    scan.assert_not_called()
+        expected = ["Co je inflace a proc vznika?", "Jak se pocita HDP?"]
+        self.assertEqual(analysis.explicit_questions, expected)
+        self.assertEqual(again.explicit_questions, expected)
+        self.assertEqual(again.topics, analysis.topics)
+
+    def test_questions_shared_by_files_are_listed_once(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            first = Path(tmp_dir) / "first.txt"
+            first.write_text("1) Co je inflace a proc vznika?\n2) Jak se pocita HDP?", encoding="utf-8")
+            second = Path(tmp_dir) / "second.txt"
+            second.write_text("1) Co je  INFLACE a proc vznika?\n2) Co jsou mzdy?", encoding="utf-8")
+            with mock.patch.object(local_sources, "_index_dir", lambda: Path(tmp_dir) / ".index"), mock.patch.object(
+                local_sources, "_CORPUS_META", local_sources._LruCache(8)
+            ):
+                chunks = local_sources.ingest_file(first) + local_sources.ingest_file(second)
+                analysis = question_engine.analyze_sources(chunks, topic_k=2)
+        self.assertEqual(
+            analysis.explicit_questions,
+            ["Co je inflace a proc vznika?", "Jak se pocita HDP?", "Co jsou mzdy?"],
+        )
+
+    def test_lost_metadata_is_rescanned_from_the_file(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source = Path(tmp_dir) / "script.txt"
+            source.write_text("Otázky:\nCo je inflace a proc vznika?\n\nText o trhu a cenach.", encoding="utf-8")
+            index_dir = Path(tmp_dir) / ".index"
+            with mock.patch.object(local_sources, "_index_dir", lambda: index_dir), mock.patch.object(
+                local_sources, "_CORPUS_META", local_sources._LruCache(8)
+            ):
+                local_sources.ingest_file(source)
+                for path in index_dir.glob("*.meta.json"):
+                    path.unlink()
+                local_sources._CORPUS_META.clear()
+                chunks = local_sources.ingest_file(source)  # served from the chunk cache
+                with mock.patch.object(question_engine, "scan_text_blocks") as scan:
+                    analysis = question_engine.analyze_sources(chunks, topic_k=2)
+                scan.assert_not_called()
+        self.assertEqual(analysis.explicit_questions, ["Co je inflace a proc vznika?"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+"""Tests for the on-disk LLM response cache."""
+
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from app.llm import response_cache
+from app.llm.response_cache import ResponseCache
+
+
+class ResponseCacheTests(unittest.TestCase):
+    def test_roundtrip_and_opt_out(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = ResponseCache(Path(tmp_dir), variants=1)
+            key = ResponseCache.key("prompt", "model", {"stop": "line"})
+            self.assertIsNone(cache.get(key))
+            cache.put(key, "Co je inflace?")
+            self.assertEqual(cache.get(key), "Co je inflace?")
+            self.assertNotEqual(key, ResponseCache.key("prompt", "other-model"))
+            disabled = ResponseCache(Path(tmp_dir), variants=1, enabled=False)
+            self.assertIsNone(disabled.get(key))
+
+    def test_diversity_mode_rotates_variants(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = ResponseCache(Path(tmp_dir), variants=2)
+            key = ResponseCache.key("prompt", "model")
+            cache.put(key, "Prvni otazka?")
+            self.assertIsNone(cache.get(key))
+            cache.put(key, "Druha otazka?")
+            served = [cache.get(key) for _ in range(4)]
+            self.assertEqual(served, ["Prvni otazka?", "Druha otazka?", "Prvni otazka?", "Druha otazka?"])
+
+    def test_ttl_expires_entries(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = ResponseCache(Path(tmp_dir), variants=1, ttl_s=60)
+            key = ResponseCache.key("prompt", "model")
+            cache.put(key, "Otazka?")
+            with mock.patch.object(response_cache.time, "time", return_value=response_cache.time.time() + 120):
+                self.assertIsNone(cache.get(key))
+
+    def test_byte_budget_evicts_oldest(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = ResponseCache(Path(tmp_dir), variants=1, max_bytes=400)
+            for index in range(10):
+                cache.put(ResponseCache.key(f"prompt {index}", "model"), "x" * 100)
+            total = sum(path.stat().st_size for path in Path(tmp_dir).glob("*.json"))
+            self.assertLessEqual(total, 400)
+            self.assertEqual(cache.get(ResponseCache.key("prompt 9", "model")), "x" * 100)
+
+    def test_default_hits_after_one_response_without_writing(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = ResponseCache(Path(tmp_dir))
+            key = ResponseCache.key("prompt", "model")
+            cache.put(key, "Otazka?")
+            with mock.patch.object(cache, "_write") as write:
+                self.assertEqual([cache.get(key) for _ in range(3)], ["Otazka?"] * 3)
+            write.assert_not_called()
+            self.assertEqual((cache.hits, cache.misses), (3, 0))
+
+    def test_reads_keep_a_key_from_eviction(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = ResponseCache(Path(tmp_dir))
+            keys = [ResponseCache.key(f"prompt {index}", "model") for index in range(3)]
+            for index, key in enumerate(keys[:2]):
+                cache.put(key, "x" * 100)
+                cache.max_bytes = cache._path(key).stat().st_size * 5 // 2
+                stamp = response_cache.time.time() - 100 + index
+                os.utime(cache._path(key), (stamp, stamp))
+            self.assertIsNotNone(cache.get(keys[0]))
+            cache.put(keys[2], "x" * 100)
+            self.assertIsNotNone(cache.get(keys[0]))
+            self.assertIsNone(cache.get(keys[1]))
+
+    def test_malformed_file_is_a_miss(self) -> None:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache = ResponseCache(Path(tmp_dir))
+            key = ResponseCache.key("prompt", "model")
+            for payload in ({"cursor": 0}, {"responses": [{"created": 1}]}, {"responses": [{"text": 3}]}):
+                cache._path(key).write_text(json.dumps(payload), encoding="utf-8")
+                self.assertIsNone(cache.get(key))
+                cache.put(key, "Otazka?")
+                self.assertEqual(cache.get(key), "Otazka?")
+
+
+if __name__ == "__main__":
+    unittest.main()
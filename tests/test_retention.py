@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+"""Tests for lesson history retention and roll-ups."""
+
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from app.storage.memory import LessonRecord, StudentMemory, load_memory, save_memory
+from app.storage.memory_store import MemoryStore
+from app.storage.retention import compact_history, daily_summary, topic_summary
+
+NOW = datetime(2026, 6, 30, 12, 0, tzinfo=timezone.utc)
+
+
+def _record(days_ago: int, *, errors: int, peak: int, topic: str = "inflace", questions: int = 3) -> LessonRecord:
+    return LessonRecord(
+        timestamp=(NOW - timedelta(days=days_ago)).isoformat(),
+        errors=errors,
+        strictness_peak=peak,
+        topic=topic,
+        subject="ekonomie",
+        questions_asked_count=questions,
+    )
+
+
+def _sample_memory() -> StudentMemory:
+    return StudentMemory(
+        lesson_history=[
+            _record(100, errors=2, peak=3),
+            _record(100, errors=4, peak=5, topic="hdp"),
+            _record(95, errors=1, peak=2),
+            _record(10, errors=0, peak=1),
+            _record(0, errors=3, peak=4, topic="hdp"),
+        ]
+    )
+
+
+class RetentionTests(unittest.TestCase):
+    def test_compaction_rolls_up_old_records_only(self) -> None:
+        memory = _sample_memory()
+        self.assertEqual(compact_history(memory, retention_days=30, now=NOW), 3)
+        self.assertEqual([record.errors for record in memory.lesson_history], [0, 3])
+        day = (NOW - timedelta(days=100)).date().isoformat()
+        rollup = memory.daily_rollups[day]
+        self.assertEqual((rollup.lessons, rollup.errors, rollup.strictness_peak, rollup.questions_asked), (2, 6, 5, 6))
+        self.assertEqual(memory.topic_rollups["ekonomie"]["inflace"].lessons, 2)
+        self.assertEqual(compact_history(memory, retention_days=30, now=NOW), 0)
+
+    def test_summaries_match_before_and_after_compaction(self) -> None:
+        memory = _sample_memory()
+        before_days = daily_summary(memory, now=NOW)
+        before_topics = topic_summary(memory)
+        compact_history(memory, retention_days=30, now=NOW)
+        self.assertEqual(daily_summary(memory, now=NOW), before_days)
+        self.assertEqual(topic_summary(memory), before_topics)
+        self.assertEqual(before_topics["ekonomie"]["hdp"].errors, 7)
+        recent = daily_summary(memory, days=11, now=NOW)
+        self.assertEqual([rollup.errors for _, rollup in recent], [0, 3])
+
+    def test_rollups_persist_in_json_and_sqlite(self) -> None:
+        memory = _sample_memory()
+        compact_history(memory, retention_days=30, now=NOW)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name in ("memory.json", "memory.db"):
+                path = Path(tmpdir) / name
+                save_memory(path, memory)
+                loaded = load_memory(path)
+                self.assertEqual(loaded.lesson_history, memory.lesson_history)
+                self.assertEqual(loaded.daily_rollups, memory.daily_rollups)
+                self.assertEqual(loaded.topic_rollups, memory.topic_rollups)
+
+    def test_sqlite_rewrites_lessons_after_compaction(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "memory.db"
+            memory = _sample_memory()
+            save_memory(path, memory)
+            compact_history(memory, retention_days=30, now=NOW)
+            memory.lesson_history.extend(_record(0, errors=index, peak=2) for index in range(3))
+            save_memory(path, memory)
+            self.assertEqual(load_memory(path).lesson_history, memory.lesson_history)
+
+    def test_store_compacts_on_snapshot(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "memory.json"
+            old = StudentMemory(lesson_history=[_record(400, errors=1, peak=2)])
+            save_memory(path, old)
+            store = MemoryStore(path, retention_days=90)
+            store.record_lesson(errors=0, strictness_peak=1, subject="ekonomie")
+            store.mark_dirty()
+            store.close()
+            loaded = load_memory(path)
+            self.assertEqual(len(loaded.lesson_history), 1)
+            self.assertEqual(sum(rollup.lessons for rollup in loaded.daily_rollups.values()), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
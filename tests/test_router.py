@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+"""Tests for latency-budget model routing."""
+
+import time
+import unittest
+from unittest import mock
+
+from app.core.llm_question_engine import generate_llm_question
+from app.llm import ollama_client, router
+from app.llm.ollama_client import OllamaClient
+from app.llm.router import ModelRouter
+from app.llm.stub_server import StubOllamaServer
+
+
+class ModelRouterTests(unittest.TestCase):
+    def test_prefers_first_model_that_fits(self) -> None:
+        models = ModelRouter(alpha=0.5)
+        self.assertEqual(models.choose(["velky", "maly"], 1.0), "velky")
+        models.observe("velky", 3.0)
+        self.assertEqual(models.choose(["velky", "maly"], 1.0), "maly")
+        models.observe("maly", 2.0)
+        self.assertEqual(models.choose(["velky", "maly"], 1.0), "maly")
+        models.observe("velky", 0.2)
+        self.assertAlmostEqual(models.estimate("velky"), 1.6)
+        self.assertEqual(models.choose(["velky", "maly"], None), "velky")
+
+    def test_model_recovers_after_slow_outlier(self) -> None:
+        models = ModelRouter(retry_after_s=60)
+        started = router.time.monotonic()
+        with mock.patch.object(router.time, "monotonic", return_value=started):
+            models.observe("velky", 30.0)  # cold load
+            models.observe("maly", 2.0)
+            self.assertEqual(models.choose(["velky", "maly"], 5.0), "maly")
+        with mock.patch.object(router.time, "monotonic", return_value=started + 61):
+            self.assertEqual(models.choose(["velky", "maly"], 5.0), "velky")
+            # Only one probe while it is in flight.
+            self.assertEqual(models.choose(["velky", "maly"], 5.0), "maly")
+            models.observe("velky", 1.5)
+        self.assertEqual(models.estimate("velky"), 1.5)
+        self.assertEqual(models.choose(["velky", "maly"], 5.0), "velky")
+
+    def test_budget_expiry_falls_back_and_records_latency(self) -> None:
+        models = ModelRouter()
+        with StubOllamaServer(latency_s=0.4) as server:
+            client = OllamaClient(server.base_url)
+            with mock.patch.object(ollama_client, "_DEFAULT_CLIENT", client), mock.patch.object(
+                router, "_DEFAULT_ROUTER", models
+            ):
+                started = time.perf_counter()
+                question = generate_llm_question(
+                    "ekonomie", "stredni", "inflace", 3, sources=[], model="velky", use_cache=False, budget_s=0.1
+                )
+                elapsed = time.perf_counter() - started
+                deadline = time.monotonic() + 2
+                while models.estimate("velky") is None and time.monotonic() < deadline:
+                    time.sleep(0.02)
+            client.close()
+        self.assertIsNone(question)
+        self.assertLess(elapsed, 0.3)
+        self.assertGreaterEqual(models.estimate("velky"), 0.4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+"""Tests for the LLM request scheduler."""
+
+import threading
+import unittest
+from concurrent.futures import CancelledError
+
+from app.llm.scheduler import PRIORITY_BATCH, PRIORITY_INTERACTIVE, PRIORITY_PREFETCH, LlmScheduler
+
+
+class SchedulerTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.order: list[str] = []
+        self.gate = threading.Event()
+
+    def _blocked(self, scheduler: LlmScheduler, priority: int = PRIORITY_INTERACTIVE) -> None:
+        started = threading.Event()
+
+        def block() -> None:
+            started.set()
+            self.gate.wait(2)
+
+        scheduler.submit(block, priority=priority, session="gate")
+        started.wait(2)
+
+    def _record(self, name: str):
+        return lambda: self.order.append(name)
+
+    def test_priority_then_round_robin(self) -> None:
+        scheduler = LlmScheduler(max_concurrency=1, reserved_interactive=0)
+        self._blocked(scheduler)
+        futures = [
+            scheduler.submit(self._record("a-batch-1"), priority=PRIORITY_BATCH, session="a"),
+            scheduler.submit(self._record("a-batch-2"), priority=PRIORITY_BATCH, session="a"),
+            scheduler.submit(self._record("b-batch-1"), priority=PRIORITY_BATCH, session="b"),
+            scheduler.submit(self._record("a-prefetch"), priority=PRIORITY_PREFETCH, session="a"),
+            scheduler.submit(self._record("b-ask"), priority=PRIORITY_INTERACTIVE, session="b"),
+        ]
+        self.gate.set()
+        for future in futures:
+            future.result(2)
+        scheduler.close()
+        self.assertEqual(self.order, ["b-ask", "a-prefetch", "a-batch-1", "b-batch-1", "a-batch-2"])
+
+    def test_cancel_drops_queued_work(self) -> None:
+        scheduler = LlmScheduler(max_concurrency=1, reserved_interactive=0)
+        self._blocked(scheduler)
+        stale = scheduler.submit(self._record("stale"), priority=PRIORITY_PREFETCH, session="a")
+        kept = scheduler.submit(self._record("kept"), priority=PRIORITY_INTERACTIVE, session="a")
+        self.assertEqual(scheduler.cancel("a", priority=PRIORITY_PREFETCH), 1)
+        self.gate.set()
+        kept.result(2)
+        scheduler.close()
+        with self.assertRaises(CancelledError):
+            stale.result(0)
+        self.assertEqual(self.order, ["kept"])
+
+    def test_background_leaves_a_slot_for_interactive(self) -> None:
+        scheduler = LlmScheduler(max_concurrency=2, reserved_interactive=1)
+        self._blocked(scheduler, PRIORITY_BATCH)
+        queued = scheduler.submit(self._record("batch"), priority=PRIORITY_BATCH, session="a")
+        scheduler.run(self._record("ask"), priority=PRIORITY_INTERACTIVE, session="b")
+        self.assertEqual(self.order, ["ask"])
+        self.assertFalse(queued.done())
+        self.gate.set()
+        queued.result(2)
+        scheduler.close()
+
+    def test_urgent_session_prefetch_runs_as_interactive(self) -> None:
+        scheduler = LlmScheduler(max_concurrency=2, reserved_interactive=1)
+        self._blocked(scheduler, PRIORITY_BATCH)
+        queued = scheduler.submit(self._record("queued-prefetch"), priority=PRIORITY_PREFETCH, session="a")
+        self.assertFalse(queued.done())
+        # The student starts waiting for it: it takes the reserved slot.
+        scheduler.set_urgent("a", True)
+        queued.result(2)
+        scheduler.run(self._record("new-prefetch"), priority=PRIORITY_PREFETCH, session="a")
+        scheduler.set_urgent("a", False)
+        later = scheduler.submit(self._record("later-prefetch"), priority=PRIORITY_PREFETCH, session="a")
+        self.assertEqual(self.order, ["queued-prefetch", "new-prefetch"])
+        self.assertFalse(later.done())
+        self.gate.set()
+        later.result(2)
+        scheduler.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
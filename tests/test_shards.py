@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+"""Tests for per-student memory shards shared between processes."""
+
+import multiprocessing
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.storage.memory import load_memory
+from app.storage.memory_store import MemoryStore
+from app.storage.shards import student_memory_path
+
+
+def _counters(stats: dict[str, object]) -> dict[str, object]:
+    return {key: stats[key] for key in ("total", "ok", "fail")}
+
+
+def _record_answers(path: str, count: int) -> None:
+    store = MemoryStore(Path(path), flush_delay_s=0.01, compact_bytes=512)
+    for index in range(count):
+        store.record_answer(subject="ekonomie", topic=f"tema{index % 3}", ok=index % 2 == 0)
+    store.close()
+
+
+class StudentShardTests(unittest.TestCase):
+    def test_student_memory_path(self) -> None:
+        root = Path("/data/students")
+        self.assertEqual(student_memory_path(root, "Jana Novak"), root / "jana_novak.json")
+        self.assertEqual(student_memory_path(root, "../x", suffix=".db"), root / "x.db")
+        with self.assertRaises(ValueError):
+            student_memory_path(root, " / ")
+
+    def test_processes_sharing_a_shard_lose_no_answers(self) -> None:
+        context = multiprocessing.get_context("spawn")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "memory.json"
+            workers = [context.Process(target=_record_answers, args=(str(path), 40)) for _ in range(4)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join(timeout=60)
+                self.assertEqual(worker.exitcode, 0)
+            memory = MemoryStore(path).memory
+            stats = memory.weakness_stats["ekonomie"]
+            self.assertEqual(sum(topic["total"] for topic in stats.values()), 160)
+            self.assertEqual(sum(topic["ok"] for topic in stats.values()), 80)
+
+    def test_store_catches_up_with_another_writer(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "memory.json"
+            first = MemoryStore(path, flush_delay_s=60)
+            second = MemoryStore(path, flush_delay_s=60)
+            first.record_answer(subject="ekonomie", topic="inflace", ok=False)
+            second.record_answer(subject="ekonomie", topic="inflace", ok=True)
+            self.assertEqual(second.memory.weakness_stats["ekonomie"]["inflace"]["total"], 2)
+
+            # `first` writes a snapshot; `second` is now behind and rebases on it.
+            first.memory.preferences["topic"] = "inflace"
+            first.mark_dirty()
+            first.flush()
+            second.memory.preferences["level"] = "zs"
+            second.mark_dirty()
+            second.record_answer(subject="ekonomie", topic="inflace", ok=False)
+            second.flush()
+            self.assertEqual(second.reloads, 1)
+
+            memory = load_memory(path)
+            self.assertEqual(_counters(memory.weakness_stats["ekonomie"]["inflace"]), {"total": 3, "ok": 1, "fail": 2})
+            self.assertEqual(memory.version, 2)
+            self.assertEqual(memory.preferences["level"], "zs")
+            first.close()
+            second.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
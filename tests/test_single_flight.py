@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+"""Tests for request coalescing."""
+
+import threading
+import time
+import unittest
+
+from app.llm.ollama_client import OllamaClient
+from app.llm.single_flight import SingleFlight
+from app.llm.stub_server import StubOllamaServer
+
+
+def _run_concurrently(targets: list) -> list:
+    results: list = [None] * len(targets)
+    barrier = threading.Barrier(len(targets))
+
+    def worker(index: int) -> None:
+        barrier.wait()
+        results[index] = targets[index]()
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(len(targets))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class SingleFlightTests(unittest.TestCase):
+    def test_errors_reach_every_waiter(self) -> None:
+        flight: SingleFlight[int] = SingleFlight()
+        release = threading.Event()
+        errors: list[BaseException] = []
+
+        def failing() -> int:
+            release.wait(1)
+            raise RuntimeError("boom")
+
+        def call() -> None:
+            try:
+                flight.do("key", failing)
+            except RuntimeError as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        while flight.issued + flight.coalesced < 3:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(errors), 3)
+        self.assertEqual((flight.issued, flight.coalesced), (1, 2))
+
+    def test_identical_prompts_share_one_request(self) -> None:
+        with StubOllamaServer(reply="Co je HDP?", latency_s=0.2) as server:
+            client = OllamaClient(server.base_url)
+            same = [lambda: client.stream_generate("prompt", model="stub") for _ in range(5)]
+            other = [lambda: client.stream_generate("jiny prompt", model="stub")]
+            results = _run_concurrently(same + other)
+            client.close()
+        self.assertEqual([result.text for result in results], ["Co je HDP?"] * 6)
+        self.assertEqual(server.requests, 2)
+        self.assertEqual(client.single_flight.issued, 2)
+        self.assertEqual(client.single_flight.coalesced, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+"""Tests for the SQLite memory backend."""
+
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.storage.memory import (
+    StudentMemory,
+    add_lesson_record,
+    get_weakest_topics,
+    load_memory,
+    save_memory,
+    update_weakness_stats,
+)
+from app.storage.sqlite_memory import import_json, query_weakest_topics
+
+
+def _sample_memory() -> StudentMemory:
+    memory = StudentMemory(preferences={"subject": "ekonomie", "llm_enabled": True, "mode": "teacher"})
+    memory.todos.append("zopakovat HDP")
+    for index in range(3):
+        add_lesson_record(memory, errors=index, strictness_peak=3, topic="inflace", subject="ekonomie")
+    for topic, fails in (("inflace", 3), ("hdp", 1), ("mzdy", 2)):
+        for attempt in range(4):
+            update_weakness_stats(memory, subject="ekonomie", topic=topic, ok=attempt >= fails)
+    return memory
+
+
+class SqliteMemoryTests(unittest.TestCase):
+    def test_roundtrip_and_incremental_lessons(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "memory.db"
+            memory = _sample_memory()
+            save_memory(path, memory)
+            add_lesson_record(memory, errors=5, strictness_peak=4, subject="ekonomie")
+            save_memory(path, memory)
+            loaded = load_memory(path)
+            self.assertEqual(loaded.lesson_history, memory.lesson_history)
+            self.assertEqual(loaded.weakness_stats, memory.weakness_stats)
+            self.assertEqual(loaded.preferences, memory.preferences)
+            self.assertEqual(loaded.todos, ["zopakovat HDP"])
+            with sqlite3.connect(path) as connection:
+                self.assertEqual(connection.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+    def test_indexed_weakest_topics_match_memory_ranking(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "memory.db"
+            memory = _sample_memory()
+            now = 1_700_000_000.0
+            # Equal fail mass and rate: the topic name breaks the tie, as in WeaknessIndex.
+            for topic in ("zisk", "dane"):
+                for ok in (False, True, True, True, True):
+                    update_weakness_stats(memory, subject="ekonomie", topic=topic, ok=ok, now=now)
+            update_weakness_stats(memory, subject="ekonomie", topic="vse_spravne", ok=True, now=now)
+            save_memory(path, memory)
+            self.assertEqual(
+                query_weakest_topics(path, subject="ekonomie", limit=10),
+                get_weakest_topics(memory, subject="ekonomie", limit=10),
+            )
+            with sqlite3.connect(path) as connection:
+                plan = " ".join(
+                    str(row[-1])
+                    for row in connection.execute(
+                        "EXPLAIN QUERY PLAN SELECT topic FROM weakness WHERE subject = ? "
+                        "ORDER BY fail_mass DESC, fail_rate DESC, topic LIMIT 2",
+                        ("ekonomie",),
+                    )
+                )
+            self.assertIn("weakness_weakest", plan)
+
+    def test_flush_writes_only_changed_rows(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = Path(tmpdir) / "memory.db"
+            memory = _sample_memory()
+            save_memory(path, memory)
+            with sqlite3.connect(path) as connection:
+                connection.executescript(
+                    """
+                    CREATE TABLE writes (name TEXT);
+                    CREATE TRIGGER weakness_insert AFTER INSERT ON weakness BEGIN INSERT INTO writes VALUES ('weakness'); END;
+                    CREATE TRIGGER weakness_delete AFTER DELETE ON weakness BEGIN INSERT INTO writes VALUES ('weakness'); END;
+                    CREATE TRIGGER preference_insert AFTER INSERT ON preferences BEGIN INSERT INTO writes VALUES ('preferences'); END;
+                    CREATE TRIGGER preference_delete AFTER DELETE ON preferences BEGIN INSERT INTO writes VALUES ('preferences'); END;
+                    """
+                )
+            save_memory(path, memory)
+            update_weakness_stats(memory, subject="ekonomie", topic="hdp", ok=False)
+            del memory.weakness_stats["ekonomie"]["mzdy"]
+            memory.preferences["subject"] = "dejepis"
+            save_memory(path, memory)
+            with sqlite3.connect(path) as connection:
+                writes = [row[0] for row in connection.execute("SELECT name FROM writes")]
+            # INSERT OR REPLACE of hdp, DELETE of mzdy, INSERT OR REPLACE of one preference.
+            self.assertEqual(sorted(writes), ["preferences", "weakness", "weakness"])
+            loaded = load_memory(path)
+            self.assertEqual(loaded.weakness_stats, memory.weakness_stats)
+            self.assertEqual(loaded.preferences, memory.preferences)
+
+    def test_import_json_once(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            json_path = Path(tmpdir) / "student_memory.json"
+            db_path = Path(tmpdir) / "student_memory.db"
+            save_memory(json_path, _sample_memory())
+            self.assertEqual(import_json(json_path, db_path), 3)
+            with self.assertRaises(ValueError):
+                import_json(json_path, db_path)
+            self.assertEqual(import_json(json_path, db_path, overwrite=True), 3)
+            self.assertEqual(len(load_memory(db_path).lesson_history), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
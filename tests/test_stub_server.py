@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+"""Tests for the stand-in Ollama server used by benchmarks."""
+
+import threading
+import unittest
+
+from app.llm.ollama_client import OllamaClient
+from app.llm.stub_server import StubOllamaServer
+
+
+class StubServerTests(unittest.TestCase):
+    def test_error_injection(self) -> None:
+        with StubOllamaServer(error_rate=1.0, error_status=503) as server:
+            client = OllamaClient(server.base_url)
+            result = client.stream_generate("prompt", model="stub")
+            client.close()
+        self.assertEqual(result.error, "error")
+        self.assertIn("503", result.text)
+        self.assertEqual(server.errors, 1)
+
+    def test_concurrency_limit_queues_requests(self) -> None:
+        with StubOllamaServer(latency_s=0.05, max_concurrency=2) as server:
+            client = OllamaClient(server.base_url, pool_size=6)
+            threads = [
+                threading.Thread(target=client.stream_generate, args=(f"prompt {index}",), kwargs={"model": "stub"})
+                for index in range(6)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            client.close()
+        self.assertEqual(server.requests, 6)
+        self.assertEqual(server.peak_active, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
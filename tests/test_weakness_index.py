@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+"""Tests for the decayed weakest-topics index."""
+
+import random
+import unittest
+
+from app.storage.memory import StudentMemory, get_weakest_overall, get_weakest_topics, update_weakness_stats
+from app.storage.weakness_index import DEFAULT_HALF_LIFE_S, WeaknessIndex
+
+DAY_S = 24 * 3600
+
+
+class WeaknessIndexTests(unittest.TestCase):
+    def test_old_mistakes_fade(self) -> None:
+        memory = StudentMemory()
+        start = 1_700_000_000.0
+        for _ in range(4):
+            update_weakness_stats(memory, subject="ekonomie", topic="inflace", ok=False, now=start)
+        update_weakness_stats(memory, subject="ekonomie", topic="hdp", ok=False, now=start)
+        update_weakness_stats(memory, subject="ekonomie", topic="hdp", ok=True, now=start)
+        # Two half-lives later inflace is answered correctly twice.
+        later = start + 2 * DEFAULT_HALF_LIFE_S
+        for _ in range(2):
+            update_weakness_stats(memory, subject="ekonomie", topic="inflace", ok=True, now=later)
+
+        stats = memory.weakness_stats["ekonomie"]["inflace"]
+        self.assertEqual((stats["total"], stats["fail"]), (6, 4))
+        self.assertAlmostEqual(stats["decayed_total"], 3.0)
+        # inflace still remembers one failure, hdp only a quarter of one.
+        weakest = get_weakest_topics(memory, subject="ekonomie", limit=2)
+        self.assertEqual([topic for topic, _, _ in weakest], ["inflace", "hdp"])
+        self.assertAlmostEqual(weakest[0][1], 1 / 3)
+        self.assertEqual(weakest[0][2], 6)
+        self.assertAlmostEqual(weakest[1][1], 0.5)
+
+    def test_fresh_weak_topic_overtakes_one_failed_long_ago(self) -> None:
+        memory = StudentMemory()
+        start = 1_700_000_000.0
+        for _ in range(10):
+            update_weakness_stats(memory, subject="ekonomie", topic="inflace", ok=False, now=start)
+        self.assertEqual(get_weakest_overall(memory)[1], "inflace")
+
+        later = start + 6 * DEFAULT_HALF_LIFE_S
+        for ok in (False, True, False):
+            update_weakness_stats(memory, subject="ekonomie", topic="hdp", ok=ok, now=later)
+        weakest = get_weakest_topics(memory, subject="ekonomie", limit=2)
+        self.assertEqual([topic for topic, _, _ in weakest], ["hdp", "inflace"])
+        self.assertAlmostEqual(weakest[0][1], 2 / 3)
+        self.assertAlmostEqual(weakest[1][1], 1.0)
+        self.assertEqual(get_weakest_overall(memory)[1], "hdp")
+
+    def test_incremental_updates_match_a_rebuild(self) -> None:
+        rng = random.Random(7)
+        memory = StudentMemory()
+        now = 1_700_000_000.0
+        get_weakest_topics(memory, subject="ekonomie", limit=1)  # build the index up front
+        for _ in range(500):
+            now += rng.uniform(0, 3 * DAY_S)
+            subject = rng.choice(["ekonomie", "dejepis"])
+            update_weakness_stats(memory, subject=subject, topic=f"tema{rng.randrange(25)}", ok=rng.random() < 0.6, now=now)
+
+        rebuilt = WeaknessIndex(memory.weakness_stats)
+        for subject in ("ekonomie", "dejepis"):
+            self.assertEqual(get_weakest_topics(memory, subject=subject, limit=25), rebuilt.top(subject, 25))
+            stats = memory.weakness_stats[subject]
+            masses = [
+                stats[topic]["decayed_fail"] * 0.5 ** ((now - stats[topic]["updated_at"]) / DEFAULT_HALF_LIFE_S)
+                for topic, _, _ in get_weakest_topics(memory, subject=subject, limit=25)
+            ]
+            self.assertEqual(masses, sorted(masses, reverse=True))
+        self.assertEqual(get_weakest_overall(memory), rebuilt.weakest())
+
+    def test_stats_without_decay_fields_and_replaced_stats(self) -> None:
+        memory = StudentMemory(
+            weakness_stats={"dejepis": {"valka": {"total": 4, "ok": 1, "fail": 3}, "mir": {"total": 2, "ok": 2, "fail": 0}}}
+        )
+        self.assertEqual(get_weakest_topics(memory, subject="dejepis", limit=1), [("valka", 0.75, 4)])
+        self.assertEqual(get_weakest_overall(memory), ("dejepis", "valka", 0.75, 4))
+
+        memory.weakness_stats = {"dejepis": {"mir": {"total": 1, "ok": 0, "fail": 1}}}
+        self.assertEqual(get_weakest_topics(memory, subject="dejepis", limit=3), [("mir", 1.0, 1)])
+        self.assertEqual(get_weakest_topics(memory, subject="chemie", limit=3), [])
+
+
+if __name__ == "__main__":
+    unittest.main()